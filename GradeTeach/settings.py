@@ -41,6 +41,10 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'proofstore',  # 证明文件按内容去重存储
+    'taskqueue',   # 基于数据库的后台任务
+    'notifications',   # 审核结果邮件通知
+    'versioning',   # 数据版本号，用于条件请求
     'students.apps.StudentsConfig',
     'teachers.apps.TeachersConfig',
     'users',  # 添加用户应用
@@ -48,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.QueryBudgetMiddleware',  # 统计每个请求的SQL查询
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  # 支持中文翻译的中间件
@@ -158,7 +163,7 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
-        'rest_framework.filters.SearchFilter',
+        'students.search.FullTextSearchFilter',
     ]
 }
 
@@ -166,7 +171,72 @@ REST_FRAMEWORK = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 证明文件下载交给前端代理发送：'x-accel-redirect'（nginx）或'x-sendfile'（Apache）；None时由Django发送
+PROOF_SENDFILE = None
+PROOF_SENDFILE_PREFIX = '/protected-media/'  # nginx中指向MEDIA_ROOT的internal location
+# 证明文件预览图的长边像素数
+PROOF_PREVIEW_SIZE = 320
+
+# 后台任务由 python manage.py run_tasks 执行；为True时入队即在当前进程执行，开发环境不必启动worker
+TASK_QUEUE_EAGER = DEBUG
+
+# 审核结果通知：产生后延迟若干秒再发送，期间同一学生的通知合并为一封摘要邮件；每批邮件共用一个连接
+NOTIFICATION_DIGEST_DELAY = 60
+NOTIFICATION_BATCH_SIZE = 100
+
+# 缓存后端：'locmem'为进程内缓存，用于测试和单进程开发；多进程部署改为'file'（共享目录）或
+# 'db'（SQLite中的缓存表，需先执行 python manage.py createcachetable），各进程共享计算结果。
+# 失效不依赖后端：缓存键包含versioning中的数据版本号，任一进程写入后其他进程即读不到旧条目
+CACHE_BACKEND = 'locmem'
+CACHES = {
+    'default': {
+        'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': BASE_DIR / 'cache'},
+        'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'django_cache'},
+    }[CACHE_BACKEND],
+}
+# 按数据版本号缓存的计算结果的默认超时（秒）
+VERSIONED_CACHE_TIMEOUT = 300
+
 # 登录URL配置
 LOGIN_URL = '/students/login/'
 LOGIN_REDIRECT_URL = '/'  # 登录成功后重定向到首页
 LOGOUT_REDIRECT_URL = '/'  # 登出成功后重定向到首页
+
+# 单次请求的SQL预算，超出时由monitoring.middleware输出告警日志
+QUERY_BUDGET = {
+    'max_queries': 30,
+    'max_time_ms': 500,
+    'max_duplicates': 5,
+    # 按URL名称单独设置预算
+    'views': {},
+}
+
+# 日志：请求线程只入队，由后台线程输出JSON格式日志
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'monitoring.logs.JsonFormatter'},
+    },
+    'filters': {
+        # 逐行调试事件只保留1%
+        'sample_rows': {'()': 'monitoring.logs.SamplingFilter', 'rate': 0.01},
+    },
+    'handlers': {
+        'background': {
+            'class': 'monitoring.logs.BackgroundHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'json',
+        },
+    },
+    'root': {'handlers': ['background'], 'level': 'WARNING'},
+    'loggers': {
+        'students': {'level': 'INFO'},
+        # 排查时改为DEBUG，逐行事件按sample_rows采样
+        'students.views.rows': {'level': 'WARNING', 'filters': ['sample_rows']},
+        'teachers': {'level': 'INFO'},
+        'GradeTeach': {'level': 'INFO'},
+        'monitoring': {'level': 'WARNING'},
+    },
+}
@@ -1,3 +1,5 @@
+import logging
+
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
@@ -14,8 +16,11 @@ from students.models import StudentProfile
 
 
 # 从students应用导入视图函数
-from students.views import home, custom_logout, custom_login, personal_info, upload_proof, submission_history, debug_profile, APIRootView, SubmissionViewSet, ScoreItemViewSet, submission_approve, submission_reject, submission_revoke, submission_detail
+from students.views import home, custom_logout, custom_login, personal_info, upload_proof, submission_history, debug_profile, APIRootView, SubmissionViewSet, ScoreItemViewSet, submission_approve, submission_reject, submission_revoke, submission_detail, submission_proof, submission_preview
 from students.views import StudentProfileViewSet
+from students.ranking import rank_index
+
+logger = logging.getLogger(__name__)
 # 注释掉不存在的模块导入
 # from students.views_debug import debug_student_data
 # 注释掉不存在的模块导入
@@ -24,48 +29,19 @@ from students.views import StudentProfileViewSet
 
 # 学生详情页面视图函数
 def student_detail_view(request, pk):
-    print(f"\n=== student_detail_view (urls.py) 函数被调用 ===")
-    print(f"请求路径: {request.path}")
-    print(f"学生ID: {pk}")
-    
-    # 导入必要的模型
-    from students.models import Submission
-    # 获取学生信息
-    student = StudentProfile.objects.select_related('user').get(pk=pk) if StudentProfile.objects.filter(pk=pk).exists() else None
-    print(f"找到学生: {student.full_name if student else 'None'} (ID: {pk})")
+    logger.debug("student_detail_view path=%s pk=%s", request.path, pk)
     
-    # 计算提交记录数和通过记录数
-    submission_count_value = 0
-    approved_count_value = 0
-    if student:
-        try:
-            # 计算所有提交记录（包括所有状态）
-            submission_count_value = Submission.objects.filter(student=student).count()
-            # 计算通过记录数
-            approved_count_value = Submission.objects.filter(student=student, status='approved').count()
-            
-            # 记录所有提交记录详情
-            submissions = Submission.objects.filter(student=student)
-            print(f"学生 {student.full_name} 的提交记录详情:")
-            for s in submissions:
-                print(f"  - ID: {s.id}, 项目: {s.score_item.name}, 状态: {s.status}")
-            
-            # 记录详细的状态统计信息用于调试
-            print(f"学生 {student.full_name} 的提交记录统计:")
-            print(f"  总提交数: {submission_count_value}")
-            print(f"  通过数: {approved_count_value}")
-            
-            # 确保没有硬编码值
-            print(f"警告: 确认没有使用硬编码值，当前计算值为: {submission_count_value}")
-            
-        except Exception as e:
-            print(f"计算学生提交记录数时出错: {e}")
-            import traceback
-            traceback.print_exc()
+    # 获取学生信息，提交记录数和通过记录数直接读取档案上的计数列
+    student = StudentProfile.objects.select_related('user').filter(pk=pk).first()
+    if student is None:
+        logger.info("学生不存在 pk=%s", pk)
+    submission_count_value = student.submission_count if student else 0
+    approved_count_value = student.approved_count if student else 0
     
     # 渲染模板并传递所有必要的变量
     context = {
         'student': student,
+        'ranks': rank_index.ranks(student.id) if student else {},
         'user': request.user,
         'is_teacher': request.user.is_superuser or request.user.is_staff,
         'login_url': '/login/',
@@ -76,9 +52,7 @@ def student_detail_view(request, pk):
         'actual_submission_count': submission_count_value,
         'submission_count_calculated': submission_count_value
     }
-    print(f"传递给模板的上下文变量:")
-    print(f"  submission_count: {context['submission_count']}")
-    print(f"  actual_submission_count: {context['actual_submission_count']}")
+    logger.debug("学生 %s 提交数 %s 通过数 %s", pk, submission_count_value, approved_count_value)
     
     return render(request, 'students/student_detail.html', context)
 
@@ -91,6 +65,8 @@ urlpatterns = [
     # path('studentprofile-list/', simple_student_list, name='studentprofile-list'),
     # API路由入口
     path('api/', include('students.urls')),
+    # 教师功能
+    path('teachers/', include('teachers.urls')),
     # 保留原ViewSet路径作为备用
     path('api/studentprofile-list/', StudentProfileViewSet.as_view({'get': 'list'}), name='api-studentprofile-list'),
     # 首页 - 最基本的配置
@@ -112,11 +88,12 @@ urlpatterns = [
     path('submission-approve/<int:pk>/', submission_approve, name='submission-approve'),
     path('submission-reject/<int:pk>/', submission_reject, name='submission-reject'),
     path('submission-detail/<int:pk>/', submission_detail, name='submission-detail'),
+    path('submission-proof/<int:pk>/', submission_proof, name='submission-proof'),
+    path('submission-preview/<int:pk>/', submission_preview, name='submission-preview'),
     # 学生详情页面URL配置
     path('students/student-detail/<int:pk>/', student_detail_view, name='student-detail'),
 ]
 
-# 处理静态文件和媒体文件
+# 处理静态文件；证明文件只通过submission-proof检查权限后下载，不再按MEDIA_URL直接访问
 if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -9,6 +9,11 @@ SECRET_KEY = 'django-insecure-你的密钥（例如：abc123...）'
 
 # 开发模式（调试开启）
 DEBUG = True
+
+# 邮件设置（用于开发环境，将邮件输出到控制台）
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'admin@gradehelper.com'
+
 ALLOWED_HOSTS = []
 
 # 已安装应用（含验证码和自定义应用）
@@ -19,6 +24,10 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'proofstore',    # 证明文件按内容去重存储
+    'taskqueue',     # 基于数据库的后台任务
+    'notifications',     # 审核结果邮件通知
+    'versioning',     # 数据版本号，用于条件请求
     'score_helper',  # 自定义应用
     'captcha',       # 验证码应用（必须）
 ]
@@ -28,6 +37,7 @@ AUTH_USER_MODEL = 'score_helper.User'
 
 # 中间件（默认保留）
 MIDDLEWARE = [
+    'monitoring.middleware.QueryBudgetMiddleware',  # 统计每个请求的SQL查询
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,5 +101,62 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'  # 访问路径
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # 本地存放路径
 
+# 证明文件下载交给前端代理发送：'x-accel-redirect'（nginx）或'x-sendfile'（Apache）；None时由Django发送
+PROOF_SENDFILE = None
+PROOF_SENDFILE_PREFIX = '/protected-media/'  # nginx中指向MEDIA_ROOT的internal location
+# 证明文件预览图的长边像素数
+PROOF_PREVIEW_SIZE = 320
+
+# 后台任务由 python manage.py run_tasks 执行；为True时入队即在当前进程执行，开发环境不必启动worker
+TASK_QUEUE_EAGER = DEBUG
+
+# 审核结果通知：产生后延迟若干秒再发送，期间同一学生的通知合并为一封摘要邮件；每批邮件共用一个连接
+NOTIFICATION_DIGEST_DELAY = 60
+NOTIFICATION_BATCH_SIZE = 100
+
+# 缓存后端：'locmem'为进程内缓存，用于测试和单进程开发；多进程部署改为'file'（共享目录）或
+# 'db'（SQLite中的缓存表，需先执行 python manage.py createcachetable），各进程共享计算结果。
+# 失效不依赖后端：缓存键包含versioning中的数据版本号，任一进程写入后其他进程即读不到旧条目
+CACHE_BACKEND = 'locmem'
+CACHES = {
+    'default': {
+        'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': BASE_DIR / 'cache'},
+        'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'django_cache'},
+    }[CACHE_BACKEND],
+}
+# 按数据版本号缓存的计算结果的默认超时（秒）
+VERSIONED_CACHE_TIMEOUT = 300
+
 # 默认主键类型
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 单次请求的SQL预算，超出时由monitoring.middleware输出告警日志
+QUERY_BUDGET = {
+    'max_queries': 30,
+    'max_time_ms': 500,
+    'max_duplicates': 5,
+    # 按URL名称单独设置预算
+    'views': {},
+}
+
+# 日志：请求线程只入队，由后台线程输出JSON格式日志
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'monitoring.logs.JsonFormatter'},
+    },
+    'handlers': {
+        'background': {
+            'class': 'monitoring.logs.BackgroundHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'json',
+        },
+    },
+    'root': {'handlers': ['background'], 'level': 'WARNING'},
+    'loggers': {
+        'score_helper': {'level': 'INFO'},
+        'monitoring': {'level': 'WARNING'},
+    },
+}
@@ -1,7 +1,5 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static  # 用于媒体文件访问
 from score_helper import views  # 导入应用视图
 
 urlpatterns = [
@@ -12,7 +10,4 @@ urlpatterns = [
     path('student/', include('score_helper.urls')),  # 学生功能路由（如/student/dashboard）
     path('teacher/', include('score_helper.urls')),  # 老师功能路由（如/teacher/dashboard）
 ]
-
-# 开发环境下允许访问媒体文件（学生上传的证明）
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# 证明文件只通过application_proof检查权限后下载，不再按MEDIA_URL直接访问
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""
+非阻塞的结构化日志
+
+BackgroundHandler：请求线程只把日志记录放入内存队列，格式化和写出在后台线程完成；
+队列满时直接丢弃并计数，不阻塞请求。fork出的子进程（任务进程池、导入时的哈希进程池）不继承后台线程，
+在子进程中换用新的队列并重新启动后台线程，子进程退出时写完剩余记录。
+JsonFormatter：每条记录输出为一行JSON，extra传入的字段一并输出。
+SamplingFilter：按比例采样低级别记录，用于逐行调试事件。
+
+配置示例见settings.LOGGING。
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import weakref
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# LogRecord自带的属性，其余属性视为通过extra传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+_exception_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # BackgroundHandler在入队前已把异常转为文本
+            payload['exc_info'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """只保留rate比例的、级别不高于max_level的记录，更高级别的记录全部保留"""
+
+    def __init__(self, rate=1.0, max_level='DEBUG'):
+        super().__init__()
+        self.rate = float(rate)
+        self.max_level = logging.getLevelName(max_level) if isinstance(max_level, str) else max_level
+
+    def filter(self, record):
+        return record.levelno > self.max_level or random.random() < self.rate
+
+
+class BackgroundHandler(QueueHandler):
+    """把记录放入有界队列，由后台线程交给StreamHandler格式化并写出"""
+
+    _instances = weakref.WeakSet()
+
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.StreamHandler(stream)
+        self.dropped = 0
+        self._start()
+        atexit.register(self.stop)
+        BackgroundHandler._instances.add(self)
+
+    def _start(self):
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        self._running = True
+
+    def _restart_in_child(self):
+        # 父进程的后台线程没有被fork过来，队列中的记录和锁的状态也不可靠，全部换新
+        if not self._running:
+            return
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.dropped = 0
+        self._start()
+        # multiprocessing的子进程以os._exit退出，不执行atexit，改用其退出回调
+        from multiprocessing import util
+        util.Finalize(self, self.stop, exitpriority=10)
+
+    def setFormatter(self, fmt):
+        # 格式化在后台线程中由目标handler完成
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # 消息参数在调用线程中合并：参数可能随后被修改，或在__str__中查询数据库；
+        # 异常转为文本，不把traceback和栈帧交给后台线程。格式化为JSON等仍在后台线程完成
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """写完队列中剩余的记录后停止后台线程，可重复调用"""
+        if self._running:
+            self._running = False
+            self.listener.stop()
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+def _restart_after_fork():
+    for handler in list(BackgroundHandler._instances):
+        handler._restart_in_child()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
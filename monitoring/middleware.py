@@ -0,0 +1,112 @@
+"""
+单次请求的SQL预算统计
+
+记录每个请求执行的查询条数、SQL总耗时、最慢的语句和重复次数最多的语句。
+DEBUG模式或管理员登录时通过响应头返回统计结果；超出预算时输出一条结构化（JSON）日志。
+
+预算通过settings.QUERY_BUDGET配置，可按URL名称单独覆盖，例如：
+    QUERY_BUDGET = {
+        'max_queries': 30,
+        'max_time_ms': 300,
+        'max_duplicates': 5,
+        'views': {'students:studentprofile-list': {'max_queries': 10}},
+    }
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('monitoring.querybudget')
+
+DEFAULT_BUDGET = {'max_queries': 30, 'max_time_ms': 500, 'max_duplicates': 5}
+HEADER_SQL_LENGTH = 200
+
+
+class QueryRecorder:
+    """作为execute_wrapper挂到数据库连接上，记录每条语句的耗时"""
+
+    def __init__(self):
+        self.queries = []  # (sql, 耗时毫秒)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - start) * 1000))
+
+    def summary(self):
+        total_ms = sum(duration for _, duration in self.queries)
+        slowest_sql, slowest_ms = max(self.queries, key=lambda item: item[1], default=('', 0))
+        # 语句中的参数为占位符，同一模板的语句视为重复
+        counts = Counter(sql for sql, _ in self.queries)
+        duplicated_sql, duplicates = counts.most_common(1)[0] if counts else ('', 0)
+        return {
+            'queries': len(self.queries),
+            'time_ms': round(total_ms, 2),
+            'slowest_ms': round(slowest_ms, 2),
+            'slowest_sql': slowest_sql,
+            'duplicates': duplicates,
+            'duplicated_sql': duplicated_sql,
+        }
+
+
+def get_budget(view_name):
+    config = getattr(settings, 'QUERY_BUDGET', {})
+    budget = {key: config.get(key, default) for key, default in DEFAULT_BUDGET.items()}
+    budget.update(config.get('views', {}).get(view_name, {}))
+    return budget
+
+
+def _header_sql(sql):
+    # 响应头不能包含换行，并截断过长的语句
+    return re.sub(r'\s+', ' ', sql).strip()[:HEADER_SQL_LENGTH]
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        stats = recorder.summary()
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response['X-Query-Count'] = str(stats['queries'])
+            response['X-Query-Time-Ms'] = str(stats['time_ms'])
+            if stats['queries']:
+                response['X-Query-Slowest'] = f"{stats['slowest_ms']}ms {_header_sql(stats['slowest_sql'])}"
+                response['X-Query-Most-Duplicated'] = f"{stats['duplicates']}x {_header_sql(stats['duplicated_sql'])}"
+
+        budget = get_budget(view_name)
+        exceeded = [
+            name for name, value in (('max_queries', stats['queries']), ('max_time_ms', stats['time_ms']),
+                                     ('max_duplicates', stats['duplicates']))
+            if value > budget[name]
+        ]
+        if exceeded:
+            logger.warning('query budget exceeded %s', json.dumps({
+                'event': 'query_budget_exceeded',
+                'method': request.method,
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                'exceeded': exceeded,
+                'budget': budget,
+                **stats,
+            }, ensure_ascii=False))
+        return response
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from notifications import outbox
+
+
+class Command(BaseCommand):
+    help = '立即发送发件箱中所有未发送的通知（同一收件人合并为一封邮件）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='每次send_messages发送的邮件数')
+
+    def handle(self, *args, **options):
+        sent = outbox.flush(options['batch_size'])
+        self.stdout.write(f'已发送 {sent} 封邮件')
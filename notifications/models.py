@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class Notification(models.Model):
+    """待发送的通知，发送时同一收件人的多条合并为一封摘要邮件"""
+    recipient = models.EmailField("收件人")
+    recipient_name = models.CharField("收件人姓名", max_length=100, blank=True)
+    message = models.TextField("内容")
+    created_at = models.DateTimeField("创建时间", auto_now_add=True)
+    sent_at = models.DateTimeField("发送时间", null=True, blank=True)
+    # 发送前先认领，同时执行的发送不会重复发送同一条通知
+    claimed_by = models.CharField("认领者", max_length=32, blank=True, default='')
+    claimed_at = models.DateTimeField("认领时间", null=True, blank=True)
+
+    class Meta:
+        verbose_name = '通知'
+        verbose_name_plural = '通知'
+        indexes = [
+            # 发送时按收件人读取未发送的通知
+            models.Index(fields=['sent_at', 'recipient'], name='notification_pending'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}：{self.message[:20]}'
@@ -0,0 +1,89 @@
+"""
+通知发件箱
+
+审核等操作只在当前事务中写入Notification，并安排一次延迟NOTIFICATION_DIGEST_DELAY秒的发送任务；
+延迟期间再产生的通知并入同一次发送（任务按去重键合并）。发送时同一收件人的通知合并为一封摘要邮件，
+每NOTIFICATION_BATCH_SIZE封邮件调用一次send_messages，所有批次共用同一个邮件连接。
+每批通知先以条件UPDATE认领再发送，同时执行的发送不会重复发送；认领后中断的通知超过CLAIM_TIMEOUT秒可被重新认领。
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification
+
+FLUSH_KEY = 'notifications:flush'
+CLAIM_TIMEOUT = 600
+
+
+def add(messages):
+    """messages为[(收件人邮箱, 收件人姓名, 内容)]，没有邮箱的跳过"""
+    from .tasks import flush_outbox
+
+    notifications = [Notification(recipient=email, recipient_name=name or '', message=message)
+                     for email, name, message in messages if email]
+    if not notifications:
+        return 0
+    Notification.objects.bulk_create(notifications)
+    flush_outbox.enqueue(key=FLUSH_KEY, delay=getattr(settings, 'NOTIFICATION_DIGEST_DELAY', 60))
+    return len(notifications)
+
+
+def digest(recipient, name, lines):
+    if len(lines) == 1:
+        subject = f'审核结果通知：{lines[0]}'
+    else:
+        subject = f'审核结果通知（{len(lines)}条）'
+    body = '\n'.join([f'{name or recipient}，您好：', '', *[f'· {line}' for line in lines], '',
+                      '请登录保研加分小助手查看详情。'])
+    return EmailMessage(subject, body, to=[recipient])
+
+
+def _claim(token, limit):
+    """认领最多limit个收件人的未发送通知"""
+    now = timezone.now()
+    claimable = Q(sent_at__isnull=True) & (Q(claimed_by='') | Q(claimed_at__lt=now - timedelta(seconds=CLAIM_TIMEOUT)))
+    recipients = list(Notification.objects.filter(claimable).order_by('recipient')
+                      .values_list('recipient', flat=True).distinct()[:limit])
+    if recipients:
+        # 以可认领为条件更新，其他发送者已认领的通知不会被覆盖
+        Notification.objects.filter(claimable, recipient__in=recipients).update(claimed_by=token, claimed_at=now)
+
+
+def _pending_digests(token, limit):
+    """认领并按收件人读取最多limit封摘要邮件的通知，返回[(邮件, 通知ID列表)]"""
+    _claim(token, limit)
+    grouped = {}
+    rows = (Notification.objects.filter(sent_at__isnull=True, claimed_by=token)
+            .order_by('recipient', 'id').values_list('id', 'recipient', 'recipient_name', 'message'))
+    for pk, recipient, name, message in rows:
+        entry = grouped.setdefault(recipient, [name, [], []])
+        entry[1].append(message)
+        entry[2].append(pk)
+    return [(digest(recipient, name, lines), ids) for recipient, (name, lines, ids) in grouped.items()]
+
+
+def flush(batch_size=None, connection=None):
+    """发送所有未发送的通知，返回发送的邮件数；发送失败时抛出异常，未发送的通知释放认领后保留"""
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100)
+    connection = connection or get_connection()
+    token = uuid.uuid4().hex
+    sent = 0
+    # 显式打开后，多次send_messages复用同一个SMTP连接
+    opened = connection.open()
+    try:
+        while True:
+            digests = _pending_digests(token, batch_size)
+            if not digests:
+                return sent
+            connection.send_messages([message for message, _ in digests])
+            Notification.objects.filter(pk__in=[pk for _, ids in digests for pk in ids]).update(sent_at=timezone.now())
+            sent += len(digests)
+    finally:
+        Notification.objects.filter(claimed_by=token, sent_at__isnull=True).update(claimed_by='', claimed_at=None)
+        if opened:
+            connection.close()
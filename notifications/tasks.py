@@ -0,0 +1,9 @@
+from taskqueue.queue import task
+
+from . import outbox
+
+
+@task(max_attempts=5, retry_delay=60)
+def flush_outbox():
+    """发送发件箱中的通知；SMTP失败时由任务队列退避重试"""
+    outbox.flush()
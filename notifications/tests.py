@@ -0,0 +1,96 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from taskqueue.models import Task
+
+from . import outbox
+from .models import Notification
+
+
+@override_settings(TASK_QUEUE_EAGER=False)
+class OutboxTest(TestCase):
+    def test_messages_grouped_into_one_digest_per_recipient(self):
+        outbox.add([('a@example.com', '张三', '「专利」审核通过'), ('', '无邮箱', '跳过')])
+        outbox.add([('b@example.com', '李四', '「竞赛」未通过审核'), ('a@example.com', '张三', '「论文」审核通过')])
+        self.assertEqual(Notification.objects.count(), 3)
+        # 延迟发送期间的多次通知只安排一次发送任务
+        self.assertEqual(Task.objects.filter(key=outbox.FLUSH_KEY).count(), 1)
+
+        self.assertEqual(outbox.flush(), 2)
+        digests = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(digests['a@example.com'].subject, '审核结果通知（2条）')
+        self.assertIn('「专利」审核通过', digests['a@example.com'].body)
+        self.assertIn('「论文」审核通过', digests['a@example.com'].body)
+        self.assertEqual(digests['b@example.com'].subject, '审核结果通知：「竞赛」未通过审核')
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(outbox.flush(), 0)
+
+    def test_batches_share_one_connection(self):
+        outbox.add([(f'u{n}@example.com', f'学生{n}', '「专利」审核通过') for n in range(5)])
+        connection = mock.Mock()
+        connection.open.return_value = True
+        self.assertEqual(outbox.flush(batch_size=2, connection=connection), 5)
+        self.assertEqual([len(call.args[0]) for call in connection.send_messages.call_args_list], [2, 2, 1])
+        connection.open.assert_called_once()
+        connection.close.assert_called_once()
+
+    def test_failed_send_keeps_messages_for_retry(self):
+        outbox.add([('a@example.com', '张三', '「专利」审核通过')])
+        connection = mock.Mock()
+        connection.send_messages.side_effect = OSError('SMTP不可用')
+        with self.assertRaises(OSError):
+            outbox.flush(connection=connection)
+        # 认领已释放，重试时可再次发送
+        self.assertTrue(Notification.objects.filter(sent_at__isnull=True, claimed_by='').exists())
+
+    def test_overlapping_flushes_send_each_digest_once(self):
+        outbox.add([('a@example.com', '张三', '「专利」审核通过')])
+        inner = mock.Mock()
+
+        def send_while_other_flush_runs(messages):
+            # 第一次发送尚未完成时另一个进程开始发送
+            self.assertEqual(outbox.flush(connection=inner), 0)
+
+        outer = mock.Mock()
+        outer.send_messages.side_effect = send_while_other_flush_runs
+        self.assertEqual(outbox.flush(connection=outer), 1)
+        inner.send_messages.assert_not_called()
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+    def test_stale_claim_can_be_taken_over(self):
+        outbox.add([('a@example.com', '张三', '「专利」审核通过')])
+        Notification.objects.update(claimed_by='crashed', claimed_at=timezone.now())
+        self.assertEqual(outbox.flush(), 0)
+        Notification.objects.update(claimed_at=timezone.now() - timedelta(seconds=outbox.CLAIM_TIMEOUT + 1))
+        self.assertEqual(outbox.flush(), 1)
+
+    def test_worker_sends_after_delay(self):
+        outbox.add([('a@example.com', '张三', '「专利」审核通过')])
+        call_command('run_tasks', once=True, stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 0)
+
+        Task.objects.update(run_after=Task.objects.get().created_at)
+        call_command('run_tasks', once=True, stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    @override_settings(TASK_QUEUE_EAGER=True)
+    def test_eager_mode_sends_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.add([('a@example.com', '张三', '「专利」审核通过')])
+            self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(TASK_QUEUE_EAGER=True)
+    def test_eager_send_failure_does_not_abort_review(self):
+        with mock.patch('notifications.outbox.get_connection') as get_connection:
+            get_connection.return_value.send_messages.side_effect = OSError('SMTP不可用')
+            with self.assertLogs('django', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                outbox.add([('a@example.com', '张三', '「专利」审核通过')])
+        self.assertTrue(Notification.objects.filter(sent_at__isnull=True).exists())
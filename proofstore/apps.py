@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class ProofstoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'proofstore'
+    verbose_name = '证明文件存储'
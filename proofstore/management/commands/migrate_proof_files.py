@@ -0,0 +1,83 @@
+"""
+把按上传日期保存的证明文件迁移到按内容寻址的存储
+
+逐批读取尚未迁移的记录，把原文件写入 <前缀>/ab/cd/<sha256>，更新数据库中的路径并登记引用，
+原文件不再被任何记录使用时删除。可以中断后重新执行，已迁移的记录会被跳过。
+
+    python manage.py migrate_proof_files --dry-run
+    python manage.py migrate_proof_files --batch-size 200
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from proofstore.models import TRACKED, ProofBlob, delete_if_unused, is_blob_name, set_reference
+from proofstore.storage import proof_storage
+
+
+def pending_rows(model, field_name, batch_size):
+    """按主键分批返回尚未迁移的(主键, 文件名)"""
+    last_pk = None
+    while True:
+        queryset = model._base_manager.exclude(**{field_name: ''}).order_by('pk')
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        batch = list(queryset.values_list('pk', field_name)[:batch_size])
+        if not batch:
+            return
+        last_pk = batch[-1][0]
+        yield [(pk, name) for pk, name in batch if not is_blob_name(name)]
+
+
+class Command(BaseCommand):
+    help = '把已有的证明文件迁移到按内容去重的存储，并更新数据库中的文件路径'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批处理的记录数')
+        parser.add_argument('--dry-run', action='store_true', help='只统计需要迁移的文件，不做修改')
+        parser.add_argument('--prune', action='store_true', help='同时删除没有任何引用的文件')
+
+    def handle(self, *args, **options):
+        storage = proof_storage()
+        for owner, (model, field_name) in TRACKED.items():
+            old_storage = model._meta.get_field(field_name).storage
+            migrated = missing = 0
+            for batch in pending_rows(model, field_name, options['batch_size']):
+                if options['dry_run']:
+                    migrated += len(batch)
+                    continue
+                # 同一批中引用同一原文件的记录只写入一次
+                new_names, old_names = {}, set()
+                with transaction.atomic():
+                    for pk, old_name in batch:
+                        if old_name not in new_names:
+                            if not old_storage.exists(old_name):
+                                self.stderr.write(f'{owner} #{pk}：文件不存在 {old_name}')
+                                missing += 1
+                                continue
+                            with old_storage.open(old_name) as content:
+                                new_names[old_name] = storage.save(old_name, content)
+                        model._base_manager.filter(pk=pk).update(**{field_name: new_names[old_name]})
+                        set_reference(owner, pk, new_names[old_name])
+                        old_names.add(old_name)
+                        migrated += 1
+                    transaction.on_commit(lambda names=old_names: self.delete_unused(names))
+            verb = '需要迁移' if options['dry_run'] else '已迁移'
+            self.stdout.write(f'{owner}：{verb} {migrated} 个文件，缺失 {missing} 个')
+
+        if options['prune'] and not options['dry_run']:
+            pruned = 0
+            for name in list(ProofBlob.objects.filter(references__isnull=True).values_list('name', flat=True)):
+                # 刚写入、引用尚未登记的文件跳过
+                if delete_if_unused(name, retry=False):
+                    pruned += 1
+            self.stdout.write(f'已删除 {pruned} 个没有引用的文件')
+
+    def delete_unused(self, names):
+        """删除不再被任何记录使用的原文件，批次之外的记录可能仍指向同一路径"""
+        storage = proof_storage()
+        still_used = set()
+        for model, field_name in TRACKED.values():
+            still_used.update(model._base_manager.filter(**{f'{field_name}__in': names})
+                              .values_list(field_name, flat=True))
+        for name in names - still_used:
+            storage.delete(name)
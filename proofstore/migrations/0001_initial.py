@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProofBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='存储路径')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('size', models.PositiveBigIntegerField(verbose_name='大小（字节）')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '证明文件',
+                'verbose_name_plural': '证明文件',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProofReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=100, verbose_name='引用方')),
+                ('owner_id', models.CharField(max_length=64, verbose_name='引用方主键')),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='references', to='proofstore.proofblob', verbose_name='文件')),
+            ],
+            options={
+                'verbose_name': '证明文件引用',
+                'verbose_name_plural': '证明文件引用',
+                'constraints': [models.UniqueConstraint(fields=('owner', 'owner_id'), name='proofreference_unique_owner')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proofstore', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proofblob',
+            name='saved_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='最近写入时间'),
+        ),
+    ]
@@ -0,0 +1,148 @@
+"""
+按内容寻址的证明文件及其引用
+
+每个不同内容的文件只保存一份（ProofBlob），提交记录、加分申请等引用它的记录各对应一行ProofReference；
+最后一个引用删除时连同文件一起删除。两个项目共用同一数据库和媒体目录，
+引用按“应用.模型.字段”区分，各项目只维护自己模型的引用。
+
+存储写入文件（登记ProofBlob）和记录保存后登记引用之间有一段间隔，其间文件没有引用；
+PROOF_RELEASE_GRACE秒内写入过的文件暂不删除，延迟到宽限期之后由后台任务再确认。
+"""
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.utils import timezone
+
+# 由ContentAddressedStorage生成的文件名，例如 proofs/ab/cd/<sha256>.pdf
+BLOB_NAME_RE = re.compile(r'^[\w-]+/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)?$')
+
+# 当前项目中登记的引用方：{应用.模型.字段: (模型, 字段名)}
+TRACKED = {}
+
+
+class ProofBlob(models.Model):
+    name = models.CharField("存储路径", max_length=255, primary_key=True)
+    sha256 = models.CharField("SHA-256", max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField("大小（字节）")
+    created_at = models.DateTimeField("创建时间", auto_now_add=True)
+    # 每次上传相同内容时刷新，宽限期内的文件即使没有引用也不删除
+    saved_at = models.DateTimeField("最近写入时间", default=timezone.now)
+
+    class Meta:
+        verbose_name = '证明文件'
+        verbose_name_plural = '证明文件'
+
+    def __str__(self):
+        return self.name
+
+
+class ProofReference(models.Model):
+    blob = models.ForeignKey(ProofBlob, verbose_name="文件", on_delete=models.CASCADE, related_name='references')
+    owner = models.CharField("引用方", max_length=100)  # 应用.模型.字段
+    owner_id = models.CharField("引用方主键", max_length=64)
+
+    class Meta:
+        verbose_name = '证明文件引用'
+        verbose_name_plural = '证明文件引用'
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'owner_id'], name='proofreference_unique_owner'),
+        ]
+
+
+def is_blob_name(name):
+    return bool(name) and BLOB_NAME_RE.match(name) is not None
+
+
+def owner_label(model, field_name):
+    return f'{model._meta.label_lower}.{field_name}'
+
+
+def set_reference(owner, owner_id, name, created=False):
+    """
+    让引用方指向name；原先指向的文件若不再被引用则删除。非本存储生成的文件名只解除原引用
+    created为True表示引用方是新建的记录，不会有原引用
+    """
+    owner_id = str(owner_id)
+    previous = None
+    if not created:
+        previous = (ProofReference.objects.filter(owner=owner, owner_id=owner_id)
+                    .values_list('blob_id', flat=True).first())
+    if previous == name:
+        return
+    if previous is not None:
+        ProofReference.objects.filter(owner=owner, owner_id=owner_id).delete()
+    if is_blob_name(name):
+        # 文件记录由存储在写入文件时创建
+        ProofReference.objects.create(blob_id=name, owner=owner, owner_id=owner_id)
+    if previous is not None:
+        release_if_unused(previous)
+
+
+def remove_reference(owner, owner_id):
+    name = ProofReference.objects.filter(owner=owner, owner_id=str(owner_id)).values_list('blob_id', flat=True).first()
+    if name is not None:
+        ProofReference.objects.filter(owner=owner, owner_id=str(owner_id)).delete()
+        release_if_unused(name)
+
+
+def release_grace():
+    return getattr(settings, 'PROOF_RELEASE_GRACE', 60)
+
+
+def delete_if_unused(name, retry=True):
+    """
+    删除没有引用、且宽限期内没有再次写入的文件，返回是否删除
+    最近写入过的文件可能正被上传中的记录使用，retry为True时宽限期后由后台任务再确认一次
+    """
+    from .storage import proof_storage
+
+    grace = release_grace()
+    unused = ProofBlob.objects.filter(pk=name, references__isnull=True)
+    with transaction.atomic():
+        # 行删除和文件删除在同一事务中：同时上传的一方等到提交后才能登记，发现文件已删除时重新写入
+        if unused.filter(saved_at__lte=timezone.now() - timedelta(seconds=grace)).delete()[0]:
+            proof_storage().delete_blob(name)
+            return True
+    if retry and unused.exists():
+        from .tasks import release_blob
+        release_blob.enqueue(name, key=f'proofstore:release:{name}', delay=grace)
+    return False
+
+
+def release_if_unused(name):
+    """没有引用的文件在事务提交后删除；删除前再次确认，避免与同时上传的相同文件冲突"""
+    transaction.on_commit(lambda: delete_if_unused(name))
+
+
+def _file_name(value):
+    return (value if isinstance(value, str) else getattr(value, 'name', None)) or ''
+
+
+def track(model, field_name):
+    """登记引用证明文件的模型字段：保存、修改或删除记录时同步引用"""
+    owner = owner_label(model, field_name)
+    remembered = f'_proof_{field_name}'
+
+    def remember(sender, instance, **kwargs):
+        # 只读取已加载的值，延迟加载的字段不触发查询
+        instance.__dict__[remembered] = _file_name(instance.__dict__.get(field_name))
+
+    def saved(sender, instance, created, **kwargs):
+        name = _file_name(instance.__dict__.get(field_name))
+        if created and not is_blob_name(name):
+            return
+        if created or name != instance.__dict__.get(remembered):
+            set_reference(owner, instance.pk, name, created)
+            instance.__dict__[remembered] = name
+
+    def deleted(sender, instance, **kwargs):
+        remove_reference(owner, instance.pk)
+
+    uid = f'proofstore:{owner}'
+    post_init.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(saved, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=uid)
+    TRACKED[owner] = (model, field_name)
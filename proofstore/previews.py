@@ -0,0 +1,115 @@
+"""
+证明文件预览图
+
+图片按长边缩小到PROOF_PREVIEW_SIZE像素并转存为WebP（Pillow不支持WebP时用JPEG），PDF生成首页占位图。
+预览图保存在原文件旁：<原文件名>.preview.webp。新文件写入后交给后台任务生成，
+请求预览时若文件缺失则当场生成。Pillow为可选依赖，未安装时不提供预览。
+"""
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageOps, features
+except ImportError:  # Pillow为可选依赖
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tif', '.tiff'}
+PDF_EXTENSIONS = {'.pdf'}
+PREVIEW_MARK = '.preview'
+
+
+def preview_format():
+    return 'WEBP' if Image is not None and features.check('webp') else 'JPEG'
+
+
+def preview_name(name):
+    extension = '.webp' if preview_format() == 'WEBP' else '.jpg'
+    return f'{name}{PREVIEW_MARK}{extension}'
+
+
+def has_preview(name):
+    """是否能为该文件生成预览"""
+    extension = os.path.splitext(name or '')[1].lower()
+    return Image is not None and extension in IMAGE_EXTENSIONS | PDF_EXTENSIONS
+
+
+def _pdf_placeholder(size):
+    # 不依赖外部渲染工具，按A4比例画一张带“PDF”字样的页面
+    width, height = int(size * 0.707), size
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([0, 0, width - 1, height - 1], outline='#adb5bd', width=2)
+    for top in range(height // 3, height * 5 // 6, max(height // 20, 4)):
+        draw.line([width // 8, top, width * 7 // 8, top], fill='#dee2e6', width=2)
+    font = ImageFont.load_default(size=max(size // 8, 10))
+    draw.text((width // 2, height // 6), 'PDF', fill='#dc3545', font=font, anchor='mm')
+    return image
+
+
+def render_preview(source, target, size, image_format):
+    """生成预览图并原子地写入target"""
+    if os.path.splitext(source)[1].lower() in PDF_EXTENSIONS:
+        image = _pdf_placeholder(size)
+    else:
+        with Image.open(source) as original:
+            # JPEG在解码时直接按比例缩小，避免解出整张手机照片
+            original.draft('RGB', (size, size))
+            image = ImageOps.exif_transpose(original)
+            image.thumbnail((size, size))
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, 'white')
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(target), suffix='.tmp', delete=False) as temporary:
+        try:
+            image.save(temporary, image_format, quality=75)
+        except BaseException:
+            os.unlink(temporary.name)
+            raise
+    os.replace(temporary.name, target)
+    return target
+
+
+def render_or_log(source, target):
+    """生成预览图；文件损坏或不是图片时记录告警并返回False，重试也不会成功"""
+    try:
+        render_preview(source, target, _preview_size(), preview_format())
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning('生成预览图失败 %s', source, exc_info=True)
+        return False
+    return True
+
+
+def ensure_preview(storage, name):
+    """返回预览图的存储路径，缺失时当场生成；无法生成时返回None"""
+    if not has_preview(name):
+        return None
+    target = preview_name(name)
+    if storage.exists(target) or render_or_log(storage.path(name), storage.path(target)):
+        return target
+    return None
+
+
+def delete_preview(storage, name):
+    for extension in ('.webp', '.jpg'):
+        storage.delete(f'{name}{PREVIEW_MARK}{extension}')
+
+
+def _preview_size():
+    return getattr(settings, 'PROOF_PREVIEW_SIZE', 320)
+
+
+def schedule(storage, name):
+    """新文件写入后由后台任务生成预览"""
+    from .tasks import generate_preview
+    if has_preview(name):
+        target = preview_name(name)
+        generate_preview.enqueue(storage.path(name), storage.path(target), key=f'proof-preview:{name}')
@@ -0,0 +1,153 @@
+"""
+证明文件下载响应
+
+支持条件请求（If-None-Match / If-Modified-Since，未变化时返回304）和单段Range请求（206）。
+配置PROOF_SENDFILE后只返回X-Accel-Redirect（nginx）或X-Sendfile（Apache/lighttpd）头，
+由前端代理读取并发送文件，Python进程不再复制文件内容：
+
+    PROOF_SENDFILE = 'x-accel-redirect'
+    PROOF_SENDFILE_PREFIX = '/protected-media/'   # nginx中对应MEDIA_ROOT的internal location
+
+预览图与原文件使用同样的方式发送。权限由调用方检查。
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import (
+    content_disposition_header, http_date, parse_etags, parse_http_date_safe, quote_etag,
+)
+
+from . import previews
+from .models import is_blob_name
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _RangeFile:
+    """只读出文件中指定长度的内容，交给FileResponse逐块发送"""
+
+    def __init__(self, file, length):
+        self.file, self.remaining = file, length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(name, stat):
+    # 内容寻址的文件名本身就是内容的哈希；其他文件用大小和修改时间
+    if is_blob_name(name):
+        return quote_etag(os.path.splitext(os.path.basename(name))[0])
+    return quote_etag(f'{stat.st_size:x}-{int(stat.st_mtime):x}')
+
+
+def parse_range(header, size):
+    """解析单段Range头，返回(起始, 结束)（含结束位置）；多段或格式不对返回None，超出范围返回False"""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # bytes=-500 表示最后500字节
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return etag in parse_etags(value)
+    return parse_http_date_safe(value) == last_modified
+
+
+def serve_proof(request, field_file, download_name=None):
+    """返回FileField中文件的下载响应，download_name为浏览器保存时使用的文件名（不含扩展名）"""
+    if not field_file:
+        raise Http404('没有证明文件')
+    return serve_file(request, field_file.storage, field_file.name, download_name)
+
+
+def serve_preview(request, field_file, download_name=None):
+    """返回证明文件预览图的响应，预览图缺失时当场生成"""
+    name = previews.ensure_preview(field_file.storage, field_file.name) if field_file else None
+    if name is None:
+        raise Http404('该文件没有预览图')
+    return serve_file(request, field_file.storage, name, download_name and f'{download_name}-预览')
+
+
+def serve_file(request, storage, name, download_name=None):
+    try:
+        path = storage.path(name)
+        stat = os.stat(path)
+    except (OSError, NotImplementedError):
+        raise Http404('证明文件不存在')
+    etag, last_modified = file_etag(name, stat), int(stat.st_mtime)
+    filename = os.path.basename(name)
+    if download_name:
+        filename = download_name + os.path.splitext(name)[1]
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        sendfile = getattr(settings, 'PROOF_SENDFILE', None)
+        if sendfile:
+            response = _sendfile_response(sendfile, name, path, filename)
+        else:
+            response = _file_response(request, path, stat.st_size, etag, last_modified, filename)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # 允许浏览器缓存，但每次使用前都要确认文件未变化
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _sendfile_response(sendfile, name, path, filename):
+    # Range请求由代理自行处理
+    content_type, _ = mimetypes.guess_type(filename)
+    response = HttpResponse(content_type=content_type or 'application/octet-stream')
+    if sendfile == 'x-accel-redirect':
+        prefix = getattr(settings, 'PROOF_SENDFILE_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + name
+    else:
+        response['X-Sendfile'] = path
+    response['Content-Disposition'] = content_disposition_header(False, filename)
+    return response
+
+
+def _file_response(request, path, size, etag, last_modified, filename):
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and _if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.META['HTTP_RANGE'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, filename=filename)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(_RangeFile(file, end - start + 1), filename=filename, status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
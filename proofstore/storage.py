@@ -0,0 +1,95 @@
+"""
+按内容寻址的文件存储
+
+上传的文件在写入临时文件的同时计算SHA-256，按哈希值保存到 <前缀>/ab/cd/<sha256><扩展名>，
+相同内容只保存一份。分两级子目录，避免单个目录下文件过多。
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from . import previews
+
+INCOMING_DIR = '.incoming'
+EXTENSION_RE = re.compile(r'^\.[a-z0-9]{1,10}$')
+
+
+def blob_name(prefix, digest, extension):
+    return f'{prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, prefix=None, **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix or getattr(settings, 'PROOF_STORAGE_PREFIX', 'proofs')
+
+    def get_available_name(self, name, max_length=None):
+        # 最终文件名由内容决定，同名即同内容，无需避让
+        return name
+
+    def _save(self, name, content):
+        from .models import ProofBlob
+
+        extension = os.path.splitext(name)[1].lower()
+        if not EXTENSION_RE.match(extension):
+            extension = ''
+        incoming = self.path(f'{self.prefix}/{INCOMING_DIR}')
+        os.makedirs(incoming, exist_ok=True)
+
+        digest, size = hashlib.sha256(), 0
+        with tempfile.NamedTemporaryFile(dir=incoming, delete=False) as temporary:
+            try:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temporary.write(chunk)
+            except BaseException:
+                os.unlink(temporary.name)
+                raise
+
+        final_name = blob_name(self.prefix, digest.hexdigest(), extension)
+        final_path = self.path(final_name)
+        # 先登记文件（已存在时刷新写入时间）再检查磁盘：同时进行的释放若已删除文件，登记要等它提交，
+        # 随后发现文件不存在而重新写入；尚未删除的，刷新后的写入时间让释放跳过这个文件
+        now = timezone.now()
+        if not ProofBlob.objects.filter(pk=final_name).update(saved_at=now):
+            ProofBlob.objects.get_or_create(name=final_name, defaults={
+                'sha256': digest.hexdigest(), 'size': size, 'saved_at': now,
+            })
+        if os.path.exists(final_path):
+            os.unlink(temporary.name)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary.name, self.file_permissions_mode)
+            # 同一文件系统内的原子改名，并发上传相同内容时结果相同
+            os.replace(temporary.name, final_path)
+            previews.schedule(self, final_name)
+        return final_name
+
+    def delete_blob(self, name):
+        """删除文件、预览图及因此变空的两级子目录"""
+        self.delete(name)
+        previews.delete_preview(self, name)
+        directory = os.path.dirname(self.path(name))
+        for _ in range(2):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+_storage = ContentAddressedStorage()
+
+
+def proof_storage():
+    """FileField的storage参数，迁移文件中只记录这个函数"""
+    return _storage
@@ -0,0 +1,15 @@
+from taskqueue.queue import task
+
+from . import models, previews
+
+
+@task()
+def generate_preview(source, target):
+    """生成证明文件的预览图；参数为文件路径，可在进程池中执行"""
+    previews.render_or_log(source, target)
+
+
+@task()
+def release_blob(name):
+    """宽限期后再次确认没有引用的文件，仍没有引用时删除"""
+    models.delete_if_unused(name, retry=False)
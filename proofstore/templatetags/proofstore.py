@@ -0,0 +1,11 @@
+from django import template
+
+from proofstore.previews import has_preview as _has_preview
+
+register = template.Library()
+
+
+@register.filter
+def has_preview(field_file):
+    """证明文件能否显示预览图：{% if submission.proof_file|has_preview %}"""
+    return bool(field_file) and _has_preview(field_file.name)
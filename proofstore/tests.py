@@ -0,0 +1,193 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import skipIf
+
+from django.core.files.base import ContentFile
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from .models import ProofBlob, ProofReference, is_blob_name, release_if_unused, set_reference, remove_reference
+from . import previews
+from .serving import serve_preview, serve_proof
+from .storage import ContentAddressedStorage, proof_storage
+from .tasks import release_blob
+
+
+@override_settings(TASK_QUEUE_EAGER=True)
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.storage = ContentAddressedStorage(location=self.media_root)
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.storage.save('获奖证书.PDF', ContentFile(b'certificate'))
+        second = self.storage.save('copy.pdf', ContentFile(b'certificate'))
+        digest = hashlib.sha256(b'certificate').hexdigest()
+        self.assertEqual(first, f'proofs/{digest[:2]}/{digest[2:4]}/{digest}.pdf')
+        self.assertEqual(first, second)
+        self.assertTrue(is_blob_name(first))
+        self.assertEqual(ProofBlob.objects.get().size, len(b'certificate'))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'proofs', '.incoming')), [])
+
+    def test_unusual_extension_is_dropped(self):
+        name = self.storage.save('proof.p d f', ContentFile(b'x'))
+        self.assertTrue(name.endswith(hashlib.sha256(b'x').hexdigest()))
+
+
+class ProofReferenceTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, TASK_QUEUE_EAGER=True, PROOF_RELEASE_GRACE=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = proof_storage()
+
+    def test_file_removed_with_last_reference(self):
+        name = self.storage.save('a.pdf', ContentFile(b'shared'))
+        with self.captureOnCommitCallbacks(execute=True):
+            set_reference('students.submission.proof_file', 1, name, created=True)
+            set_reference('score_helper.scoreapplication.proof_file', 1, name, created=True)
+        self.assertEqual(ProofReference.objects.filter(blob_id=name).count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_reference('students.submission.proof_file', 1)
+        self.assertTrue(self.storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_reference('score_helper.scoreapplication.proof_file', 1)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(ProofBlob.objects.exists())
+        # 空的分片目录一并删除
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'proofs')), ['.incoming'])
+
+    def test_replacing_file_releases_previous(self):
+        old = self.storage.save('a.pdf', ContentFile(b'old'))
+        new = self.storage.save('b.pdf', ContentFile(b'new'))
+        with self.captureOnCommitCallbacks(execute=True):
+            set_reference('students.submission.proof_file', 1, old, created=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            set_reference('students.submission.proof_file', 1, new)
+        self.assertFalse(self.storage.exists(old))
+        self.assertEqual(ProofReference.objects.get().blob_id, new)
+
+    @override_settings(PROOF_RELEASE_GRACE=60)
+    def test_release_skips_blob_reuploaded_before_reference(self):
+        # 旧记录释放与新记录上传相同内容同时发生：新上传已写入文件、引用尚未登记时不能删除文件
+        name = self.storage.save('a.pdf', ContentFile(b'shared'))
+        ProofBlob.objects.filter(pk=name).update(saved_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.storage.save('b.pdf', ContentFile(b'shared')), name)
+        with self.captureOnCommitCallbacks(execute=True):
+            release_if_unused(name)
+        self.assertTrue(self.storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            set_reference('students.submission.proof_file', 1, name, created=True)
+        self.assertTrue(ProofBlob.objects.filter(pk=name).exists())
+
+        # 宽限期后仍没有引用的文件由后台任务删除
+        ProofReference.objects.all().delete()
+        ProofBlob.objects.filter(pk=name).update(saved_at=timezone.now() - timedelta(hours=1))
+        release_blob(name)
+        self.assertFalse(self.storage.exists(name))
+
+    def test_upload_rewrites_file_deleted_by_release(self):
+        name = self.storage.save('a.pdf', ContentFile(b'shared'))
+        with self.captureOnCommitCallbacks(execute=True):
+            release_if_unused(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertEqual(self.storage.save('b.pdf', ContentFile(b'shared')), name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertTrue(ProofBlob.objects.filter(pk=name).exists())
+
+
+@override_settings(TASK_QUEUE_EAGER=True)
+class ServeProofTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        storage = ContentAddressedStorage(location=self.media_root)
+        self.file = SimpleNamespace(storage=storage, name=storage.save('a.pdf', ContentFile(b'0123456789')))
+        self.factory = RequestFactory()
+
+    def serve(self, **headers):
+        return serve_proof(self.factory.get('/', headers=headers), self.file, '证明材料-1')
+
+    def test_full_and_conditional(self):
+        response = self.serve()
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn("filename*=utf-8''", response['Content-Disposition'])
+        self.assertEqual(self.serve(if_none_match=response['ETag']).status_code, 304)
+        self.assertEqual(self.serve(if_modified_since=response['Last-Modified']).status_code, 304)
+
+    def test_range(self):
+        response = self.serve(range='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+        self.assertEqual(b''.join(self.serve(range='bytes=-3').streaming_content), b'789')
+        self.assertEqual(self.serve(range='bytes=20-').status_code, 416)
+        # If-Range不匹配时返回完整文件
+        self.assertEqual(self.serve(range='bytes=2-4', if_range='"stale"').status_code, 200)
+
+    @override_settings(PROOF_SENDFILE='x-accel-redirect', PROOF_SENDFILE_PREFIX='/protected/')
+    def test_sendfile(self):
+        response = self.serve()
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.file.name}')
+        self.assertEqual(response.content, b'')
+
+
+@skipIf(previews.Image is None, 'Pillow未安装')
+@override_settings(TASK_QUEUE_EAGER=True, PROOF_PREVIEW_SIZE=64)
+class PreviewTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.storage = ContentAddressedStorage(location=self.media_root)
+
+    def photo(self, size=(400, 300), mode='RGB', image_format='JPEG'):
+        buffer = io.BytesIO()
+        previews.Image.new(mode, size, 'red').save(buffer, image_format)
+        return ContentFile(buffer.getvalue())
+
+    def test_preview_generated_on_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            name = self.storage.save('photo.JPG', self.photo())
+        with previews.Image.open(self.storage.path(previews.preview_name(name))) as preview:
+            self.assertEqual(preview.size, (64, 48))
+        self.assertEqual(previews.ensure_preview(self.storage, name), previews.preview_name(name))
+
+        self.storage.delete_blob(name)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'proofs')), ['.incoming'])
+
+    def test_transparent_png_and_pdf_placeholder(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            png = self.storage.save('a.png', self.photo((32, 32), 'RGBA', 'PNG'))
+            pdf = self.storage.save('a.pdf', ContentFile(b'%PDF-1.4'))
+        for name in (png, pdf):
+            self.assertTrue(self.storage.exists(previews.preview_name(name)))
+
+    def test_missing_preview_regenerated_on_request(self):
+        name = self.storage.save('photo.jpg', self.photo())
+        self.storage.delete(previews.preview_name(name))
+        response = serve_preview(RequestFactory().get('/'), SimpleNamespace(storage=self.storage, name=name))
+        self.assertEqual(response['Content-Type'], 'image/webp' if previews.preview_format() == 'WEBP' else 'image/jpeg')
+        self.assertTrue(self.storage.exists(previews.preview_name(name)))
+
+    def test_documents_and_broken_images_have_no_preview(self):
+        docx = self.storage.save('a.docx', ContentFile(b'doc'))
+        with self.assertLogs('proofstore.previews', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            broken = self.storage.save('b.jpg', ContentFile(b'not an image'))
+        self.assertIsNone(previews.ensure_preview(self.storage, docx))
+        with self.assertLogs('proofstore.previews', 'WARNING'):
+            self.assertIsNone(previews.ensure_preview(self.storage, broken))
+        with self.assertRaises(Http404):
+            serve_preview(RequestFactory().get('/'), SimpleNamespace(storage=self.storage, name=docx))
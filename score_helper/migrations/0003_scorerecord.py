@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('score_helper', '0002_academicscore_application_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('academic', '学业加分'), ('performance', '表现加分')], max_length=20, verbose_name='加分类型')),
+                ('score', models.FloatField(verbose_name='最终加分值')),
+                ('created_time', models.DateTimeField(default=django.utils.timezone.now, verbose_name='记录时间')),
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='score_record', to='score_helper.scoreapplication', verbose_name='关联申请')),
+                ('student', models.ForeignKey(limit_choices_to={'role': 'STUDENT'}, on_delete=django.db.models.deletion.CASCADE, related_name='score_records', to=settings.AUTH_USER_MODEL, verbose_name='学生')),
+            ],
+            options={
+                'verbose_name': '加分记录',
+                'verbose_name_plural': '加分记录',
+                'ordering': ['-created_time'],
+            },
+        ),
+    ]
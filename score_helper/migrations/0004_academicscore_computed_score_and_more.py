@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:37
+
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 500
+
+# 核算规则按回填时的版本复制到这里（逐行计算，与score_helper.scoring的结果一致），不随后续修改变化
+SCORE_CAP = 15
+COMPETITION_BASE = {
+    ("national_a_plus", "first"): 30, ("national_a_plus", "second"): 15,
+    ("national_a_plus", "third"): 10, ("national_a", "first"): 15,
+    ("national_a", "second"): 10, ("national_a", "third"): 5,
+    ("national_a_minus", "first"): 10, ("national_a_minus", "second"): 5,
+    ("national_a_minus", "third"): 2, ("provincial_a", "first"): 5,
+    ("provincial_a", "second"): 2,
+}
+COMPETITION_RATIO = {"first": 1 / 3, "second": 1 / 4, "other": 1 / 5, "individual": 1 / 3}
+PAPER_BASE = {"a": 10, "b": 6, "c": 1}
+PAPER_AUTHOR_RATIO = {"independent": 1.0, "first": 0.8, "second": 0.2}
+VOLUNTEER_HOURS_THRESHOLD = 200
+CADRE_COEFFICIENT = {"monitor": 1.0, "minister": 0.75, "member": 0.5}
+CADRE_CAP = 2
+HONOR_SCORE = {"national": 2, "provincial": 1, "school": 0.2}
+
+
+def academic_score(record):
+    if record.score_type == "competition" and record.competition_level and record.competition_rank:
+        if not record.is_group:
+            role = "individual"
+        elif record.group_role in ("first", "second"):
+            role = record.group_role
+        else:
+            role = "other"
+        base = COMPETITION_BASE.get((record.competition_level, record.competition_rank), 0)
+        return round(min(base * COMPETITION_RATIO[role], SCORE_CAP), 2)
+    if record.score_type == "paper" and record.paper_level and record.paper_author:
+        base = PAPER_BASE[record.paper_level] * PAPER_AUTHOR_RATIO[record.paper_author]
+        return round(min(base, SCORE_CAP), 2)
+    if record.score_type == "patent":
+        return round(min(2 * 0.8, SCORE_CAP), 2)
+    if record.score_type == "innovation":
+        return round(min(1.0, SCORE_CAP), 2)
+    return 0
+
+
+def performance_score(record):
+    score = 0
+    if record.score_type == "volunteer" and record.volunteer_hours:
+        actual_hours = record.volunteer_hours / 2 if record.is_large_event else record.volunteer_hours
+        if actual_hours >= VOLUNTEER_HOURS_THRESHOLD:
+            score = 1 + ((actual_hours - VOLUNTEER_HOURS_THRESHOLD) / 2) * 0.05
+        score = min(score, 1)
+    elif record.score_type == "cadre" and record.cadre_role and record.cadre_score:
+        score = min(CADRE_COEFFICIENT[record.cadre_role] * (record.cadre_score / 100), CADRE_CAP)
+    elif record.score_type == "honor" and record.honor_level:
+        score = HONOR_SCORE[record.honor_level]
+    return round(score, 2)
+
+
+def backfill_computed_scores(apps, schema_editor):
+    # 按主键分批核算并回填，每批一个事务，避免长时间锁表
+    db_alias = schema_editor.connection.alias
+    for model_name, scorer in (('AcademicScore', academic_score), ('PerformanceScore', performance_score)):
+        model = apps.get_model('score_helper', model_name)
+        last_pk = 0
+        while True:
+            with transaction.atomic(using=db_alias):
+                records = list(model.objects.using(db_alias).filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+                if not records:
+                    break
+                for record in records:
+                    record.computed_score = scorer(record)
+                model.objects.using(db_alias).bulk_update(records, ['computed_score'])
+                last_pk = records[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # 回填按批次各自提交事务
+    atomic = False
+
+    dependencies = [
+        ('score_helper', '0003_scorerecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academicscore',
+            name='computed_score',
+            field=models.FloatField(db_default=0, default=0, editable=False, verbose_name='核算分数'),
+        ),
+        migrations.AddField(
+            model_name='performancescore',
+            name='computed_score',
+            field=models.FloatField(db_default=0, default=0, editable=False, verbose_name='核算分数'),
+        ),
+        migrations.RunPython(backfill_computed_scores, migrations.RunPython.noop),
+    ]
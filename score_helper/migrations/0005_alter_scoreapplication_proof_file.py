@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:09
+
+import proofstore.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('score_helper', '0004_academicscore_computed_score_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='scoreapplication',
+            name='proof_file',
+            field=models.FileField(storage=proofstore.storage.proof_storage, upload_to='proofs/%Y/%m/%d/', verbose_name='证明文件（图片/文档）'),
+        ),
+    ]
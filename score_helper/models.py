@@ -3,6 +3,12 @@ from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
+from proofstore.models import track as track_proof_file
+from proofstore.storage import proof_storage
+from versioning.models import track as track_versions
+
+from .scoring import academic_scores, performance_scores
+
 
 class User(AbstractUser):
     class Role(models.TextChoices):
@@ -37,6 +43,14 @@ class User(AbstractUser):
         return f"{self.username}（{self.get_role_display()}）"
 
 
+def _refresh_computed_score(record, save_kwargs):
+    """保存加分明细前按当前字段重新核算分数；指定了update_fields时一并写入核算分数"""
+    record.computed_score = record.calculate_score()
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None:
+        save_kwargs['update_fields'] = {*update_fields, 'computed_score'}
+
+
 class AcademicScore(models.Model):
     application = models.ForeignKey(
         'ScoreApplication', on_delete=models.SET_NULL,
@@ -62,44 +76,18 @@ class AcademicScore(models.Model):
                                    blank=True, null=True)
     paper_author = models.CharField("作者排名", max_length=15, choices=PAPER_AUTHOR, blank=True, null=True)
     remark = models.CharField("备注", max_length=200, blank=True)
+    computed_score = models.FloatField("核算分数", default=0, db_default=0, editable=False)
     created_time = models.DateTimeField("创建时间", auto_now_add=True)
 
     def __str__(self):
         return f"{self.user.username}的{self.get_score_type_display()}加分"
 
     def calculate_score(self):
-        score = 0
-        if self.score_type == "competition" and self.competition_level and self.competition_rank:
-            competition_score_map = {
-                ("national_a_plus", "first"): 30, ("national_a_plus", "second"): 15,
-                ("national_a_plus", "third"): 10, ("national_a", "first"): 15,
-                ("national_a", "second"): 10, ("national_a", "third"): 5,
-                ("national_a_minus", "first"): 10, ("national_a_minus", "second"): 5,
-                ("national_a_minus", "third"): 2, ("provincial_a", "first"): 5,
-                ("provincial_a", "second"): 2
-            }
-            base_score = competition_score_map.get((self.competition_level, self.competition_rank), 0)
-            if self.is_group:
-                if self.group_role == "first":
-                    score = base_score * (1 / 3)
-                elif self.group_role == "second":
-                    score = base_score * (1 / 4)
-                else:
-                    score = base_score * (1 / 5)
-            else:
-                score = base_score * (1 / 3)
-            return round(min(score, 15), 2)
-        elif self.score_type == "paper" and self.paper_level and self.paper_author:
-            paper_base_map = {"a": 10, "b": 6, "c": 1}
-            base_score = paper_base_map[self.paper_level]
-            author_ratio_map = {"independent": 1.0, "first": 0.8, "second": 0.2}
-            score = base_score * author_ratio_map[self.paper_author]
-            return round(min(score, 15), 2)
-        elif self.score_type == "patent":
-            return round(min(2 * 0.8, 15), 2)
-        elif self.score_type == "innovation":
-            return round(min(1.0, 15), 2)
-        return 0
+        return academic_scores([self])[0]
+
+    def save(self, *args, **kwargs):
+        _refresh_computed_score(self, kwargs)
+        super().save(*args, **kwargs)
 
 
 class PerformanceScore(models.Model):
@@ -119,28 +107,18 @@ class PerformanceScore(models.Model):
     HONOR_LEVEL = [("national", "国家级"), ("provincial", "省级"), ("school", "校级")]
     honor_level = models.CharField("荣誉级别", max_length=20, choices=HONOR_LEVEL, blank=True, null=True)
     remark = models.CharField("备注", max_length=200, blank=True)
+    computed_score = models.FloatField("核算分数", default=0, db_default=0, editable=False)
     created_time = models.DateTimeField("创建时间", auto_now_add=True)
 
     def __str__(self):
         return f"{self.user.username}的{self.get_score_type_display()}加分"
 
     def calculate_score(self):
-        score = 0
-        if self.score_type == "volunteer" and self.volunteer_hours:
-            actual_hours = self.volunteer_hours / 2 if self.is_large_event else self.volunteer_hours
-            if actual_hours >= 200:
-                extra = ((actual_hours - 200) / 2) * 0.05
-                score = 1 + extra
-            score = min(score, 1)
-        elif self.score_type == "cadre" and self.cadre_role and self.cadre_score:
-            cadre_coefficient_map = {"monitor": 1.0, "minister": 0.75, "member": 0.5}
-            coefficient = cadre_coefficient_map[self.cadre_role]
-            score = coefficient * (self.cadre_score / 100)
-            score = min(score, 2)
-        elif self.score_type == "honor" and self.honor_level:
-            honor_score_map = {"national": 2, "provincial": 1, "school": 0.2}
-            score = honor_score_map[self.honor_level]
-        return round(score, 2)
+        return performance_scores([self])[0]
+
+    def save(self, *args, **kwargs):
+        _refresh_computed_score(self, kwargs)
+        super().save(*args, **kwargs)
 
 
 class ScoreApplication(models.Model):
@@ -158,7 +136,7 @@ class ScoreApplication(models.Model):
     )
     self_score = models.FloatField(verbose_name="自评分数")
     score_item = models.CharField(max_length=200, verbose_name="加分项目详情")
-    proof_file = models.FileField(upload_to='proofs/%Y/%m/%d/', verbose_name="证明文件（图片/文档）")
+    proof_file = models.FileField(upload_to='proofs/%Y/%m/%d/', storage=proof_storage, verbose_name="证明文件（图片/文档）")
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, verbose_name="审批状态")
     approved_score = models.FloatField(null=True, blank=True, verbose_name="审批通过分数")
     reject_reason = models.TextField(null=True, blank=True, verbose_name="驳回理由")
@@ -178,6 +156,15 @@ class ScoreApplication(models.Model):
         return f"{self.student.username}的{self.get_apply_type_display()}申请（{self.get_status_display()}）"
 
 
+# 证明文件按内容去重保存，引用随申请的保存和删除同步
+track_proof_file(ScoreApplication, 'proof_file')
+
+# 加分申请、明细和记录写入时递增数据版本号，按版本号缓存的核算结果随之失效
+track_versions(ScoreApplication, per_object=False)
+track_versions(AcademicScore, per_object=False)
+track_versions(PerformanceScore, per_object=False)
+
+
 # 新增：补充缺失的 ScoreRecord 模型（用于记录最终通过的加分）
 class ScoreRecord(models.Model):
     student = models.ForeignKey(
@@ -204,6 +191,9 @@ class ScoreRecord(models.Model):
         return f"{self.student.username}的{self.get_type_display()}记录（{self.score}分）"
 
 
+track_versions(ScoreRecord, per_object=False)
+
+
 class ScoreClause(models.Model):
     category = models.CharField(max_length=100, verbose_name="条款类别")
     content = models.TextField(verbose_name="条款内容")
@@ -0,0 +1,194 @@
+"""
+批量加分核算
+
+学业加分的输入全部是枚举字段，模块加载时按规则把每种组合的最终得分预先算好，
+核算时每行只做一次查表；表现加分中的志愿时长和辅导员打分是数值列，
+安装了NumPy时按列向量化计算，否则逐行计算。两种方式与逐行规则的结果完全一致。
+
+输入可以是查询集（只取核算需要的列，一次查询）、模型实例列表，
+或 {字段名: 值列表} 形式的按列数据。
+核算结果在明细保存时写入computed_score，汇总时直接在数据库中求和。
+"""
+from django.db.models import Sum, Value
+from django.db.models.query import QuerySet
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖
+    np = None
+
+SCORE_CAP = 15  # 学业加分单项上限
+
+COMPETITION_BASE = {
+    ("national_a_plus", "first"): 30, ("national_a_plus", "second"): 15,
+    ("national_a_plus", "third"): 10, ("national_a", "first"): 15,
+    ("national_a", "second"): 10, ("national_a", "third"): 5,
+    ("national_a_minus", "first"): 10, ("national_a_minus", "second"): 5,
+    ("national_a_minus", "third"): 2, ("provincial_a", "first"): 5,
+    ("provincial_a", "second"): 2,
+}
+# 团体项目按角色折算，"other"为团体中的其他成员，"individual"为个人项目
+COMPETITION_RATIO = {"first": 1 / 3, "second": 1 / 4, "other": 1 / 5, "individual": 1 / 3}
+PAPER_BASE = {"a": 10, "b": 6, "c": 1}
+PAPER_AUTHOR_RATIO = {"independent": 1.0, "first": 0.8, "second": 0.2}
+PATENT_SCORE = round(min(2 * 0.8, SCORE_CAP), 2)
+INNOVATION_SCORE = round(min(1.0, SCORE_CAP), 2)
+
+VOLUNTEER_HOURS_THRESHOLD = 200
+CADRE_COEFFICIENT = {"monitor": 1.0, "minister": 0.75, "member": 0.5}
+CADRE_CAP = 2
+HONOR_SCORE = {"national": 2, "provincial": 1, "school": 0.2}
+
+ACADEMIC_FIELDS = ('score_type', 'competition_level', 'competition_rank', 'is_group', 'group_role',
+                   'paper_level', 'paper_author')
+PERFORMANCE_FIELDS = ('score_type', 'volunteer_hours', 'is_large_event', 'cadre_role', 'cadre_score',
+                      'honor_level')
+
+# 行数少于该值时逐行计算，避免构造数组的开销
+VECTORIZE_MIN_ROWS = 64
+
+
+def _compile_competition_scores():
+    return {
+        (level, rank, role): round(min(base * ratio, SCORE_CAP), 2)
+        for (level, rank), base in COMPETITION_BASE.items()
+        for role, ratio in COMPETITION_RATIO.items()
+    }
+
+
+COMPETITION_SCORES = _compile_competition_scores()
+PAPER_SCORES = {
+    (level, author): round(min(base * ratio, SCORE_CAP), 2)
+    for level, base in PAPER_BASE.items()
+    for author, ratio in PAPER_AUTHOR_RATIO.items()
+}
+
+
+def _columns(rows, fields):
+    """把各种形式的输入统一为按列的数据"""
+    if isinstance(rows, dict):
+        return {field: list(rows[field]) for field in fields}
+    if isinstance(rows, QuerySet):
+        values = list(rows.values_list(*fields))
+    else:
+        values = [tuple(getattr(row, field) for field in fields) for row in rows]
+    columns = list(zip(*values)) if values else [()] * len(fields)
+    return {field: list(column) for field, column in zip(fields, columns)}
+
+
+def _academic_row(score_type, level, rank, is_group, group_role, paper_level, paper_author):
+    if score_type == "competition" and level and rank:
+        if not is_group:
+            role = "individual"
+        elif group_role in ("first", "second"):
+            role = group_role
+        else:
+            role = "other"
+        # 未列出的级别/奖项组合基础分为0
+        return COMPETITION_SCORES.get((level, rank, role), 0)
+    if score_type == "paper" and paper_level and paper_author:
+        return PAPER_SCORES[(paper_level, paper_author)]
+    if score_type == "patent":
+        return PATENT_SCORE
+    if score_type == "innovation":
+        return INNOVATION_SCORE
+    return 0
+
+
+def academic_scores(rows):
+    """批量核算学业加分，返回与输入顺序一致的分数列表"""
+    columns = _columns(rows, ACADEMIC_FIELDS)
+    return [_academic_row(*row) for row in zip(*(columns[field] for field in ACADEMIC_FIELDS))]
+
+
+def _performance_row(score_type, volunteer_hours, is_large_event, cadre_role, cadre_score, honor_level):
+    score = 0
+    if score_type == "volunteer" and volunteer_hours:
+        actual_hours = volunteer_hours / 2 if is_large_event else volunteer_hours
+        if actual_hours >= VOLUNTEER_HOURS_THRESHOLD:
+            score = 1 + ((actual_hours - VOLUNTEER_HOURS_THRESHOLD) / 2) * 0.05
+        score = min(score, 1)
+    elif score_type == "cadre" and cadre_role and cadre_score:
+        score = min(CADRE_COEFFICIENT[cadre_role] * (cadre_score / 100), CADRE_CAP)
+    elif score_type == "honor" and honor_level:
+        score = HONOR_SCORE[honor_level]
+    return round(score, 2)
+
+
+def _performance_vectorized(columns):
+    score_type = np.array(columns['score_type'], dtype=object)
+    hours = np.array([value or 0 for value in columns['volunteer_hours']], dtype=float)
+    large = np.array([bool(value) for value in columns['is_large_event']])
+    cadre_points = np.array([value or 0 for value in columns['cadre_score']], dtype=float)
+
+    volunteer = (score_type == "volunteer") & (hours != 0)
+    cadre = (score_type == "cadre") & (cadre_points != 0) & np.array([bool(value) for value in columns['cadre_role']])
+    honor = (score_type == "honor") & np.array([bool(value) for value in columns['honor_level']])
+
+    actual_hours = np.where(large, hours / 2, hours)
+    volunteer_score = np.minimum(
+        np.where(actual_hours >= VOLUNTEER_HOURS_THRESHOLD,
+                 1 + ((actual_hours - VOLUNTEER_HOURS_THRESHOLD) / 2) * 0.05, 0.0),
+        1,
+    )
+    coefficient = np.array([
+        CADRE_COEFFICIENT[role] if selected else 0.0
+        for role, selected in zip(columns['cadre_role'], cadre.tolist())
+    ], dtype=float)
+    cadre_score = np.minimum(coefficient * (cadre_points / 100), CADRE_CAP)
+    honor_score = np.array([
+        HONOR_SCORE[level] if selected else 0.0
+        for level, selected in zip(columns['honor_level'], honor.tolist())
+    ], dtype=float)
+
+    scores = np.select([volunteer, cadre, honor], [volunteer_score, cadre_score, honor_score], 0.0)
+    # 使用Python内置round保证与逐行计算的舍入结果相同
+    return [round(score, 2) for score in scores.tolist()]
+
+
+def performance_scores(rows):
+    """批量核算表现加分，返回与输入顺序一致的分数列表"""
+    columns = _columns(rows, PERFORMANCE_FIELDS)
+    if np is not None and len(columns['score_type']) >= VECTORIZE_MIN_ROWS:
+        return _performance_vectorized(columns)
+    return [_performance_row(*row) for row in zip(*(columns[field] for field in PERFORMANCE_FIELDS))]
+
+
+def _summed_scores(group_field, **filters):
+    """两类加分明细按group_field分组求和已保存的核算分数，UNION ALL合并为一次查询"""
+    from .models import AcademicScore, PerformanceScore
+
+    def grouped(model, kind):
+        return (model.objects.filter(**filters).order_by()
+                .values(group_field)
+                .annotate(kind=Value(kind), total=Sum('computed_score'))
+                .values_list(group_field, 'kind', 'total'))
+
+    return grouped(AcademicScore, 'academic').union(grouped(PerformanceScore, 'performance'), all=True)
+
+
+def score_totals(student_ids):
+    """
+    汇总学生已通过申请的加分，返回 {学生ID: {'academic': 学业, 'performance': 表现, 'total': 合计}}
+    无论记录多少都只执行一次聚合查询
+    """
+    sums = {pk: {'academic': 0, 'performance': 0} for pk in student_ids}
+    for student_id, kind, total in _summed_scores('application__student_id', application__student_id__in=sums,
+                                                  application__status='APPROVED'):
+        sums[student_id][kind] = total or 0
+    return {
+        pk: {
+            'academic': round(item['academic'], 2),
+            'performance': round(item['performance'], 2),
+            'total': round(item['academic'] + item['performance'], 2),
+        }
+        for pk, item in sums.items()
+    }
+
+
+def application_scores(application_ids):
+    """按申请汇总关联明细的核算分数，返回 {申请ID: 分数}，一次聚合查询"""
+    totals = dict.fromkeys(application_ids, 0)
+    for application_id, _, total in _summed_scores('application_id', application_id__in=totals):
+        totals[application_id] += total or 0
+    return {owner: round(total, 2) for owner, total in totals.items()}
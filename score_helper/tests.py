@@ -1,3 +1,248 @@
-from django.test import TestCase
+import itertools
+import shutil
+import tempfile
+from unittest import skipIf
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+
+from . import scoring, views
+from .models import User, ScoreApplication, AcademicScore, PerformanceScore
+
+
+# 原逐行核算规则，作为批量核算结果的对照
+def legacy_academic(score_type, competition_level, competition_rank, is_group, group_role, paper_level, paper_author):
+    if score_type == "competition" and competition_level and competition_rank:
+        competition_score_map = {
+            ("national_a_plus", "first"): 30, ("national_a_plus", "second"): 15,
+            ("national_a_plus", "third"): 10, ("national_a", "first"): 15,
+            ("national_a", "second"): 10, ("national_a", "third"): 5,
+            ("national_a_minus", "first"): 10, ("national_a_minus", "second"): 5,
+            ("national_a_minus", "third"): 2, ("provincial_a", "first"): 5,
+            ("provincial_a", "second"): 2
+        }
+        base_score = competition_score_map.get((competition_level, competition_rank), 0)
+        if is_group:
+            if group_role == "first":
+                score = base_score * (1 / 3)
+            elif group_role == "second":
+                score = base_score * (1 / 4)
+            else:
+                score = base_score * (1 / 5)
+        else:
+            score = base_score * (1 / 3)
+        return round(min(score, 15), 2)
+    elif score_type == "paper" and paper_level and paper_author:
+        base_score = {"a": 10, "b": 6, "c": 1}[paper_level]
+        score = base_score * {"independent": 1.0, "first": 0.8, "second": 0.2}[paper_author]
+        return round(min(score, 15), 2)
+    elif score_type == "patent":
+        return round(min(2 * 0.8, 15), 2)
+    elif score_type == "innovation":
+        return round(min(1.0, 15), 2)
+    return 0
+
+
+def legacy_performance(score_type, volunteer_hours, is_large_event, cadre_role, cadre_score, honor_level):
+    score = 0
+    if score_type == "volunteer" and volunteer_hours:
+        actual_hours = volunteer_hours / 2 if is_large_event else volunteer_hours
+        if actual_hours >= 200:
+            extra = ((actual_hours - 200) / 2) * 0.05
+            score = 1 + extra
+        score = min(score, 1)
+    elif score_type == "cadre" and cadre_role and cadre_score:
+        coefficient = {"monitor": 1.0, "minister": 0.75, "member": 0.5}[cadre_role]
+        score = coefficient * (cadre_score / 100)
+        score = min(score, 2)
+    elif score_type == "honor" and honor_level:
+        score = {"national": 2, "provincial": 1, "school": 0.2}[honor_level]
+    return round(score, 2)
+
+
+def academic_rows():
+    return list(itertools.product(
+        ["competition", "paper", "patent", "innovation"],
+        [None, "national_a_plus", "national_a", "national_a_minus", "provincial_a"],
+        [None, "first", "second", "third"],
+        [False, True],
+        [None, "independent", "first", "second"],
+        [None, "a", "b", "c"],
+        [None, "independent", "first", "second"],
+    ))
+
+
+def performance_rows():
+    rows = [("volunteer", hours, large, None, 0, None)
+            for hours in (None, 0, 12.5, 199.9, 200, 260, 399.5, 400, 1000) for large in (False, True)]
+    rows += [("cadre", 0, False, role, points, None)
+             for role in (None, "monitor", "minister", "member") for points in (None, 0, 1, 33, 67, 99, 100, 250)]
+    rows += [("honor", 0, False, None, 0, level) for level in (None, "national", "provincial", "school")]
+    return rows
+
+
+def as_columns(rows, fields):
+    return {field: list(column) for field, column in zip(fields, zip(*rows))}
+
+
+class BatchScoringTest(TestCase):
+    def test_academic_matches_per_row_rules(self):
+        rows = academic_rows()
+        expected = [legacy_academic(*row) for row in rows]
+        self.assertEqual(scoring.academic_scores(as_columns(rows, scoring.ACADEMIC_FIELDS)), expected)
+
+    def test_performance_matches_per_row_rules(self):
+        rows = performance_rows()
+        expected = [legacy_performance(*row) for row in rows]
+        self.assertEqual(scoring.performance_scores(as_columns(rows, scoring.PERFORMANCE_FIELDS)), expected)
+
+    @skipIf(scoring.np is None, 'NumPy未安装')
+    def test_vectorized_performance_matches_per_row_rules(self):
+        rows = performance_rows()
+        expected = [legacy_performance(*row) for row in rows]
+        self.assertEqual(scoring._performance_vectorized(as_columns(rows, scoring.PERFORMANCE_FIELDS)), expected)
+
+    def test_queryset_and_application_totals(self):
+        student = User.objects.create_user(username='stu', student_id='2023001')
+        application = ScoreApplication.objects.create(apply_type='academic', student=student, self_score=5,
+                                                      score_item='竞赛', proof_file='proofs/a.pdf')
+        AcademicScore.objects.create(application=application, user=student, score_type='competition',
+                                     competition_level='national_a', competition_rank='first',
+                                     is_group=True, group_role='second')
+        PerformanceScore.objects.create(application=application, user=student, score_type='cadre',
+                                        cadre_role='minister', cadre_score=90)
+        with self.assertNumQueries(1):
+            self.assertEqual(scoring.academic_scores(AcademicScore.objects.all()), [3.75])
+        self.assertEqual(PerformanceScore.objects.get().calculate_score(), 0.68)
+        with self.assertNumQueries(1):
+            self.assertEqual(scoring.application_scores([application.id]), {application.id: 4.43})
+
+
+class ComputedScoreTest(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='stu', password='pw', student_id='2023001')
+
+    def apply(self, status='APPROVED'):
+        return ScoreApplication.objects.create(apply_type='academic', student=self.student, self_score=1,
+                                               score_item='项目', proof_file='proofs/a.pdf', status=status)
+
+    def test_score_is_stored_on_save(self):
+        record = AcademicScore.objects.create(user=self.student, score_type='paper', paper_level='b',
+                                              paper_author='first')
+        self.assertEqual(AcademicScore.objects.get().computed_score, 4.8)
+        record.paper_author = 'second'
+        record.save(update_fields=['paper_author'])
+        self.assertEqual(AcademicScore.objects.get().computed_score, 1.2)
+
+    def test_dashboard_totals_cost_is_constant(self):
+        self.client.login(username='stu', password='pw')
+        AcademicScore.objects.create(application=self.apply(), user=self.student, score_type='patent')
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get('/student/dashboard/')
+        for _ in range(5):
+            application = self.apply()
+            AcademicScore.objects.create(application=application, user=self.student, score_type='innovation')
+            PerformanceScore.objects.create(application=application, user=self.student, score_type='honor',
+                                            honor_level='school')
+        PerformanceScore.objects.create(application=self.apply('PENDING'), user=self.student,
+                                        score_type='honor', honor_level='national')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/student/dashboard/')
+        self.assertEqual(len(queries), len(baseline))
+        self.assertEqual((response.context['academic_total'], response.context['performance_total'],
+                          response.context['total']), (6.6, 1.0, 7.6))
+
+    def test_approve_page_scores_follow_writes(self):
+        cache.clear()
+        User.objects.create_user(username='tea', password='pw', role=User.Role.TEACHER, teacher_id='T001')
+        self.client.login(username='tea', password='pw')
+        application = self.apply('PENDING')
+        url = f'/teacher/approve/{application.id}/'
+        with self.captureOnCommitCallbacks(execute=True):
+            AcademicScore.objects.create(application=application, user=self.student, score_type='patent')
+        self.assertEqual(self.client.get(url).context['computed_score'], 1.6)
+        with self.captureOnCommitCallbacks(execute=True):
+            PerformanceScore.objects.create(application=application, user=self.student, score_type='honor',
+                                            honor_level='school')
+        self.assertEqual(self.client.get(url).context['computed_score'], 1.8)
+
+
+class ApplicationProofTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, TASK_QUEUE_EAGER=True)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_only_applicant_and_teachers_can_download(self):
+        student = User.objects.create_user(username='stu', student_id='2023001')
+        application = ScoreApplication.objects.create(apply_type='academic', student=student, self_score=1,
+                                                      score_item='竞赛', proof_file=SimpleUploadedFile('a.pdf', b'pdf'))
+        url = reverse('application_proof', args=[application.id])
+        self.client.force_login(User.objects.create_user(username='other', student_id='2023002'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        for user in (student, User.objects.create_user(username='teacher', role=User.Role.TEACHER)):
+            self.client.force_login(user)
+            response = self.client.get(url)
+            self.assertEqual(b''.join(response.streaming_content), b'pdf')
+
+
+class ViewQueryBudgetTest(TestCase):
+    """score_helper各视图的查询条数上限；数据量增加时查询条数保持不变"""
+
+    # (URL模板, 登录用户, 查询条数上限)；审批页的核算结果按版本号缓存，未命中时另有一条版本号查询
+    BUDGETS = [
+        ('/login/', None, 1),
+        ('/student/dashboard/', 'stu', 5),
+        ('/student/apply/', 'stu', 2),
+        ('/teacher/approve/{application}/', 'tea', 7),
+    ]
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='stu', password='pw', student_id='2023001')
+        self.teacher = User.objects.create_user(username='tea', password='pw', role=User.Role.TEACHER,
+                                                teacher_id='T001')
+        self.seed(3)
+
+    def seed(self, count):
+        for _ in range(count):
+            for status in ('APPROVED', 'PENDING'):
+                application = ScoreApplication.objects.create(apply_type='academic', student=self.student,
+                                                              self_score=1, score_item='项目',
+                                                              proof_file='proofs/a.pdf', status=status)
+                AcademicScore.objects.create(application=application, user=self.student, score_type='patent')
+                PerformanceScore.objects.create(application=application, user=self.student, score_type='honor',
+                                                honor_level='school')
+
+    def measure(self):
+        application = ScoreApplication.objects.order_by('id').first().id
+        counts = {}
+        for template, username, _ in self.BUDGETS:
+            cache.clear()
+            self.client.logout()
+            if username:
+                self.client.login(username=username, password='pw')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(template.format(application=application))
+            self.assertEqual(response.status_code, 200, template)
+            counts[template] = len(queries)
+        # 老师审批中心的URL被学生主页遮蔽，直接调用视图
+        request = RequestFactory().get('/teacher/dashboard/')
+        request.user = self.teacher
+        with CaptureQueriesContext(connection) as queries:
+            views.teacher_dashboard(request)
+        counts['teacher_dashboard'] = len(queries)
+        return counts
+
+    def test_views_stay_within_budget(self):
+        small = self.measure()
+        self.seed(12)
+        large = self.measure()
+        for template, _, budget in self.BUDGETS + [('teacher_dashboard', None, 0)]:
+            self.assertLessEqual(large[template], budget, template)
+            self.assertEqual(small[template], large[template], f'{template} 的查询条数随数据量增长')
@@ -8,6 +8,8 @@ urlpatterns = [
     # 学生功能
     path('dashboard/', views.student_dashboard, name='student_dashboard'),
     path('apply/', views.student_apply, name='submit_application'),
+    path('proof/<int:app_id>/', views.application_proof, name='application_proof'),
+    path('preview/<int:app_id>/', views.application_preview, name='application_preview'),
 
     # 老师功能
     path('dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
@@ -8,6 +8,15 @@ from .forms import (
     AcademicScoreForm, PerformanceScoreForm, ApprovalForm
 )
 from django.contrib.auth import login
+from django.http import HttpResponseForbidden
+from django.views.decorators.http import require_safe
+from notifications import outbox
+from proofstore.serving import serve_proof, serve_preview
+from versioning.cache import cached_block
+from .scoring import application_scores, score_totals
+
+# 核算结果依赖的数据，写入时版本号递增，缓存随之失效
+SCORE_NAMESPACES = [ScoreApplication, AcademicScore, PerformanceScore]
 
 # 登录视图（保持不变）
 # 登录视图（修复后）
@@ -68,16 +77,15 @@ def student_dashboard(request):
         application__status='APPROVED'
     ).order_by('-application__updated_time')
 
-    academic_total = sum(record.calculate_score() for record in academic_records)
-    performance_total = sum(record.calculate_score() for record in performance_records)
-    total = academic_total + performance_total
+    # 学业、表现和合计加分由数据库一次聚合得出
+    totals = score_totals([request.user.id])[request.user.id]
 
     context = {
         'student': request.user,
         'applications': applications,
-        'academic_total': round(academic_total, 2),
-        'performance_total': round(performance_total, 2),
-        'total': round(total, 2),
+        'academic_total': totals['academic'],
+        'performance_total': totals['performance'],
+        'total': totals['total'],
         'academic_records': academic_records,
         'performance_records': performance_records,
     }
@@ -164,6 +172,13 @@ def teacher_dashboard(request):
     return render(request, 'teacher/dashboard.html', context)
 
 
+# 审批结果写入通知发件箱，由后台任务合并成摘要邮件发送
+def notify_applicant(application, verdict):
+    student = application.student
+    outbox.add([(student.email, student.get_full_name() or student.username,
+                 f'{application.get_apply_type_display()}申请「{application.score_item}」{verdict}')])
+
+
 # 补充缺失的老师处理审批视图（关键修复）
 @login_required(login_url='login')
 def approve_application(request, app_id):
@@ -192,18 +207,31 @@ def approve_application(request, app_id):
                     type=application.apply_type,
                     score=application.approved_score
                 )
+                notify_applicant(application, f'已通过，加分 {application.approved_score} 分')
                 messages.success(request, '申请已批准')
             else:
                 application.status = 'REJECTED'
                 application.reject_reason = form.cleaned_data['reject_reason']
                 application.save()
+                notify_applicant(application, f'已驳回，理由：{application.reject_reason}')
                 messages.success(request, '申请已驳回')
 
             return redirect('teacher_dashboard')
     else:
         form = ApprovalForm()
 
-    context = {'application': application, 'form': form}
+    # 申请的核算分数和学生合计一起缓存，命中时只需一次版本号查询
+    with cached_block('score_helper:approve', SCORE_NAMESPACES, parts=[application.id]) as scores:
+        if scores.missing:
+            scores.value = {
+                'computed_score': application_scores([application.id])[application.id],
+                'student_totals': score_totals([application.student_id])[application.student_id],
+            }
+    context = {
+        'application': application,
+        'form': form,
+        **scores.value,
+    }
     return render(request, 'teacher/approve.html', context)
 
 
@@ -230,4 +258,24 @@ def revoke_application(request, app_id):
     else:
         messages.error(request, '只能撤回已审批的申请')
 
-    return redirect('teacher_dashboard')
\ No newline at end of file
+    return redirect('teacher_dashboard')
+
+
+# 证明文件下载：仅限申请人本人和老师，支持断点续传和缓存验证
+@require_safe
+@login_required(login_url='login')
+def application_proof(request, app_id):
+    application = get_object_or_404(ScoreApplication, id=app_id)
+    if application.student_id != request.user.id and not request.user.is_teacher():
+        return HttpResponseForbidden('只能查看自己提交的证明文件')
+    return serve_proof(request, application.proof_file, f'证明材料-{application.id}')
+
+
+# 证明文件缩略图，权限与下载相同
+@require_safe
+@login_required(login_url='login')
+def application_preview(request, app_id):
+    application = get_object_or_404(ScoreApplication, id=app_id)
+    if application.student_id != request.user.id and not request.user.is_teacher():
+        return HttpResponseForbidden('只能查看自己提交的证明文件')
+    return serve_preview(request, application.proof_file, f'证明材料-{application.id}')
@@ -1,6 +1,6 @@
 # students/admin.py
 from django.contrib import admin
-from .models import StudentProfile, Submission, ScoreItem  # 导入你的模型
+from .models import StudentProfile, Submission, ScoreItem, bulk_transition  # 导入你的模型
 
 
 # 学生档案管理
@@ -10,7 +10,8 @@ class StudentProfileAdmin(admin.ModelAdmin):
     search_fields = ('full_name', 'student_id', 'major', 'class_name', 'email')
     list_filter = ('major', 'grade', 'class_name')
     ordering = ('-total_score',)  # 按总加分降序
-    readonly_fields = ('total_score', 'last_updated')
+    readonly_fields = ('total_score', 'submission_count', 'pending_count', 'approved_count',
+                       'rejected_count', 'revoked_count', 'last_updated')
     fieldsets = (
         ('基本信息', {
             'fields': ('user', 'full_name', 'student_id', 'email', 'phone')
@@ -19,7 +20,8 @@ class StudentProfileAdmin(admin.ModelAdmin):
             'fields': ('major', 'grade', 'class_name', 'admission_date')
         }),
         ('加分信息', {
-            'fields': ('total_score', 'last_updated')
+            'fields': ('total_score', 'submission_count', 'pending_count', 'approved_count',
+                       'rejected_count', 'revoked_count', 'last_updated')
         })
     )
     # 添加中文名称
@@ -67,28 +69,27 @@ class SubmissionAdmin(admin.ModelAdmin):
     verbose_name = '提交记录'
     verbose_name_plural = '提交记录'
     
-    # 批量审核通过
+    # 编辑页修改状态时同样经由状态切换入口，保证总加分同步
+    def save_model(self, request, obj, form, change):
+        new_status = obj.status
+        if change and 'status' in form.changed_data:
+            obj.status = form.initial['status']
+            super().save_model(request, obj, form, change)
+            obj.transition(new_status, reviewer=request.user)
+        else:
+            super().save_model(request, obj, form, change)
+
+    # 批量审核通过（与批量审核接口共用同一条集合更新路径）
     def approve_submissions(self, request, queryset):
-        from django.utils import timezone
-        updated = queryset.filter(status='pending').update(
-            status='approved', 
-            reviewer=request.user,
-            reviewed_at=timezone.now()
-        )
-        # 重新计算相关学生的总分
-        for submission in queryset.filter(status='approved'):
-            submission.student.save()
+        outcomes = bulk_transition(queryset.values_list('pk', flat=True), 'approved', reviewer=request.user)
+        updated = sum(result == 'approved' for result in outcomes.values())
         self.message_user(request, f"已成功批准 {updated} 条申请")
     approve_submissions.short_description = "批量批准所选申请"
     
     # 批量审核驳回
     def reject_submissions(self, request, queryset):
-        from django.utils import timezone
-        updated = queryset.filter(status='pending').update(
-            status='rejected', 
-            reviewer=request.user,
-            reviewed_at=timezone.now()
-        )
+        outcomes = bulk_transition(queryset.values_list('pk', flat=True), 'rejected', reviewer=request.user)
+        updated = sum(result == 'rejected' for result in outcomes.values())
         self.message_user(request, f"已成功驳回 {updated} 条申请")
     reject_submissions.short_description = "批量驳回所选申请"
     
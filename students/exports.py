@@ -0,0 +1,124 @@
+"""
+CSV流式导出：学生排名、提交记录和学生信息变更日志
+
+查询只取导出需要的列（values_list），按chunk_size分批从数据库游标读取，
+逐批编码后交给StreamingHttpResponse或写入文件，内存占用与导出行数无关。
+文件以UTF-8 BOM开头，Excel可直接识别中文。
+"""
+import csv
+
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import StudentProfile, ScoreItem, Submission, StudentInfoChangeLog
+from .querysets import filter_submissions, filter_student_profiles, filter_change_logs
+
+CHUNK_SIZE = 2000
+LINES_PER_WRITE = 500  # 每次输出的行数，避免逐行产生过多的小块
+BOM = '\ufeff'
+
+RANKING_HEADER = ['名次', '学号', '姓名', '专业', '年级', '班级', '总加分', '提交数', '通过数']
+SUBMISSION_HEADER = ['ID', '学号', '姓名', '加分项目', '类别', '级别', '分值', '状态', '提交时间', '审核时间',
+                     '审核人', '审核意见', '补充说明']
+CHANGE_LOG_HEADER = ['修改时间', '学号', '姓名', '修改人', '修改字段', '修改前值', '修改后值']
+
+
+class _Echo:
+    """csv.writer的写入目标，直接返回编码好的一行"""
+
+    def write(self, value):
+        return value
+
+
+def _time_formatter():
+    # 时区只取一次，逐行调用localtime的开销在大批量导出时很可观
+    tz = timezone.get_current_timezone()
+    return lambda value: value.astimezone(tz).strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def csv_chunks(header, rows):
+    """把表头和数据行编码为CSV文本块，第一块以BOM开头"""
+    writer = csv.writer(_Echo())
+    lines = [BOM + writer.writerow(header)]
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) >= LINES_PER_WRITE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def ranking_rows(queryset):
+    """按总加分降序输出，名次为导出范围内的竞争排名（同分同名次）"""
+    rows = (queryset.order_by('-total_score', 'id')
+            .values_list('student_id', 'full_name', 'major', 'grade', 'class_name', 'total_score',
+                         'submission_count', 'approved_count')
+            .iterator(chunk_size=CHUNK_SIZE))
+    rank, previous = 0, None
+    for position, row in enumerate(rows, 1):
+        if row[5] != previous:
+            rank, previous = position, row[5]
+        yield (rank, *row)
+
+
+def submission_rows(queryset):
+    format_time = _time_formatter()
+    status_names = dict(Submission.STATUS_CHOICES)
+    category_names = dict(ScoreItem.CATEGORY_CHOICES)
+    rows = (queryset
+            .annotate(reviewer_name=Coalesce('reviewer__teacher_profile__full_name', 'reviewer__username'))
+            .values_list('id', 'student__student_id', 'student__full_name', 'score_item__name',
+                         'score_item__category', 'score_item__level', 'score_item__score', 'status',
+                         'submitted_at', 'reviewed_at', 'reviewer_name', 'reviewer_comment', 'additional_info')
+            .iterator(chunk_size=CHUNK_SIZE))
+    for (pk, student_id, full_name, item, category, level, score, status, submitted_at, reviewed_at,
+         reviewer, comment, additional_info) in rows:
+        yield (pk, student_id, full_name, item, category_names.get(category, category), level, score,
+               status_names.get(status, status), format_time(submitted_at), format_time(reviewed_at),
+               reviewer or '', comment or '', additional_info)
+
+
+def change_log_rows(queryset):
+    format_time = _time_formatter()
+    rows = (queryset.order_by('-change_time', '-id')
+            .values_list('change_time', 'student__student_id', 'student__full_name', 'editor__username',
+                         'field_name', 'old_value', 'new_value')
+            .iterator(chunk_size=CHUNK_SIZE))
+    for change_time, *rest in rows:
+        yield (format_time(change_time), *rest)
+
+
+# 导出类型 -> (表头, 数据行生成函数)
+EXPORTS = {
+    'rankings': (RANKING_HEADER, ranking_rows),
+    'submissions': (SUBMISSION_HEADER, submission_rows),
+    'change-logs': (CHANGE_LOG_HEADER, change_log_rows),
+}
+
+
+def export_queryset(kind, params=None):
+    """按与API相同的筛选参数构造导出的查询集"""
+    params = params or {}
+    if kind == 'rankings':
+        return filter_student_profiles(StudentProfile.objects.exclude(user__is_superuser=True), params)
+    if kind == 'submissions':
+        return filter_submissions(Submission.objects.order_by('-submitted_at', '-id'), params)
+    return filter_change_logs(StudentInfoChangeLog.objects.all(), params)
+
+
+def export_filename(kind):
+    return f"{kind}-{timezone.localtime().strftime('%Y%m%d-%H%M%S')}.csv"
+
+
+def export_chunks(kind, queryset):
+    """返回指定类型导出的CSV文本块"""
+    header, build_rows = EXPORTS[kind]
+    return csv_chunks(header, build_rows(queryset))
+
+
+def streaming_csv_response(kind, queryset):
+    response = StreamingHttpResponse(export_chunks(kind, queryset), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(kind)}"'
+    return response
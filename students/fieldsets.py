@@ -0,0 +1,83 @@
+"""
+API的 ?fields= 和 ?expand= 查询参数
+
+    /api/submissions/?fields=id,status,submitted_at    只返回列出的字段
+    /api/submissions/?expand=student                   关联字段中只展开student，其余只返回主键
+    /api/submissions/?fields=id,student&expand=        student只返回主键
+
+不带参数时返回完整数据。视图直接使用的序列化器按请求裁剪字段，嵌套的序列化器保持完整；
+查询集经optimize()只联表读取展开的关联，GET请求指定fields时只读取用到的列。写入的字段不受影响。
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _names(value):
+    return None if value is None else {name.strip() for name in value.split(',') if name.strip()}
+
+
+class FieldSelection:
+    def __init__(self, params):
+        self.fields = _names(params.get('fields'))
+        self.expand = _names(params.get('expand'))
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.includes(name) and (self.expand is None or name in self.expand)
+
+
+def selection(request):
+    """没有request时（如命令中直接序列化）返回完整数据"""
+    params = getattr(request, 'query_params', None)
+    if params is None:
+        params = getattr(request, 'GET', {})
+    return FieldSelection(params)
+
+
+class SparseFieldsMixin:
+    """
+    expandable: {关联字段: 展开时select_related的路径}，未展开时只返回关联的主键
+    field_sources: {计算字段: 读取的模型字段}，指定fields时据此决定读取哪些列
+    always_load: 不论请求哪些字段都要读取的列，如分页游标用到的列
+    """
+    expandable = {}
+    field_sources = {}
+    always_load = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        if parent is not None:
+            return fields
+        chosen = selection(self.context.get('request'))
+        for name, field in list(fields.items()):
+            if field.write_only:
+                continue
+            if not chosen.includes(name):
+                del fields[name]
+            elif name in self.expandable and not chosen.expands(name):
+                fields[name] = serializers.ReadOnlyField(source=f'{name}_id')
+        return fields
+
+    @classmethod
+    def optimize(cls, queryset, request):
+        """只select_related展开的关联；GET请求指定fields时只读取用到的列"""
+        chosen = selection(request)
+        related = [path for name, paths in cls.expandable.items() if chosen.expands(name) for path in paths]
+        if related:
+            queryset = queryset.select_related(*related)
+        if chosen.fields is None or getattr(request, 'method', None) != 'GET':
+            return queryset
+        model = queryset.model
+        columns = {model._meta.pk.name, *cls.always_load}
+        for name in chosen.fields:
+            for source in cls.field_sources.get(name, (name,)):
+                try:
+                    field = model._meta.get_field(source)
+                except FieldDoesNotExist:
+                    continue
+                if field.concrete and not field.many_to_many:
+                    columns.add(field.name)
+        return queryset.only(*columns)
@@ -0,0 +1,205 @@
+"""
+批量导入学生账号
+
+读取CSV（Excel另存的CSV，UTF-8带BOM或GBK编码均可），表头可用英文字段名或中文列名：
+    username/用户名, password/密码, full_name/姓名, student_id/学号, major/专业, grade/年级,
+    class_name/班级, email/邮箱, phone/电话
+
+校验规则与注册页面一致，逐行报告错误。密码哈希在进程池中并行计算；
+User、StudentProfile和学生组成员关系按批bulk_create写入，不触发post_save信号，
+写入后统一更新全文索引、首页统计和排名索引。
+"""
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from versioning.models import bump as bump_version
+
+from . import search
+from .models import StudentProfile
+from .ranking import rank_index
+
+BATCH_SIZE = 1000
+LOOKUP_BATCH_SIZE = 900
+HASH_CHUNK_SIZE = 64  # 每次交给子进程的密码数
+MIN_PASSWORD_LENGTH = 6
+
+COLUMNS = {
+    'username': '用户名', 'password': '密码', 'full_name': '姓名', 'student_id': '学号', 'major': '专业',
+    'grade': '年级', 'class_name': '班级', 'email': '邮箱', 'phone': '电话',
+}
+REQUIRED = ('username', 'password', 'full_name', 'student_id', 'major', 'grade', 'class_name')
+HEADER_ALIASES = {**{name: name for name in COLUMNS}, **{label: name for name, label in COLUMNS.items()}}
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    rows: int = 0
+    errors: list = field(default_factory=list)  # [{'line': 行号, 'field': 字段, 'message': 说明}]
+
+    def add_error(self, line, field_name, message):
+        self.errors.append({'line': line, 'field': field_name, 'message': message})
+
+
+def decode(data):
+    """Excel另存的CSV可能是带BOM的UTF-8，也可能是GBK"""
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('gb18030')
+
+
+def read_rows(text, result):
+    """解析CSV，返回[(行号, {字段: 值})]；表头缺列时记录错误并返回空列表"""
+    reader = csv.reader(io.StringIO(text))
+    header = next(reader, None)
+    if header is None:
+        result.add_error(1, None, '文件为空')
+        return []
+    names = [HEADER_ALIASES.get(column.strip()) for column in header]
+    missing = [COLUMNS[name] for name in REQUIRED if name not in names]
+    if missing:
+        result.add_error(1, None, f"缺少列：{'、'.join(missing)}")
+        return []
+    rows = []
+    for line, values in enumerate(reader, 2):
+        if not any(value.strip() for value in values):
+            continue
+        row = dict.fromkeys(COLUMNS, '')
+        for name, value in zip(names, values):
+            if name:
+                row[name] = value if name == 'password' else value.strip()
+        rows.append((line, row))
+    return rows
+
+
+def _existing(model, field_name, values):
+    """分批查询数据库中已存在的值，避免IN列表超出参数个数限制"""
+    found = set()
+    for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+        chunk = values[start:start + LOOKUP_BATCH_SIZE]
+        found.update(model.objects.filter(**{f'{field_name}__in': chunk}).values_list(field_name, flat=True))
+    return found
+
+
+def validate_rows(rows, result):
+    """按注册页面的规则逐行校验，返回通过校验的行"""
+    max_lengths = {name: StudentProfile._meta.get_field(name).max_length
+                   for name in ('full_name', 'student_id', 'major', 'grade', 'class_name', 'email', 'phone')}
+    max_lengths['username'] = User._meta.get_field('username').max_length
+
+    taken_usernames = _existing(User, 'username', [row['username'] for _, row in rows])
+    taken_student_ids = _existing(StudentProfile, 'student_id', [row['student_id'] for _, row in rows])
+    seen_usernames, seen_student_ids = {}, {}
+
+    valid = []
+    for line, row in rows:
+        errors_before = len(result.errors)
+        for name in REQUIRED:
+            if not row[name]:
+                result.add_error(line, name, f'{COLUMNS[name]}不能为空')
+        for name, limit in max_lengths.items():
+            if len(row[name]) > limit:
+                result.add_error(line, name, f'{COLUMNS[name]}不能超过{limit}个字符')
+        if row['password'] and len(row['password']) < MIN_PASSWORD_LENGTH:
+            result.add_error(line, 'password', f'密码长度至少为{MIN_PASSWORD_LENGTH}位')
+        if row['email']:
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                result.add_error(line, 'email', '邮箱格式不正确')
+
+        username, student_id = row['username'], row['student_id']
+        if username in taken_usernames:
+            result.add_error(line, 'username', '用户名已存在')
+        elif username and username in seen_usernames:
+            result.add_error(line, 'username', f'用户名与第{seen_usernames[username]}行重复')
+        if student_id in taken_student_ids:
+            result.add_error(line, 'student_id', '学号已被注册')
+        elif student_id and student_id in seen_student_ids:
+            result.add_error(line, 'student_id', f'学号与第{seen_student_ids[student_id]}行重复')
+        seen_usernames.setdefault(username, line)
+        seen_student_ids.setdefault(student_id, line)
+
+        if len(result.errors) == errors_before:
+            valid.append(row)
+    return valid
+
+
+def _setup_worker():
+    # 以spawn方式启动的子进程需要重新加载Django配置，fork的子进程已继承
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """计算密码哈希；workers大于1时在进程池中并行计算"""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(passwords) <= 1:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=HASH_CHUNK_SIZE))
+
+
+def _split_name(full_name):
+    # 与注册页面相同：含空格时第一段作为名，其余作为姓
+    if ' ' in full_name:
+        parts = full_name.split()
+        return parts[0], ' '.join(parts[1:])
+    return full_name, ''
+
+
+def create_students(rows, workers=None):
+    """批量创建账号、学生档案和学生组成员关系，返回创建的学生档案ID列表"""
+    hashes = hash_passwords([row['password'] for row in rows], workers)
+    student_group, _ = Group.objects.get_or_create(name='students')
+    Membership = User.groups.through
+    profile_ids = []
+    with transaction.atomic():
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            users = []
+            for row, password in zip(batch, hashes[start:start + BATCH_SIZE]):
+                first_name, last_name = _split_name(row['full_name'])
+                users.append(User(username=row['username'], password=password, email=row['email'],
+                                  first_name=first_name, last_name=last_name))
+            users = User.objects.bulk_create(users)
+            profiles = StudentProfile.objects.bulk_create(
+                StudentProfile(user=user, **{name: row[name] for name in
+                                             ('full_name', 'student_id', 'major', 'grade', 'class_name',
+                                              'email', 'phone')})
+                for user, row in zip(users, batch)
+            )
+            Membership.objects.bulk_create(Membership(user_id=user.pk, group_id=student_group.pk) for user in users)
+            # bulk_create不触发信号，逐批写入全文索引，最后统一递增版本号（首页统计随之失效）并刷新排名索引
+            search.index_created(profiles)
+            profile_ids.extend(profile.pk for profile in profiles)
+        bump_version(StudentProfile)
+        transaction.on_commit(rank_index.invalidate)
+    return profile_ids
+
+
+def import_students(data, partial=False, dry_run=False, workers=None):
+    """
+    导入CSV内容（bytes或str）
+    partial为False时只要有一行校验失败就不导入任何数据；为True时导入通过校验的行
+    """
+    result = ImportResult()
+    text = decode(data) if isinstance(data, bytes) else data
+    rows = read_rows(text, result)
+    result.rows = len(rows)
+    valid = validate_rows(rows, result) if rows else []
+    if dry_run or not valid or (result.errors and not partial):
+        return result
+    result.created = len(create_students(valid, workers))
+    return result
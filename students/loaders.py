@@ -0,0 +1,99 @@
+"""
+序列化时按请求批量加载关联数据
+
+列表序列化前由子序列化器的collect()收集整页需要的键（审核人、老师档案、审核数），
+每种数据在第一次读取时用一条查询取回全部已收集的键，结果缓存在本次请求中；
+查询集已select_related取出的关联对象直接放入缓存，不再查询。单条序列化时每种数据最多一条查询。
+
+    batch = loaders(self.context)
+    batch['review_count'].add(user_ids)      # 收集
+    batch['review_count'].load(user_id)      # 读取，未加载的键一并查询
+"""
+from django.db import models
+from django.db.models import Count
+from rest_framework import serializers
+
+LOADERS = {}  # 名称 -> (批量加载函数, 缺省值)
+
+
+def register(name, default=None):
+    """登记批量加载函数：接收键的集合，返回{键: 结果}，缺少的键取缺省值"""
+    def decorator(func):
+        LOADERS[name] = (func, default)
+        return func
+    return decorator
+
+
+class BatchLoader:
+    def __init__(self, batch_load, default=None):
+        self.batch_load = batch_load
+        self.default = default
+        self._cache = {}
+        self._queue = set()
+
+    def add(self, keys):
+        """收集待加载的键，下次读取时一并查询"""
+        self._queue.update(key for key in keys if key is not None and key not in self._cache)
+
+    def prime(self, key, value):
+        """放入已知的结果"""
+        self._cache.setdefault(key, value)
+        self._queue.discard(key)
+
+    def load(self, key):
+        if key is None:
+            return self.default
+        if key not in self._cache:
+            self._queue.add(key)
+            keys, self._queue = self._queue, set()
+            results = self.batch_load(keys)
+            for pending in keys:
+                self._cache[pending] = results.get(pending, self.default)
+        return self._cache[key]
+
+
+class LoaderSet(dict):
+    def __missing__(self, name):
+        batch_load, default = LOADERS[name]
+        loader = self[name] = BatchLoader(batch_load, default)
+        return loader
+
+
+def loaders(context):
+    """返回本次请求的加载器；context中没有request时（如命令中直接序列化）随context存放"""
+    request = context.get('request')
+    owner = getattr(request, '_request', request)
+    if owner is None:
+        return context.setdefault('batch_loaders', LoaderSet())
+    if not hasattr(owner, 'batch_loaders'):
+        owner.batch_loaders = LoaderSet()
+    return owner.batch_loaders
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """many=True时先让子序列化器收集整页的键，再逐行序列化"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child.collect(items)
+        return super().to_representation(items)
+
+
+@register('reviewer')
+def load_users(user_ids):
+    from django.contrib.auth.models import User
+    return User.objects.in_bulk(user_ids)
+
+
+@register('teacher_profile')
+def load_teacher_profiles(user_ids):
+    from teachers.models import TeacherProfile
+    return {profile.user_id: profile
+            for profile in TeacherProfile.objects.filter(user_id__in=user_ids).select_related('user')}
+
+
+@register('review_count', default=0)
+def load_review_counts(user_ids):
+    from .models import Submission
+    return dict(Submission.objects.filter(reviewer_id__in=user_ids).order_by()
+                .values('reviewer_id').annotate(count=Count('id')).values_list('reviewer_id', 'count'))
@@ -0,0 +1,203 @@
+"""
+回放主要视图的ORM查询，输出SQLite的EXPLAIN QUERY PLAN和耗时，
+标记全表扫描和临时B树排序，并按过滤、排序条件给出索引建议。
+
+    python manage.py explain_queries                 # 使用当前数据库中的数据
+    python manage.py explain_queries --seed 5000     # 先生成5000名学生的测试数据，结束后回滚
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.lookups import Lookup
+from django.db.models.expressions import Col
+from django.utils import timezone
+
+from students.models import StudentProfile, ScoreItem, Submission
+
+PAGE_SIZE = 20
+EQUALITY_LOOKUPS = {'exact', 'in', 'isnull'}
+RANGE_LOOKUPS = {'gt', 'gte', 'lt', 'lte', 'range'}
+
+
+def replayed_queries(student, since):
+    """各视图实际执行的查询，(名称, 查询集)"""
+    keyset = ('-submitted_at', '-id')
+    return [
+        ('提交记录列表（教师，默认）',
+         Submission.objects.select_related('student__user', 'score_item').order_by(*keyset)[:PAGE_SIZE + 1]),
+        ('提交记录列表（教师，按状态）',
+         Submission.objects.select_related('student__user', 'score_item')
+         .filter(status='pending').order_by(*keyset)[:PAGE_SIZE + 1]),
+        ('提交记录列表（学生本人）',
+         Submission.objects.select_related('score_item').filter(student=student).order_by(*keyset)[:PAGE_SIZE + 1]),
+        ('提交记录API（状态+时间范围）',
+         Submission.objects.filter(status='approved', submitted_at__gte=since).order_by('-submitted_at')[:PAGE_SIZE]),
+        ('学生提交记录（按状态）',
+         Submission.objects.filter(student=student, status='approved').order_by('-submitted_at')),
+        ('教师首页待审核',
+         Submission.objects.select_related('student', 'score_item').filter(status='pending')[:PAGE_SIZE]),
+        ('教师首页最近审核',
+         Submission.objects.select_related('student', 'score_item')
+         .filter(status__in=['approved', 'rejected'], reviewed_at__isnull=False).order_by('-reviewed_at')[:10]),
+        ('学生列表（按总加分）',
+         StudentProfile.objects.select_related('user').exclude(user__is_superuser=True)
+         .order_by('-total_score', 'id')[:PAGE_SIZE]),
+        ('学生API（按总加分）',
+         StudentProfile.objects.select_related('user').exclude(user__is_superuser=True)
+         .order_by('-total_score')[:PAGE_SIZE]),
+    ]
+
+
+def query_plan(queryset):
+    """返回EXPLAIN QUERY PLAN的明细行"""
+    lines = queryset.explain().splitlines()
+    # SQLite的输出每行为 "id parent notused detail"
+    return [line.split(' ', 3)[-1] for line in lines if line.strip()]
+
+
+def plan_problems(plan):
+    problems = []
+    for detail in plan:
+        if detail.startswith('SCAN ') and ' USING ' not in detail:
+            problems.append(f'全表扫描：{detail[5:]}')
+        elif 'USE TEMP B-TREE' in detail:
+            problems.append(f'临时B树排序：{detail}')
+    return problems
+
+
+def _base_lookups(query):
+    """只收集主表上以AND连接的过滤条件"""
+    alias = query.get_initial_alias()
+    pending = [query.where]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, Lookup):
+            if isinstance(node.lhs, Col) and node.lhs.alias == alias:
+                yield node.lhs.target.column, node.lookup_name
+        elif getattr(node, 'connector', None) == 'AND' and not node.negated:
+            pending.extend(node.children)
+
+
+def suggest_index(queryset):
+    """等值条件的列在前，其后为排序列；没有排序时接范围条件的列"""
+    query = queryset.query
+    opts = query.get_meta()
+    equality, ranges = [], []
+    for column, lookup in _base_lookups(query):
+        target = equality if lookup in EQUALITY_LOOKUPS else ranges if lookup in RANGE_LOOKUPS else None
+        if target is not None and column not in target:
+            target.append(column)
+
+    ordering = []
+    # 未显式排序时使用Meta.ordering
+    for name in query.order_by or (opts.ordering if query.default_ordering else ()):
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        if '__' in name:
+            break
+        field = opts.pk if name == 'pk' else opts.get_field(name)
+        if field.primary_key:
+            # 主键（rowid）隐含在每个索引的末尾
+            break
+        ordering.append(('-' if descending else '') + field.column)
+
+    columns = equality + (ordering or ranges[:1])
+    if not columns:
+        return None
+    return f"{opts.db_table}({', '.join(columns)})"
+
+
+def best_time_ms(queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset._chain())
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), statistics.median(timings)
+
+
+def seed(students, per_student):
+    """批量生成测试数据，不触发信号"""
+    rng = random.Random(0)
+    now = timezone.now()
+    users = User.objects.bulk_create(
+        User(username=f'explain_{n}', password='!') for n in range(students)
+    )
+    profiles = StudentProfile.objects.bulk_create(
+        StudentProfile(user=user, full_name=f'学生{n}', student_id=f'EX{n:08d}',
+                       class_name=f'{n % 40}班', total_score=rng.randint(0, 60))
+        for n, user in enumerate(users)
+    )
+    items = ScoreItem.objects.bulk_create(
+        ScoreItem(name=f'项目{n}', category='competition', level='省级', score=n % 5 + 1) for n in range(20)
+    )
+    statuses = [status for status, _ in Submission.STATUS_CHOICES]
+    submissions, submitted_times = [], []
+    for profile in profiles:
+        for _ in range(per_student):
+            status = rng.choice(statuses)
+            submitted = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+            submitted_times.append(submitted)
+            submissions.append(Submission(
+                student=profile, score_item=rng.choice(items), proof_file='proofs/seed.pdf', status=status,
+                reviewed_at=submitted + timedelta(days=1) if status in ('approved', 'rejected') else None,
+            ))
+    Submission.objects.bulk_create(submissions, batch_size=2000)
+    # auto_now_add会覆盖提交时间，创建后再写回生成的时间
+    for submission, submitted in zip(submissions, submitted_times):
+        submission.submitted_at = submitted
+    Submission.objects.bulk_update(submissions, ['submitted_at'], batch_size=500)
+    return len(profiles), len(submissions)
+
+
+class Command(BaseCommand):
+    help = '回放主要视图的查询，输出查询计划和耗时，标记全表扫描和临时排序并给出索引建议'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='先生成指定数量的学生及其提交记录，结束后回滚')
+        parser.add_argument('--per-student', type=int, default=10, help='每名学生生成的提交记录数')
+        parser.add_argument('--repeat', type=int, default=5, help='每条查询的执行次数')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('查询计划分析仅支持SQLite数据库')
+        with transaction.atomic():
+            if options['seed']:
+                students, submissions = seed(options['seed'], options['per_student'])
+                self.stdout.write(f'已生成 {students} 名学生、{submissions} 条提交记录（结束后回滚）')
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.report(options['repeat'])
+            transaction.set_rollback(True)
+
+    def report(self, repeat):
+        student = StudentProfile.objects.order_by('pk').first()
+        if student is None:
+            raise CommandError('数据库中没有学生档案，请使用--seed生成测试数据')
+        since = timezone.now() - timedelta(days=30)
+
+        suggestions = {}
+        for name, queryset in replayed_queries(student, since):
+            plan = query_plan(queryset)
+            problems = plan_problems(plan)
+            best, median = best_time_ms(queryset, repeat)
+            self.stdout.write(f'\n== {name}  最快 {best:.2f}ms / 中位 {median:.2f}ms')
+            for detail in plan:
+                self.stdout.write(f'   {detail}')
+            for problem in problems:
+                self.stdout.write(self.style.WARNING(f'   ! {problem}'))
+            index = suggest_index(queryset) if problems else None
+            if index:
+                self.stdout.write(self.style.NOTICE(f'   建议索引：{index}'))
+                suggestions.setdefault(index, []).append(name)
+
+        self.stdout.write('')
+        if not suggestions:
+            self.stdout.write(self.style.SUCCESS('所有查询均已使用索引'))
+        for index, names in suggestions.items():
+            self.stdout.write(f'建议索引 {index}：{"、".join(names)}')
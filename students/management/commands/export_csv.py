@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from students.exports import EXPORTS, export_chunks, export_queryset
+
+
+class Command(BaseCommand):
+    help = '流式导出学生排名、提交记录或信息变更日志为CSV（UTF-8 BOM），筛选参数与API相同'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS), help='导出类型')
+        parser.add_argument('-o', '--output', help='输出文件路径，省略时写到标准输出')
+        for name in ('status', 'start_date', 'end_date', 'student_id', 'score_item_id', 'major', 'grade',
+                     'class_name'):
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name)
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        chunks = export_chunks(kind, export_queryset(kind, options))
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        # newline=''：CSV行尾由csv模块写出
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"已导出到 {options['output']}"))
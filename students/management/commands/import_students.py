@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from students.importing import import_students
+
+
+class Command(BaseCommand):
+    help = '从CSV批量导入学生账号：并行计算密码哈希，按批写入账号、学生档案和学生组'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV文件路径（Excel另存的CSV，UTF-8或GBK编码）')
+        parser.add_argument('--partial', action='store_true', help='跳过校验失败的行，导入其余行')
+        parser.add_argument('--dry-run', action='store_true', help='只校验，不写入数据库')
+        parser.add_argument('--workers', type=int, help='计算密码哈希的进程数，默认为CPU核数')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as source:
+                data = source.read()
+        except OSError as error:
+            raise CommandError(f'无法读取文件：{error}')
+
+        result = import_students(data, partial=options['partial'], dry_run=options['dry_run'],
+                                 workers=options['workers'])
+        for error in result.errors:
+            field = f"[{error['field']}] " if error['field'] else ''
+            self.stderr.write(f"第{error['line']}行：{field}{error['message']}")
+        if options['dry_run']:
+            self.stdout.write(f'共 {result.rows} 行，{len(result.errors)} 个错误（未写入）')
+        elif result.errors and not result.created:
+            raise CommandError('校验失败，未导入任何数据；可修正后重试，或使用--partial跳过错误行')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'共 {result.rows} 行，已导入 {result.created} 名学生'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from students import search
+
+
+class Command(BaseCommand):
+    help = '清空并重建学生、加分项目和审核意见的全文索引'
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            raise CommandError('全文索引仅支持SQLite数据库')
+        with transaction.atomic():
+            counts = search.rebuild()
+        for table, count in counts.items():
+            self.stdout.write(f'{table}: {count}')
+        self.stdout.write(self.style.SUCCESS('全文索引重建完成'))
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:29
+
+from django.db import migrations, models, transaction
+from django.db.models import Count, Sum
+
+BATCH_SIZE = 500
+COUNTER_FIELDS = ['submission_count', 'pending_count', 'approved_count', 'rejected_count', 'revoked_count']
+# 总加分同批重算：此前存储的值可能未随审核更新
+BACKFILL_FIELDS = COUNTER_FIELDS + ['total_score']
+
+
+def backfill_submission_counters(apps, schema_editor):
+    # 按主键分批回填，每批一个事务，避免长时间锁表
+    StudentProfile = apps.get_model('students', 'StudentProfile')
+    Submission = apps.get_model('students', 'Submission')
+    db_alias = schema_editor.connection.alias
+    last_pk = 0
+    while True:
+        with transaction.atomic(using=db_alias):
+            profiles = list(
+                StudentProfile.objects.using(db_alias).filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE]
+            )
+            if not profiles:
+                break
+            counts = {}
+            approved_totals = {}
+            rows = (Submission.objects.using(db_alias)
+                    .filter(student__in=profiles)
+                    .order_by()
+                    .values_list('student_id', 'status')
+                    .annotate(n=Count('id'), score=Sum('score_item__score')))
+            for student_id, status, n, score in rows:
+                counts.setdefault(student_id, {})[status] = n
+                if status == 'approved':
+                    approved_totals[student_id] = score or 0
+            for profile in profiles:
+                by_status = counts.get(profile.pk, {})
+                profile.submission_count = sum(by_status.values())
+                for status in ('pending', 'approved', 'rejected', 'revoked'):
+                    setattr(profile, f'{status}_count', by_status.get(status, 0))
+                profile.total_score = approved_totals.get(profile.pk, 0)
+            StudentProfile.objects.using(db_alias).bulk_update(profiles, BACKFILL_FIELDS)
+            last_pk = profiles[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # 回填按批次各自提交事务
+    atomic = False
+
+    dependencies = [
+        ('students', '0008_alter_scoreitem_options_alter_studentprofile_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='approved_count',
+            field=models.PositiveIntegerField(db_default=0, default=0, verbose_name='通过数'),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='pending_count',
+            field=models.PositiveIntegerField(db_default=0, default=0, verbose_name='待审核数'),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='rejected_count',
+            field=models.PositiveIntegerField(db_default=0, default=0, verbose_name='驳回数'),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='revoked_count',
+            field=models.PositiveIntegerField(db_default=0, default=0, verbose_name='撤回数'),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='submission_count',
+            field=models.PositiveIntegerField(db_default=0, default=0, verbose_name='提交记录数'),
+        ),
+        migrations.RunPython(backfill_submission_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+import re
+
+from django.db import migrations
+
+# 表结构和行的构造按创建索引时的版本复制到这里，不随students.search的后续修改变化
+CJK_RE = re.compile(r'([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff])')
+
+
+def index_text(value):
+    return CJK_RE.sub(r' \1 ', value or '')
+
+
+def student_id_text(value):
+    value = (value or '').strip()
+    return ' '.join(value[start:] for start in range(len(value)))
+
+
+def student_row(full_name, student_id, major, class_name):
+    return index_text(full_name), student_id_text(student_id), index_text(major), index_text(class_name)
+
+
+def score_item_row(name, description):
+    return index_text(name), index_text(description)
+
+
+def submission_row(reviewer_comment):
+    return (index_text(reviewer_comment),)
+
+
+# 模型名、FTS5表名、索引列、行构造函数
+INDEXES = (
+    ('StudentProfile', 'students_search_student', ('full_name', 'student_id', 'major', 'class_name'), student_row),
+    ('ScoreItem', 'students_search_scoreitem', ('name', 'description'), score_item_row),
+    ('Submission', 'students_search_submission', ('reviewer_comment',), submission_row),
+)
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5虚拟表只在SQLite上创建，其他数据库的检索退回icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    db_alias = schema_editor.connection.alias
+    with schema_editor.connection.cursor() as cursor:
+        for model_name, table, columns, build_row in INDEXES:
+            cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({', '.join(columns)}, "
+                           f"tokenize='unicode61')")
+            model = apps.get_model('students', model_name)
+            rows = [(values[0], *build_row(*values[1:]))
+                    for values in model.objects.using(db_alias).values_list('pk', *columns).iterator()]
+            cursor.executemany(
+                f"INSERT INTO {table} (rowid, {', '.join(columns)}) VALUES (%s{', %s' * len(columns)})",
+                [row for row in rows if any(row[1:])],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            for _, table, _, _ in INDEXES:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0009_studentprofile_submission_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0010_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=models.Index(fields=['-total_score', 'id'], name='profile_total_score'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['submitted_at'], name='submission_submitted'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['status', 'submitted_at'], name='submission_status_submitted'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['student', 'submitted_at'], name='submission_student_submitted'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['student', 'status'], name='submission_student_status'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['reviewed_at'], name='submission_reviewed'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:09
+
+import proofstore.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0011_submission_profile_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='proof_file',
+            field=models.FileField(storage=proofstore.storage.proof_storage, upload_to='proofs/', verbose_name='证明文件'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def recompute_total_score(apps, schema_editor):
+    # 总加分改为按状态切换增量维护之前，已存储的值可能有误（审核通过时未重算、保存个人信息时被清零），
+    # 增量只会在错误的基数上累加，这里按已通过提交的分值之和一次性重算
+    # 新建的数据库在0009中已同批回填；这里处理此前已执行过0009的数据库
+    StudentProfile = apps.get_model('students', 'StudentProfile')
+    Submission = apps.get_model('students', 'Submission')
+    db_alias = schema_editor.connection.alias
+    approved_total = (Submission.objects.using(db_alias)
+                      .filter(student=OuterRef('pk'), status='approved')
+                      .order_by().values('student')
+                      .annotate(total=Sum('score_item__score')).values('total'))
+    StudentProfile.objects.using(db_alias).update(total_score=Coalesce(Subquery(approved_total), Value(0.0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0012_alter_submission_proof_file'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_total_score, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,31 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User, Group  # 导入Group用于权限管理
-from django.db.models.signals import post_save
+from django.db.models import F, Q, Count, Sum, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
+
+from notifications import outbox
+from proofstore.models import track as track_proof_file
+from proofstore.storage import proof_storage
+from versioning.models import bump as bump_version, track as track_versions
+
+from . import search, tasks
+from .ranking import rank_index
+
+def submission_stat_expressions(relation=None):
+    """
+    各状态提交数的条件聚合表达式：总数及pending/approved/rejected/revoked各自的数量
+    relation为从当前模型指向提交记录的关联名，直接聚合Submission时留空
+    """
+    target = relation or 'pk'
+    prefix = f'{relation}__' if relation else ''
+    expressions = {'submission_count': Count(target)}
+    for status, _ in Submission.STATUS_CHOICES:
+        expressions[f'{status}_count'] = Count(target, filter=Q(**{f'{prefix}status': status}))
+    return expressions
+
 
 # 学生档案模型（增强版）
 class StudentProfile(models.Model):
@@ -14,28 +38,42 @@ class StudentProfile(models.Model):
     email = models.EmailField("邮箱", max_length=100, blank=True)  # 新增邮箱字段
     phone = models.CharField("联系电话", max_length=20, blank=True)  # 新增电话字段
     total_score = models.FloatField("总加分", default=0)
+    # 各状态提交数计数列，随提交记录的新建、删除和状态切换在同一事务内增量维护
+    submission_count = models.PositiveIntegerField("提交记录数", default=0, db_default=0)
+    pending_count = models.PositiveIntegerField("待审核数", default=0, db_default=0)
+    approved_count = models.PositiveIntegerField("通过数", default=0, db_default=0)
+    rejected_count = models.PositiveIntegerField("驳回数", default=0, db_default=0)
+    revoked_count = models.PositiveIntegerField("撤回数", default=0, db_default=0)
     last_updated = models.DateTimeField("最后更新时间", auto_now=True)  # 新增更新时间
 
+    # 由提交记录派生、只能通过增量更新修改的字段
+    DERIVED_FIELDS = ('total_score', 'submission_count', 'pending_count', 'approved_count',
+                      'rejected_count', 'revoked_count')
+
     def __str__(self):
         return f"{self.full_name}（{self.student_id} - {self.major}）"
     
     class Meta:
         verbose_name = '学生档案'
         verbose_name_plural = '学生档案'
+        indexes = [
+            # 排名和学生列表按总加分降序
+            models.Index(fields=['-total_score', 'id'], name='profile_total_score'),
+        ]
     
     def save(self, *args, **kwargs):
-        # 标记是否是新对象（之前没有主键）
-        is_new = self.pk is None
-        
-        # 先调用父类的save方法保存对象到数据库
+        # 总加分只由提交记录状态切换增量维护，整行保存时不写回内存中可能过期的值
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DERIVED_FIELDS
+            ]
         super().save(*args, **kwargs)
-        
-        # 只有当对象已有主键时才计算总加分（已保存到数据库）
-        if not is_new:
-            approved_submissions = self.submissions.filter(status='approved')
-            self.total_score = sum(sub.score_item.score for sub in approved_submissions)
-            # 再次保存，但不触发递归
-            super().save(update_fields=['total_score'])
+
+    def recalculate_aggregates(self):
+        """按提交记录全量重算总加分和各状态计数（仅用于数据修复，日常由状态切换增量维护）"""
+        recalculate_student_aggregates([self.pk])
+        self.refresh_from_db(fields=list(self.DERIVED_FIELDS) + ['last_updated'])
 
 # 加分项目模型（新增，只定义一次）
 class ScoreItem(models.Model):
@@ -60,6 +98,18 @@ class ScoreItem(models.Model):
         verbose_name = '加分项目'
         verbose_name_plural = '加分项目'
 
+    def save(self, *args, **kwargs):
+        old_score = None
+        if self.pk is not None:
+            old_score = ScoreItem.objects.filter(pk=self.pk).values_list('score', flat=True).first()
+        super().save(*args, **kwargs)
+        # 分值被修改时，只重算已通过该项目的学生，由后台任务执行
+        if old_score is not None and old_score != self.score:
+            tasks.refresh_student_aggregates.enqueue_batch(
+                Submission.objects.filter(score_item=self, status='approved')
+                .order_by().values_list('student_id', flat=True).distinct()
+            )
+
 
 
 # 信号处理函数：创建用户后自动添加到学生组
@@ -90,7 +140,7 @@ class Submission(models.Model):
     ]
     student = models.ForeignKey(StudentProfile, verbose_name="学生", on_delete=models.CASCADE, related_name='submissions')
     score_item = models.ForeignKey(ScoreItem, verbose_name="加分项目", on_delete=models.CASCADE)
-    proof_file = models.FileField("证明文件", upload_to='proofs/')
+    proof_file = models.FileField("证明文件", upload_to='proofs/', storage=proof_storage)
     additional_info = models.TextField("补充说明", blank=True)
     status = models.CharField("状态", max_length=20, choices=STATUS_CHOICES, default='pending')
     submitted_at = models.DateTimeField("提交时间", auto_now_add=True)
@@ -105,6 +155,178 @@ class Submission(models.Model):
         verbose_name = '提交记录'
         verbose_name_plural = '提交记录'
         ordering = ['-submitted_at']  # 默认按提交时间降序排列
+        # 索引末尾隐含主键，按(提交时间, ID)的游标分页可直接顺序读取
+        indexes = [
+            models.Index(fields=['submitted_at'], name='submission_submitted'),
+            models.Index(fields=['status', 'submitted_at'], name='submission_status_submitted'),
+            models.Index(fields=['student', 'submitted_at'], name='submission_student_submitted'),
+            models.Index(fields=['student', 'status'], name='submission_student_status'),
+            models.Index(fields=['reviewed_at'], name='submission_reviewed'),
+        ]
+
+    def transition(self, new_status, reviewer=None, comment=None, from_status=None):
+        """
+        审核状态切换的统一入口：以旧状态为条件更新本行，并增量维护学生总加分
+        指定from_status时，只有当前状态与之相同才会切换；返回是否切换成功
+        """
+        with transaction.atomic():
+            current = Submission.objects.select_for_update().filter(pk=self.pk)
+            row = current.values_list('status', 'score_item__score').first()
+            if row is None:
+                return False
+            old_status, score = row
+            if from_status is not None and old_status != from_status:
+                return False
+
+            changes = {'status': new_status}
+            if reviewer is not None:
+                changes['reviewer'] = reviewer
+                changes['reviewed_at'] = timezone.now()
+            if comment is not None:
+                changes['reviewer_comment'] = comment
+
+            # 条件更新：并发审核同一条记录时只有一个请求能生效，避免重复计分
+            if not current.filter(status=old_status).update(**changes):
+                return False
+            for field, value in changes.items():
+                setattr(self, field, value)
+            if comment is not None:
+                tasks.index_submissions.enqueue_batch([self.pk])
+            bump_version(Submission, [self.pk])
+            apply_status_change(self.student_id, score, old_status, new_status)
+            notify_review_results([self.pk], new_status)
+        return True
+
+
+# 证明文件按内容去重保存，引用随提交记录的保存和删除同步
+track_proof_file(Submission, 'proof_file')
+
+# 保存和删除时递增版本号；queryset.update()等不触发信号的写入在下面各入口中单独递增
+track_versions(StudentProfile)
+track_versions(ScoreItem)
+track_versions(Submission)
+
+
+def bulk_transition(submission_ids, new_status, reviewer=None, comment=None, from_status='pending'):
+    """
+    批量审核状态切换：一条集合UPDATE只更新仍处于from_status的记录，
+    受影响学生的总加分和计数由后台任务按学生合并重算
+    返回 {提交记录ID: 结果}，结果为新状态、'not_found'（记录不存在）或 'not_<from_status>'（状态不符）
+    """
+    submission_ids = {int(pk) for pk in submission_ids}
+    outcomes = dict.fromkeys(submission_ids, 'not_found')
+    with transaction.atomic():
+        rows = Submission.objects.select_for_update().filter(pk__in=submission_ids).values_list('pk', 'status', 'student_id')
+        eligible = []
+        student_ids = set()
+        for pk, current_status, student_id in rows:
+            if current_status == from_status:
+                eligible.append(pk)
+                student_ids.add(student_id)
+            else:
+                outcomes[pk] = f'not_{from_status}'
+        if not eligible:
+            return outcomes
+
+        changes = {'status': new_status}
+        if reviewer is not None:
+            changes['reviewer'] = reviewer
+            changes['reviewed_at'] = timezone.now()
+        if comment is not None:
+            changes['reviewer_comment'] = comment
+        Submission.objects.filter(pk__in=eligible, status=from_status).update(**changes)
+        bump_version(Submission, eligible)
+        if comment is not None:
+            tasks.index_submissions.enqueue_batch(eligible)
+        tasks.refresh_student_aggregates.enqueue_batch(student_ids)
+        notify_review_results(eligible, new_status)
+    outcomes.update(dict.fromkeys(eligible, new_status))
+    return outcomes
+
+
+def notify_review_results(submission_ids, new_status):
+    """审核通过或驳回后通知学生；通知随当前事务写入发件箱，由后台任务合并发送"""
+    if new_status not in ('approved', 'rejected'):
+        return
+    verdict = '审核通过' if new_status == 'approved' else '未通过审核'
+    rows = Submission.objects.filter(pk__in=submission_ids).values_list(
+        'student__email', 'student__user__email', 'student__full_name', 'score_item__name', 'reviewer_comment'
+    )
+    outbox.add(
+        (profile_email or user_email, full_name,
+         f'加分申请「{item}」{verdict}' + (f'，审核意见：{comment}' if comment else ''))
+        for profile_email, user_email, full_name, item, comment in rows
+    )
+
+
+def apply_status_change(student_id, score, old_status, new_status):
+    """
+    按提交记录的状态变化增量调整学生总加分和各状态计数
+    old_status为None表示新建记录，new_status为None表示记录被删除
+    """
+    if old_status == new_status:
+        return
+    changes = {'last_updated': timezone.now()}
+    if old_status is None:
+        changes['submission_count'] = F('submission_count') + 1
+    else:
+        changes[f'{old_status}_count'] = F(f'{old_status}_count') - 1
+    if new_status is None:
+        changes['submission_count'] = F('submission_count') - 1
+    else:
+        changes[f'{new_status}_count'] = F(f'{new_status}_count') + 1
+
+    delta = 0
+    if old_status == 'approved':
+        delta -= score
+    if new_status == 'approved':
+        delta += score
+    if delta:
+        changes['total_score'] = F('total_score') + delta
+    StudentProfile.objects.filter(pk=student_id).update(**changes)
+    bump_version(StudentProfile, [student_id])
+    if delta:
+        # 事务提交后再调整排名索引，回滚时索引保持不变
+        transaction.on_commit(lambda: rank_index.adjust(student_id, delta))
+
+
+def recalculate_student_aggregates(student_ids):
+    """对指定学生全量重算总加分和各状态计数，单条UPDATE完成；student_ids可为列表或子查询"""
+    student_submissions = Submission.objects.filter(student=OuterRef('pk')).order_by().values('student')
+    approved_total = student_submissions.filter(status='approved').annotate(
+        total=Sum('score_item__score')
+    ).values('total')
+    changes = {
+        'total_score': Coalesce(Subquery(approved_total), Value(0.0)),
+        'last_updated': timezone.now(),
+    }
+    for name, expression in submission_stat_expressions().items():
+        changes[name] = Coalesce(Subquery(student_submissions.annotate(n=expression).values('n')), Value(0))
+    updated = StudentProfile.objects.filter(pk__in=student_ids).update(**changes)
+    # 传入子查询时只递增模型的版本号
+    bump_version(StudentProfile, student_ids if isinstance(student_ids, (list, set, tuple)) else ())
+    transaction.on_commit(rank_index.invalidate)
+    return updated
+
+
+def _approved_score(submission, *statuses):
+    # 只有涉及approved状态时才需要读取项目分值
+    return submission.score_item.score if 'approved' in statuses else 0
+
+
+@receiver(post_save, sender=Submission)
+def submission_created(sender, instance, created, raw=False, **kwargs):
+    # 新建记录计入总加分（例如后台直接录入已通过的记录）
+    if created and not raw:
+        apply_status_change(instance.student_id, _approved_score(instance, instance.status), None, instance.status)
+
+
+@receiver(post_delete, sender=Submission)
+def submission_deleted(sender, instance, origin=None, **kwargs):
+    # 删除学生档案时级联删除的记录无需再调整该档案
+    if isinstance(origin, StudentProfile) or getattr(origin, 'model', None) is StudentProfile:
+        return
+    apply_status_change(instance.student_id, _approved_score(instance, instance.status), instance.status, None)
 
 
 class StudentInfoChangeLog(models.Model):
@@ -124,4 +346,45 @@ class StudentInfoChangeLog(models.Model):
     class Meta:
         verbose_name = '学生信息变更日志'
         verbose_name_plural = '学生信息变更日志'
-        ordering = ['-change_time']
\ No newline at end of file
+        ordering = ['-change_time']
+
+
+# 学生档案变化时同步排名索引
+@receiver(post_save, sender=StudentProfile)
+def sync_rank_index(sender, instance, created, raw=False, **kwargs):
+    if created:
+        # 新档案需要确认是否为超级管理员账号，直接让索引重建
+        transaction.on_commit(rank_index.invalidate)
+    elif not raw:
+        transaction.on_commit(lambda: rank_index.update_student(instance.pk, instance.major, instance.class_name))
+
+
+@receiver(post_delete, sender=StudentProfile)
+def remove_from_rank_index(sender, instance, **kwargs):
+    student_id = instance.pk
+    transaction.on_commit(lambda: rank_index.remove_student(student_id))
+
+
+# 学生档案、加分项目和提交记录变化时同步全文索引；状态切换入口直接更新审核意见，在其中单独同步
+@receiver(post_init, sender=StudentProfile)
+@receiver(post_init, sender=ScoreItem)
+@receiver(post_init, sender=Submission)
+def remember_search_values(sender, instance, **kwargs):
+    search.remember(instance)
+
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_save, sender=ScoreItem)
+@receiver(post_save, sender=Submission)
+def sync_search_index(sender, instance, created, **kwargs):
+    # 新提交的记录还没有审核意见，无需写入
+    if sender is Submission and created and not instance.reviewer_comment:
+        return
+    search.index_instance(instance, created)
+
+
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_delete, sender=ScoreItem)
+@receiver(post_delete, sender=Submission)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_instance(instance)
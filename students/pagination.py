@@ -0,0 +1,109 @@
+"""
+提交记录的键集（游标）分页
+
+按 (submitted_at, id) 降序定位，每页只取 page_size + 1 行：
+翻到第500页与第1页代价相同，单次请求的内存占用只与每页条数有关。
+HTML页面和JSON接口共用同一个分页器。
+"""
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class SubmissionKeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_page_size(self, params):
+        default = getattr(settings, 'SUBMISSION_PAGE_SIZE', 20)
+        try:
+            page_size = int(params.get(self.page_size_query_param, default))
+        except (TypeError, ValueError):
+            page_size = default
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, submission, direction):
+        payload = f'{direction}|{submission.submitted_at.isoformat()}|{submission.pk}'
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, token):
+        # 无效或被篡改的游标视为第一页
+        if not token:
+            return None
+        try:
+            direction, submitted_at, pk = base64.urlsafe_b64decode(token.encode()).decode().split('|')
+            submitted_at = parse_datetime(submitted_at)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        if direction not in ('next', 'prev') or submitted_at is None:
+            return None
+        return direction, submitted_at, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # 兼容DRF的Request和普通的HttpRequest
+        params = getattr(request, 'query_params', request.GET)
+        self.request = request
+        self.page_size = page_size = self.get_page_size(params)
+        cursor = self.decode_cursor(params.get(self.cursor_query_param))
+        queryset = queryset.order_by('-submitted_at', '-id')
+
+        if cursor is None:
+            rows = list(queryset[:page_size + 1])
+            has_next, has_previous = len(rows) > page_size, False
+            rows = rows[:page_size]
+        elif cursor[0] == 'next':
+            _, submitted_at, pk = cursor
+            rows = list(queryset.filter(
+                Q(submitted_at__lt=submitted_at) | Q(submitted_at=submitted_at, id__lt=pk)
+            )[:page_size + 1])
+            has_next, has_previous = len(rows) > page_size, True
+            rows = rows[:page_size]
+        else:
+            # 向前翻页时反向取数，再恢复为降序
+            _, submitted_at, pk = cursor
+            rows = list(queryset.filter(
+                Q(submitted_at__gt=submitted_at) | Q(submitted_at=submitted_at, id__gt=pk)
+            ).order_by('submitted_at', 'id')[:page_size + 1])
+            has_next, has_previous = True, len(rows) > page_size
+            rows = rows[:page_size][::-1]
+
+        self.next_cursor = self.encode_cursor(rows[-1], 'next') if rows and has_next else None
+        self.previous_cursor = self.encode_cursor(rows[0], 'prev') if rows and has_previous else None
+        return rows
+
+    def _link(self, token, absolute):
+        if token is None:
+            return None
+        url = self.request.build_absolute_uri() if absolute else self.request.get_full_path()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_next_link(self, absolute=True):
+        return self._link(self.next_cursor, absolute)
+
+    def get_previous_link(self, absolute=True):
+        return self._link(self.previous_cursor, absolute)
+
+    def get_page_context(self):
+        """HTML模板使用的分页上下文"""
+        return {
+            'is_paginated': bool(self.next_cursor or self.previous_cursor),
+            'next_page_url': self.get_next_link(absolute=False),
+            'previous_page_url': self.get_previous_link(absolute=False),
+            'page_size': self.page_size,
+        }
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'page_size': self.page_size,
+            'results': data,
+        })
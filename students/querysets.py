@@ -0,0 +1,50 @@
+"""
+API列表和CSV导出共用的筛选参数；params为request.query_params或同样支持get的字典
+"""
+
+
+def filter_submissions(queryset, params):
+    """管理员查看提交记录时的筛选：状态、提交时间范围、学号、加分项目"""
+    # 状态筛选
+    status_filter = params.get('status')
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+
+    # 时间范围筛选
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    if start_date:
+        queryset = queryset.filter(submitted_at__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(submitted_at__lte=end_date)
+
+    # 学生ID筛选
+    student_id = params.get('student_id')
+    if student_id:
+        queryset = queryset.filter(student__student_id=student_id)
+
+    # 加分项目ID筛选
+    score_item_id = params.get('score_item_id')
+    if score_item_id:
+        queryset = queryset.filter(score_item_id=score_item_id)
+    return queryset
+
+
+def filter_student_profiles(queryset, params):
+    """学生档案的专业、年级、班级筛选"""
+    filters = {field: params.get(field) for field in ('major', 'grade', 'class_name') if params.get(field)}
+    return queryset.filter(**filters) if filters else queryset
+
+
+def filter_change_logs(queryset, params):
+    """变更日志的学号、修改时间范围筛选"""
+    student_id = params.get('student_id')
+    if student_id:
+        queryset = queryset.filter(student__student_id=student_id)
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    if start_date:
+        queryset = queryset.filter(change_time__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(change_time__lte=end_date)
+    return queryset
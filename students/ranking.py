@@ -0,0 +1,144 @@
+"""
+学生排名索引
+
+在进程内按总加分维护有序数组，提供全局、专业、班级三种范围的竞争排名（同分同名次，如1224），
+查询某个学生的排名和前后相邻的学生都只需一次二分查找。
+总加分变化时由状态切换入口增量调整，学生档案新增/删除/调整专业班级时同步更新，
+并按RANK_INDEX_TTL秒定期全量重建，以吸收其他进程写入的变化。
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+SCOPES = ('global', 'major', 'class')
+
+
+def _scope_keys(major, class_name):
+    return {'global': ('global', None), 'major': ('major', major), 'class': ('class', class_name)}
+
+
+class RankIndex:
+    def __init__(self, ttl=None):
+        self._lock = threading.RLock()
+        self._ttl = ttl
+        self._students = {}  # 学生ID -> (总加分, 专业, 班级)
+        self._entries = {}   # 范围键 -> 按(-总加分, 学生ID)升序排列的列表
+        self._built_at = None
+
+    @property
+    def ttl(self):
+        return self._ttl if self._ttl is not None else getattr(settings, 'RANK_INDEX_TTL', 60)
+
+    def rebuild(self):
+        """从数据库一次性加载所有学生（排除超级管理员账号）并重建索引"""
+        from .models import StudentProfile
+
+        students = {}
+        entries = {}
+        rows = StudentProfile.objects.exclude(user__is_superuser=True).values_list(
+            'id', 'total_score', 'major', 'class_name'
+        )
+        for pk, score, major, class_name in rows:
+            students[pk] = (score, major, class_name)
+            for key in _scope_keys(major, class_name).values():
+                entries.setdefault(key, []).append((-score, pk))
+        for items in entries.values():
+            items.sort()
+
+        with self._lock:
+            self._students = students
+            self._entries = entries
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        """标记索引过期，下次查询时重建"""
+        with self._lock:
+            self._built_at = None
+
+    def _ensure_built(self):
+        if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+            self.rebuild()
+
+    def _remove(self, student_id):
+        score, major, class_name = self._students.pop(student_id)
+        for key in _scope_keys(major, class_name).values():
+            items = self._entries[key]
+            del items[bisect_left(items, (-score, student_id))]
+
+    def _insert(self, student_id, score, major, class_name):
+        self._students[student_id] = (score, major, class_name)
+        for key in _scope_keys(major, class_name).values():
+            insort(self._entries.setdefault(key, []), (-score, student_id))
+
+    def adjust(self, student_id, delta):
+        """总加分增量变化后调整学生位置；索引尚未加载时无需处理"""
+        with self._lock:
+            if self._built_at is None or student_id not in self._students:
+                return
+            score, major, class_name = self._students[student_id]
+            self._remove(student_id)
+            self._insert(student_id, score + delta, major, class_name)
+
+    def update_student(self, student_id, major, class_name, score=None):
+        """学生档案保存后同步专业、班级；未收录的学生按传入的总加分加入"""
+        with self._lock:
+            if self._built_at is None:
+                return
+            if student_id in self._students:
+                score = self._students[student_id][0]
+                self._remove(student_id)
+            elif score is None:
+                return
+            self._insert(student_id, score, major, class_name)
+
+    def remove_student(self, student_id):
+        with self._lock:
+            if self._built_at is not None and student_id in self._students:
+                self._remove(student_id)
+
+    def _rank_in(self, items, score):
+        # 总加分严格高于该学生的人数 + 1，即竞争排名
+        return bisect_left(items, (-score,)) + 1
+
+    def rank(self, student_id, scope='global'):
+        """返回学生在指定范围内的排名，学生不在索引中时返回None"""
+        with self._lock:
+            self._ensure_built()
+            info = self._students.get(student_id)
+            if info is None:
+                return None
+            score, major, class_name = info
+            return self._rank_in(self._entries[_scope_keys(major, class_name)[scope]], score)
+
+    def ranks(self, student_id):
+        """一次返回全局、专业、班级三种排名"""
+        with self._lock:
+            self._ensure_built()
+            info = self._students.get(student_id)
+            if info is None:
+                return {scope: None for scope in SCOPES}
+            score, major, class_name = info
+            keys = _scope_keys(major, class_name)
+            return {scope: self._rank_in(self._entries[keys[scope]], score) for scope in SCOPES}
+
+    def neighbours(self, student_id, radius=2, scope='global'):
+        """返回排名在该学生前后radius名以内的学生列表（含本人）"""
+        with self._lock:
+            self._ensure_built()
+            info = self._students.get(student_id)
+            if info is None:
+                return []
+            score, major, class_name = info
+            items = self._entries[_scope_keys(major, class_name)[scope]]
+            position = bisect_left(items, (-score, student_id))
+            window = items[max(position - radius, 0):position + radius + 1]
+            return [
+                {'id': pk, 'total_score': -neg_score, 'rank': self._rank_in(items, -neg_score)}
+                for neg_score, pk in window
+            ]
+
+
+# 进程级共享的排名索引
+rank_index = RankIndex()
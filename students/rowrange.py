@@ -0,0 +1,63 @@
+"""
+虚拟滚动表格的行区间接口
+
+页面只请求可见区域附近的行：?offset=&limit= 返回第[offset, offset+limit)行，
+每行是按columns顺序排列的数组，比逐行的对象更紧凑。
+总行数按筛选条件、用户范围和数据版本号缓存ROW_COUNT_CACHE_TIMEOUT秒；数据变化后版本号递增，
+缓存键随之改变，滚动时不必每次都执行COUNT。
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from versioning.models import lookup
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def window(params):
+    """解析offset和limit，非法值按默认值处理，limit不超过MAX_LIMIT"""
+    def parse(name, default):
+        try:
+            return max(int(params.get(name, default)), 0)
+        except (TypeError, ValueError):
+            return default
+    return parse('offset', 0), min(parse('limit', DEFAULT_LIMIT) or DEFAULT_LIMIT, MAX_LIMIT)
+
+
+def cached_count(queryset, name, filters, version_keys, scope='', versions=None):
+    """versions为已读出的{键: (版本号, 更新时间)}（如条件GET读出的request.data_versions），缺少时查询"""
+    if versions is None or not set(version_keys) <= versions.keys():
+        versions = lookup(version_keys)
+    versions = sorted((key, versions[key][0]) for key in version_keys)
+    raw = json.dumps([scope, sorted(filters.items()), versions], default=str)
+    key = f'students:rows:{name}:{hashlib.sha1(raw.encode()).hexdigest()}'
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, getattr(settings, 'ROW_COUNT_CACHE_TIMEOUT', 300))
+    return total
+
+
+def row_range(queryset, params, *, name, fields, columns, filters, version_keys, scope='', versions=None):
+    """
+    fields为values_list读取的字段路径；columns为[(列名, 取值)]，取值为fields中的路径，
+    或接收{路径: 值}字典的函数（用于排名、是否有预览图等不在表中的列）
+    filters为已应用的筛选条件，原样返回给页面；version_keys、scope和versions见cached_count
+    """
+    offset, limit = window(params)
+    total = cached_count(queryset, name, filters, version_keys, scope, versions)
+    rows = []
+    for values in queryset.values_list(*fields)[offset:offset + limit]:
+        record = dict(zip(fields, values))
+        rows.append([record[source] if isinstance(source, str) else source(record) for _, source in columns])
+    return {
+        'columns': [column for column, _ in columns],
+        'total': total,
+        'offset': offset,
+        'rows': rows,
+        'filters': filters,
+    }
@@ -0,0 +1,235 @@
+"""
+学生、加分项目和审核意见的全文索引（SQLite FTS5）
+
+三张FTS5表的rowid即对应记录的主键：
+    students_search_student     姓名、学号、专业、班级
+    students_search_scoreitem   项目名称、项目描述
+    students_search_submission  审核意见
+
+unicode61分词器会把连续的汉字当作一个词，因此入库和查询时都在每个汉字两侧加空格，
+按短语匹配连续的单字，效果等同于子串匹配；学号额外存入它的所有后缀，前缀查询即可匹配学号中的任意片段；
+其他英文、数字按词前缀匹配。
+
+写入由models.py中的信号和状态切换入口同步；直接执行SQL修改档案的视图需调用index_students。
+非SQLite数据库没有索引表，各过滤函数退回icontains查询。
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+STUDENT_TABLE = 'students_search_student'
+SCORE_ITEM_TABLE = 'students_search_scoreitem'
+SUBMISSION_TABLE = 'students_search_submission'
+
+STUDENT_COLUMNS = ('full_name', 'student_id', 'major', 'class_name')
+SCORE_ITEM_COLUMNS = ('name', 'description')
+SUBMISSION_COLUMNS = ('reviewer_comment',)
+
+CJK_RE = re.compile(r'([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff])')
+
+
+def enabled(using=None):
+    return (using or connection).vendor == 'sqlite'
+
+
+def index_text(value):
+    """在每个汉字两侧加空格，使其成为单独的词"""
+    return CJK_RE.sub(r' \1 ', value or '')
+
+
+def student_id_text(value):
+    # 存入学号的所有后缀，前缀查询即可匹配任意片段
+    value = (value or '').strip()
+    return ' '.join(value[start:] for start in range(len(value)))
+
+
+def create_tables(cursor):
+    for table, columns in ((STUDENT_TABLE, STUDENT_COLUMNS), (SCORE_ITEM_TABLE, SCORE_ITEM_COLUMNS),
+                           (SUBMISSION_TABLE, SUBMISSION_COLUMNS)):
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({', '.join(columns)}, "
+                       f"tokenize='unicode61')")
+
+
+def drop_tables(cursor):
+    for table in (STUDENT_TABLE, SCORE_ITEM_TABLE, SUBMISSION_TABLE):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def student_row(full_name, student_id, major, class_name):
+    return index_text(full_name), student_id_text(student_id), index_text(major), index_text(class_name)
+
+
+def score_item_row(name, description):
+    return index_text(name), index_text(description)
+
+
+def submission_row(reviewer_comment):
+    return (index_text(reviewer_comment),)
+
+
+def write_rows(cursor, table, columns, rows, replace=True):
+    """rows为(主键, 各列文本)的列表；replace时先删除旧行，全部为空的行不写入"""
+    if replace:
+        cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(row[0],) for row in rows])
+    cursor.executemany(
+        f"INSERT INTO {table} (rowid, {', '.join(columns)}) VALUES (%s{', %s' * len(columns)})",
+        [row for row in rows if any(row[1:])],
+    )
+
+
+def _index_spec(model):
+    from .models import StudentProfile, ScoreItem, Submission
+    return {
+        StudentProfile: (STUDENT_TABLE, STUDENT_COLUMNS, student_row),
+        ScoreItem: (SCORE_ITEM_TABLE, SCORE_ITEM_COLUMNS, score_item_row),
+        Submission: (SUBMISSION_TABLE, SUBMISSION_COLUMNS, submission_row),
+    }[model]
+
+
+def _reindex(model, pks):
+    if not enabled():
+        return
+    pks = list(pks)
+    if not pks:
+        return
+    table, columns, build_row = _index_spec(model)
+    found = {
+        values[0]: build_row(*values[1:])
+        for values in model.objects.filter(pk__in=pks).values_list('pk', *columns)
+    }
+    with connection.cursor() as cursor:
+        write_rows(cursor, table, columns, [(pk, *found.get(pk, ('',) * len(columns))) for pk in pks])
+
+
+def index_students(pks):
+    """按主键从数据库重新读取学生档案并更新索引，用于直接执行SQL的写入"""
+    from .models import StudentProfile
+    _reindex(StudentProfile, pks)
+
+
+def index_submissions(pks):
+    from .models import Submission
+    _reindex(Submission, pks)
+
+
+def _loaded_values(instance, columns):
+    # 只读取已加载的字段，避免延迟加载的字段触发查询
+    return tuple(instance.__dict__.get(column) for column in columns)
+
+
+def remember(instance):
+    """记录实例当前的索引字段值，保存时据此判断是否需要更新索引"""
+    instance._search_values = _loaded_values(instance, _index_spec(type(instance))[1])
+
+
+def index_instance(instance, created=False):
+    """按实例当前的字段值写入索引；索引字段未变化时不写入"""
+    if not enabled():
+        return
+    table, columns, build_row = _index_spec(type(instance))
+    if any(column not in instance.__dict__ for column in columns):
+        # 有延迟加载的字段，从数据库读取整行
+        _reindex(type(instance), [instance.pk])
+        return
+    values = _loaded_values(instance, columns)
+    if not created and getattr(instance, '_search_values', None) == values:
+        return
+    with connection.cursor() as cursor:
+        write_rows(cursor, table, columns, [(instance.pk, *build_row(*values))])
+    instance._search_values = values
+
+
+def index_created(instances):
+    """写入批量新建记录的索引；bulk_create不触发信号，由调用方在创建后调用"""
+    if enabled() and instances:
+        table, columns, build_row = _index_spec(type(instances[0]))
+        rows = [(instance.pk, *build_row(*(getattr(instance, column) for column in columns)))
+                for instance in instances]
+        with connection.cursor() as cursor:
+            write_rows(cursor, table, columns, rows, replace=False)
+
+
+def remove_instance(instance):
+    if enabled():
+        table = _index_spec(type(instance))[0]
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [instance.pk])
+
+
+def rebuild():
+    """清空并重建全部索引，返回 {表名: 行数}"""
+    from .models import StudentProfile, ScoreItem, Submission
+
+    counts = {}
+    with connection.cursor() as cursor:
+        for model in (StudentProfile, ScoreItem, Submission):
+            table, columns, build_row = _index_spec(model)
+            cursor.execute(f"DELETE FROM {table}")
+            rows = [(values[0], *build_row(*values[1:]))
+                    for values in model.objects.values_list('pk', *columns).iterator()]
+            write_rows(cursor, table, columns, rows, replace=False)
+            counts[table] = len(rows)
+    return counts
+
+
+def match_expression(text, columns=None):
+    """把用户输入转换为FTS5查询：整体作为短语，最后一个词按前缀匹配；没有可检索的词时返回None"""
+    tokens = index_text(text).split()
+    if not tokens:
+        return None
+    phrase = ' '.join(token.replace('"', '""') for token in tokens)
+    expression = f'"{phrase}" *'
+    if columns:
+        expression = f"{{{' '.join(columns)}}} : {expression}"
+    return expression
+
+
+def _filter(table, all_columns, text, fields, relation):
+    fields = tuple(fields or all_columns)
+    lookup = f'{relation}__' if relation else ''
+    if not enabled():
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{lookup}{field}__icontains': text})
+        return condition
+    expression = match_expression(text, fields)
+    if expression is None:
+        return Q()
+    matches = RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [expression])
+    return Q(**{f'{relation}__in' if relation else 'pk__in': matches})
+
+
+def student_filter(text, fields=None, relation=None):
+    """匹配学生档案的条件；relation为从当前模型到学生档案的关联名"""
+    return _filter(STUDENT_TABLE, STUDENT_COLUMNS, text, fields, relation)
+
+
+def score_item_filter(text, fields=None, relation=None):
+    return _filter(SCORE_ITEM_TABLE, SCORE_ITEM_COLUMNS, text, fields, relation)
+
+
+def submission_filter(text):
+    """提交记录的综合检索：学生姓名、学号、项目名称或审核意见"""
+    return (student_filter(text, ('full_name', 'student_id'), relation='student')
+            | score_item_filter(text, ('name',), relation='score_item')
+            | _filter(SUBMISSION_TABLE, SUBMISSION_COLUMNS, text, None, None))
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """search参数走全文索引；未建索引的模型沿用SearchFilter的icontains查询"""
+
+    def get_index_filter(self, model):
+        from .models import StudentProfile, ScoreItem, Submission
+        return {StudentProfile: student_filter, ScoreItem: score_item_filter, Submission: submission_filter}.get(model)
+
+    def filter_queryset(self, request, queryset, view):
+        build = self.get_index_filter(queryset.model)
+        terms = self.get_search_terms(request)
+        if build is None or not terms or not self.get_search_fields(view, request):
+            return super().filter_queryset(request, queryset, view)
+        for term in terms:
+            queryset = queryset.filter(build(term))
+        return queryset
@@ -1,6 +1,12 @@
 # students/serializers.py
+from django.urls import reverse
 from rest_framework import serializers
+from proofstore.previews import has_preview
+from .fieldsets import SparseFieldsMixin
+from .loaders import BatchListSerializer, loaders
 from .models import StudentProfile, Submission, ScoreItem
+from .ranking import rank_index
+from teachers.serializers import TeacherProfileSerializer
 from django.contrib.auth.models import User
 
 class UserSerializer(serializers.ModelSerializer):
@@ -8,40 +14,32 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email']
 
-class StudentProfileSerializer(serializers.ModelSerializer):
+class StudentProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     rank = serializers.SerializerMethodField()  # 排名字段
-    submission_count = serializers.SerializerMethodField()  # 新增提交数量字段
-    approved_count = serializers.SerializerMethodField()  # 新增通过数量字段
+    expandable = {'user': ('user',)}
     
     class Meta:
         model = StudentProfile
         fields = ['id', 'user', 'full_name', 'student_id', 'major', 'grade',
                  'class_name', 'email', 'phone', 'total_score', 
-                 'rank', 'submission_count', 'approved_count', 'last_updated']
-        read_only_fields = ['total_score', 'rank', 'submission_count', 'approved_count', 'last_updated']
+                 'rank', 'submission_count', 'approved_count', 'pending_count',
+                 'rejected_count', 'revoked_count', 'last_updated']
+        read_only_fields = ['total_score', 'rank', 'submission_count', 'approved_count', 'pending_count',
+                            'rejected_count', 'revoked_count', 'last_updated']
 
     def get_rank(self, obj):
-        # 计算排名
-        all_students = StudentProfile.objects.all().order_by('-total_score')
-        ranks = {student.id: idx+1 for idx, student in enumerate(all_students)}
-        return ranks.get(obj.id, None)
+        # 从排名索引读取全局排名（同分同名次）
+        return rank_index.rank(obj.id)
     
-    def get_submission_count(self, obj):
-        # 获取学生提交记录总数
-        return obj.submissions.count()
-    
-    def get_approved_count(self, obj):
-        # 获取学生通过的记录数
-        return obj.submissions.filter(status='approved').count()
 
-class ScoreItemSerializer(serializers.ModelSerializer):
+class ScoreItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ScoreItem
         fields = ['id', 'name', 'category', 'level', 'score', 'description']
 
 
-class SubmissionSerializer(serializers.ModelSerializer):
+class SubmissionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     student = StudentProfileSerializer(read_only=True)
     score_item = ScoreItemSerializer(read_only=True)
     reviewer = serializers.SerializerMethodField()  # 使用SerializerMethodField自定义处理
@@ -51,37 +49,64 @@ class SubmissionSerializer(serializers.ModelSerializer):
         write_only=True
     )
     proof_file_url = serializers.SerializerMethodField()  # 证明文件URL
+    preview_url = serializers.SerializerMethodField()  # 证明文件缩略图URL，无法预览的文件为null
     status_display = serializers.CharField(source='get_status_display', read_only=True)  # 状态显示文本
+    expandable = {
+        'student': ('student__user',),
+        'score_item': ('score_item',),
+        'reviewer': ('reviewer__teacher_profile',),
+    }
+    field_sources = {'proof_file_url': ('proof_file',), 'preview_url': ('proof_file',), 'status_display': ('status',)}
+    always_load = ('submitted_at',)  # 游标分页按(submitted_at, id)生成游标
 
     class Meta:
         model = Submission
         fields = ['id', 'student', 'score_item', 'score_item_id', 'proof_file',
-                  'proof_file_url', 'additional_info', 'status', 'status_display',
+                  'proof_file_url', 'preview_url', 'additional_info', 'status', 'status_display',
                   'reviewer_comment', 'reviewer', 'submitted_at', 'reviewed_at']
-        read_only_fields = ['status', 'reviewer', 'reviewed_at', 'proof_file_url', 'status_display']
+        read_only_fields = ['status', 'reviewer', 'reviewed_at', 'proof_file_url', 'preview_url', 'status_display']
+        list_serializer_class = BatchListSerializer
+
+    @staticmethod
+    def prime_reviewer(batch, submission):
+        # 查询集已select_related('reviewer__teacher_profile')取出的审核人和老师档案直接复用
+        if submission.reviewer_id is None or not Submission.reviewer.is_cached(submission):
+            return
+        reviewer = submission.reviewer
+        batch['reviewer'].prime(reviewer.pk, reviewer)
+        if User.teacher_profile.is_cached(reviewer):
+            batch['teacher_profile'].prime(reviewer.pk, User.teacher_profile.related.get_cached_value(reviewer))
+
+    def collect(self, submissions):
+        # 收集整页的审核人，老师档案和审核数各一条查询取回；未请求reviewer字段时不读取
+        if 'reviewer' not in self.fields:
+            return
+        batch = loaders(self.context)
+        for submission in submissions:
+            self.prime_reviewer(batch, submission)
+        reviewer_ids = {submission.reviewer_id for submission in submissions}
+        for name in ('reviewer', 'teacher_profile', 'review_count'):
+            batch[name].add(reviewer_ids)
 
     def get_reviewer(self, obj):
         # 自定义获取审核人信息，如果有审核人且是老师，则返回老师档案信息
-        if obj.reviewer:
-            try:
-                teacher_profile = TeacherProfile.objects.get(user=obj.reviewer)
-                return TeacherProfileSerializer(teacher_profile, context=self.context).data
-            except TeacherProfile.DoesNotExist:
-                # 如果审核人不是老师，则返回用户基本信息
-                return UserSerializer(obj.reviewer, context=self.context).data
-        return None
+        if obj.reviewer_id is None:
+            return None
+        batch = loaders(self.context)
+        self.prime_reviewer(batch, obj)
+        teacher_profile = batch['teacher_profile'].load(obj.reviewer_id)
+        if teacher_profile is not None:
+            return TeacherProfileSerializer(teacher_profile, context=self.context).data
+        # 如果审核人不是老师，则返回用户基本信息
+        return UserSerializer(batch['reviewer'].load(obj.reviewer_id), context=self.context).data
 
     def get_proof_file_url(self, obj):
-        if obj.proof_file and hasattr(obj.proof_file, 'url'):
-            return self.context['request'].build_absolute_uri(obj.proof_file.url)
+        # 证明文件经权限检查后下载
+        if obj.proof_file:
+            return self.context['request'].build_absolute_uri(reverse('students:submission-proof', args=[obj.pk]))
+        return None
+
+    def get_preview_url(self, obj):
+        if obj.proof_file and has_preview(obj.proof_file.name):
+            return self.context['request'].build_absolute_uri(reverse('students:submission-preview', args=[obj.pk]))
         return None
-    
-    def update(self, instance, validated_data):
-        # 允许学生撤回待审核的申请
-        if 'status' in validated_data and validated_data['status'] == 'revoked':
-            if instance.status == 'pending':
-                instance.status = 'revoked'
-                return instance
-            else:
-                raise serializers.ValidationError("只能撤回待审核的申请")
-        return super().update(instance, validated_data)
\ No newline at end of file
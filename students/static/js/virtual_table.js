@@ -0,0 +1,144 @@
+// 虚拟滚动表格 - 只渲染可见区域附近的行，滚动时按块向行区间接口（?offset=&limit=）请求数据
+//
+//   new VirtualTable(document.getElementById('student-table'), {
+//       url: '/api/students/rows/',
+//       params: location.search,          // 页面上的筛选条件原样传给接口
+//       rowHeight: 48,                    // 行高固定，由CSS的.vt-row保证
+//       renderRow: function (row) { ... } // row为{列名: 值}，返回<tr class="vt-row">...</tr>
+//   });
+class VirtualTable {
+    constructor(container, options) {
+        this.container = container;               // 固定高度、可滚动的容器，其中包含table
+        this.tbody = container.querySelector('tbody');
+        this.colspan = container.querySelectorAll('thead th').length || 1;
+        this.url = options.url;
+        this.params = new URLSearchParams(options.params || '');
+        this.rowHeight = options.rowHeight || 48;
+        this.renderRow = options.renderRow;
+        this.emptyText = options.emptyText || '暂无数据';
+        this.onTotal = options.onTotal || function () {};
+        this.blockSize = options.blockSize || 100;   // 每次请求的行数，块对齐以便浏览器按ETag复用
+        this.overscan = options.overscan || 10;      // 可见区域上下多渲染的行数
+        this.maxBlocks = options.maxBlocks || 30;    // 最多缓存的块数，超过时丢弃离可见区域最远的块
+        this.blocks = new Map();                     // 块序号 -> 行数组，或请求中的Promise
+        this.columns = null;
+        this.total = null;
+        this.frame = null;
+
+        this.container.addEventListener('scroll', () => this.schedule(), { passive: true });
+        window.addEventListener('resize', () => this.schedule());
+        this.load(0);
+    }
+
+    static escape(value) {
+        if (value === null || value === undefined) {
+            return '';
+        }
+        return String(value).replace(/[&<>"']/g, (ch) => (
+            { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[ch]
+        ));
+    }
+
+    schedule() {
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => {
+                this.frame = null;
+                this.render();
+            });
+        }
+    }
+
+    load(block) {
+        if (this.blocks.has(block)) {
+            return;
+        }
+        const params = new URLSearchParams(this.params);
+        params.set('offset', block * this.blockSize);
+        params.set('limit', this.blockSize);
+        const request = fetch(`${this.url}?${params}`, {
+            headers: { 'Accept': 'application/json' },
+            credentials: 'same-origin',
+        })
+            .then((response) => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+            .then((data) => {
+                this.columns = data.columns;
+                if (this.total !== data.total) {
+                    this.total = data.total;
+                    this.onTotal(data.total);
+                }
+                this.blocks.set(block, data.rows);
+                this.schedule();
+            })
+            .catch((error) => {
+                this.blocks.delete(block);
+                console.error('加载表格数据失败:', error);
+            });
+        this.blocks.set(block, request);
+    }
+
+    evict(firstBlock, lastBlock) {
+        if (this.blocks.size <= this.maxBlocks) {
+            return;
+        }
+        const distance = (block) => Math.max(firstBlock - block, block - lastBlock, 0);
+        const loaded = Array.from(this.blocks.keys()).filter((block) => Array.isArray(this.blocks.get(block)));
+        loaded.sort((a, b) => distance(b) - distance(a));
+        for (const block of loaded.slice(0, this.blocks.size - this.maxBlocks)) {
+            this.blocks.delete(block);
+        }
+    }
+
+    record(index) {
+        const rows = this.blocks.get(Math.floor(index / this.blockSize));
+        if (!Array.isArray(rows)) {
+            return null;
+        }
+        const values = rows[index % this.blockSize];
+        if (values === undefined) {
+            return null;
+        }
+        const row = {};
+        this.columns.forEach((column, i) => { row[column] = values[i]; });
+        return row;
+    }
+
+    spacer(height) {
+        return height > 0
+            ? `<tr aria-hidden="true" style="height: ${height}px;"><td colspan="${this.colspan}" style="padding: 0; border: 0;"></td></tr>`
+            : '';
+    }
+
+    render() {
+        if (this.total === null) {
+            return;
+        }
+        if (this.total === 0) {
+            this.tbody.innerHTML = `<tr><td colspan="${this.colspan}" class="text-center text-muted">${VirtualTable.escape(this.emptyText)}</td></tr>`;
+            return;
+        }
+        const top = this.container.scrollTop;
+        const first = Math.max(0, Math.floor(top / this.rowHeight) - this.overscan);
+        const last = Math.min(this.total, Math.ceil((top + this.container.clientHeight) / this.rowHeight) + this.overscan);
+        const firstBlock = Math.floor(first / this.blockSize);
+        const lastBlock = Math.floor((last - 1) / this.blockSize);
+        for (let block = firstBlock; block <= lastBlock; block++) {
+            this.load(block);
+        }
+        this.evict(firstBlock, lastBlock);
+
+        const html = [this.spacer(first * this.rowHeight)];
+        for (let index = first; index < last; index++) {
+            const row = this.record(index);
+            html.push(row
+                ? this.renderRow(row)
+                : `<tr class="vt-row"><td colspan="${this.colspan}" class="text-muted">加载中...</td></tr>`);
+        }
+        html.push(this.spacer((this.total - last) * this.rowHeight));
+        this.tbody.innerHTML = html.join('');
+    }
+}
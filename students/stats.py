@@ -0,0 +1,46 @@
+"""
+首页、API根视图和教师工作台共用的系统统计
+
+学生数、各状态提交数和加分项目数由一条聚合SQL一次算出，结果按学生档案、提交记录和加分项目的数据版本号缓存；
+任一进程写入这些数据后版本号递增，各进程下次访问时重新计算。
+"""
+from django.conf import settings
+from django.db import connection
+
+from versioning.cache import cached
+
+STATUSES = ('pending', 'approved', 'rejected', 'revoked')
+
+
+def _compute():
+    from .models import StudentProfile, Submission, ScoreItem
+
+    status_columns = ', '.join(
+        f"COALESCE(SUM(CASE WHEN status = %s THEN 1 ELSE 0 END), 0)" for _ in STATUSES
+    )
+    sql = f"""
+        SELECT (SELECT COUNT(*) FROM {StudentProfile._meta.db_table}),
+               (SELECT COUNT(*) FROM {ScoreItem._meta.db_table}),
+               COUNT(*),
+               {status_columns}
+        FROM {Submission._meta.db_table}
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, list(STATUSES))
+        total_students, total_score_items, total_submissions, *status_counts = cursor.fetchone()
+
+    stats = {
+        'total_students': total_students,
+        'total_score_items': total_score_items,
+        'total_submissions': total_submissions,
+    }
+    for status, count in zip(STATUSES, status_counts):
+        stats[f'{status}_submissions'] = count
+    return stats
+
+
+@cached('students:dashboard_stats', ['students.studentprofile', 'students.submission', 'students.scoreitem'],
+        timeout=getattr(settings, 'DASHBOARD_STATS_TTL', 300))
+def dashboard_stats():
+    """返回统计快照（字典），缓存未命中时执行一次聚合查询"""
+    return _compute()
@@ -0,0 +1,21 @@
+"""
+审核后的派生数据刷新，由后台worker执行
+
+按学生合并：同一学生的多次刷新在执行前只保留一条，同一批领取的学生用一条UPDATE一起重算。
+"""
+from taskqueue.queue import task
+
+from . import search
+
+
+@task(batch=True)
+def refresh_student_aggregates(student_ids):
+    """全量重算学生的总加分和各状态计数，并使排名索引和首页统计失效"""
+    from .models import recalculate_student_aggregates
+    recalculate_student_aggregates(set(student_ids))
+
+
+@task(batch=True)
+def index_submissions(submission_ids):
+    """把提交记录的审核意见写入全文索引"""
+    search.index_submissions(set(submission_ids))
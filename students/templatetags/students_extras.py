@@ -1,11 +1,16 @@
 from django import template
 from django.utils.safestring import mark_safe
 
+from students.models import StudentProfile
+
 register = template.Library()
 
 @register.filter(name='approved_count')
 def approved_count(submissions):
-    """计算通过的提交记录数"""
+    """计算通过的提交记录数，传入学生档案或student.submissions时直接读取计数列"""
+    profile = submissions if isinstance(submissions, StudentProfile) else getattr(submissions, 'instance', None)
+    if isinstance(profile, StudentProfile):
+        return profile.approved_count
     try:
         return submissions.filter(status='approved').count()
     except:
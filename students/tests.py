@@ -1,7 +1,35 @@
 
-from django.test import TestCase
-from django.contrib.auth.models import User
-from .models import StudentProfile, ScoreItem
+import csv
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from unittest import mock, skipUnless
+from contextlib import redirect_stdout
+
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.contrib.auth.models import User, Group
+from django.core.files.uploadedfile import SimpleUploadedFile
+from . import exports, importing
+from rest_framework.request import Request
+from .models import StudentProfile, ScoreItem, Submission, StudentInfoChangeLog, bulk_transition
+from .ranking import RankIndex, rank_index
+from .stats import dashboard_stats
+from .search import student_filter, score_item_filter
+from .serializers import SubmissionSerializer
+from proofstore.models import ProofReference
+from notifications.models import Notification
+from taskqueue.models import Task
+from teachers.models import TeacherProfile
+from monitoring.logs import BackgroundHandler, JsonFormatter, SamplingFilter
 
 class StudentModelTest(TestCase):
     def setUp(self):
@@ -14,4 +42,981 @@ class StudentModelTest(TestCase):
 
     def test_student_creation(self):
         self.assertEqual(self.student.full_name, 'Test Student')
-        self.assertEqual(str(self.student), 'Test Student（123456）')
\ No newline at end of file
+        self.assertEqual(str(self.student), 'Test Student（123456）')
+
+class SubmissionTransitionTest(TestCase):
+    def setUp(self):
+        self.reviewer = User.objects.create_user(username='reviewer', is_staff=True)
+        self.user = User.objects.create_user(username='student')
+        self.student = StudentProfile.objects.create(user=self.user, full_name='学生甲', student_id='2023001')
+        self.item = ScoreItem.objects.create(name='省级竞赛', category='competition', level='省级', score=2.5)
+
+    def make_submission(self, status='pending'):
+        return Submission.objects.create(student=self.student, score_item=self.item, proof_file='proofs/a.pdf', status=status)
+
+    def total(self):
+        self.student.refresh_from_db()
+        return self.student.total_score
+
+    def test_migration_reconciles_drifted_totals(self):
+        from importlib import import_module
+        from types import SimpleNamespace
+        from django.apps import apps
+
+        self.make_submission('approved')
+        self.make_submission('approved')
+        self.make_submission('rejected')
+        # 旧代码遗留的错误总分
+        StudentProfile.objects.update(total_score=0)
+        migration = import_module('students.migrations.0013_recompute_total_score')
+        migration.recompute_total_score(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(self.total(), 5)
+        # 之后的增量在正确的基数上累加
+        self.make_submission().transition('approved')
+        self.assertEqual(self.total(), 7.5)
+
+    def test_approve_adds_and_revert_subtracts(self):
+        submission = self.make_submission()
+        self.assertTrue(submission.transition('approved', reviewer=self.reviewer, from_status='pending'))
+        self.assertEqual(self.total(), 2.5)
+        self.assertTrue(submission.transition('rejected', reviewer=self.reviewer))
+        self.assertEqual(self.total(), 0)
+
+    def test_transition_requires_expected_status(self):
+        submission = self.make_submission()
+        submission.transition('approved', reviewer=self.reviewer, from_status='pending')
+        # 重复审核不会重复计分
+        self.assertFalse(submission.transition('approved', reviewer=self.reviewer, from_status='pending'))
+        self.assertEqual(self.total(), 2.5)
+
+    def test_create_and_delete_approved_submission(self):
+        submission = self.make_submission(status='approved')
+        self.assertEqual(self.total(), 2.5)
+        submission.delete()
+        self.assertEqual(self.total(), 0)
+
+    def test_profile_save_does_not_recompute(self):
+        self.make_submission(status='approved')
+        self.student.refresh_from_db()
+        with self.assertNumQueries(1):
+            self.student.save()
+
+    def test_score_item_change_updates_approved_totals(self):
+        self.make_submission(status='approved')
+        self.make_submission(status='pending')
+        self.item.score = 4
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+        self.assertEqual(self.total(), 4)
+
+    def test_stale_profile_save_keeps_total(self):
+        stale = StudentProfile.objects.get(pk=self.student.pk)
+        self.make_submission(status='approved')
+        stale.phone = '13800000000'
+        stale.save()
+        self.assertEqual(self.total(), 2.5)
+
+    def test_api_update_cannot_change_status(self):
+        # 状态只读，审核和撤回经由各自的接口切换
+        submission = self.make_submission()
+        self.client.force_login(self.reviewer)
+        response = self.client.patch(f'/api/submissions/{submission.id}/',
+                                     {'status': 'approved', 'additional_info': '补充说明'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        submission.refresh_from_db()
+        self.assertEqual((submission.status, submission.additional_info), ('pending', '补充说明'))
+        self.assertEqual(self.total(), 0)
+
+
+class RankIndexTest(TestCase):
+    def setUp(self):
+        scores = [('A', 10, '计算机', '1班'), ('B', 8, '计算机', '1班'), ('C', 8, '计算机', '2班'), ('D', 5, '数学', '1班')]
+        self.students = {}
+        for name, score, major, class_name in scores:
+            user = User.objects.create_user(username=name)
+            self.students[name] = StudentProfile.objects.create(
+                user=user, full_name=name, student_id=f'S{name}', major=major, class_name=class_name, total_score=score
+            )
+        admin = User.objects.create_superuser(username='admin')
+        StudentProfile.objects.create(user=admin, full_name='admin', student_id='ADMIN', total_score=100)
+        self.index = RankIndex(ttl=3600)
+
+    def test_competition_ranking(self):
+        self.assertEqual([self.index.rank(self.students[n].id) for n in 'ABCD'], [1, 2, 2, 4])
+        self.assertEqual(self.index.ranks(self.students['D'].id), {'global': 4, 'major': 1, 'class': 3})
+
+    def test_adjust_and_neighbours(self):
+        self.index.rebuild()
+        self.index.adjust(self.students['D'].id, 4)
+        self.assertEqual(self.index.rank(self.students['D'].id), 2)
+        self.assertEqual(self.index.rank(self.students['B'].id), 3)
+        ids = [row['id'] for row in self.index.neighbours(self.students['D'].id, radius=1)]
+        self.assertEqual(ids, [self.students['A'].id, self.students['D'].id, self.students['B'].id])
+
+
+class StudentStatsQueryTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        self.item = ScoreItem.objects.create(name='论文', category='thesis', level='B类', score=1)
+        self.client.login(username='teacher', password='pw')
+        rank_index.invalidate()
+
+    def add_students(self, count):
+        for _ in range(count):
+            n = StudentProfile.objects.count()
+            user = User.objects.create_user(username=f'stu{n}')
+            student = StudentProfile.objects.create(user=user, full_name=f'学生{n}', student_id=f'2023{n:04d}')
+            for status in ('pending', 'approved', 'rejected'):
+                Submission.objects.create(student=student, score_item=self.item, proof_file='proofs/a.pdf', status=status)
+
+    def list_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/students/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        self.add_students(2)
+        self.list_queries()  # 预热排名索引
+        baseline = self.list_queries()
+        self.add_students(5)
+        self.assertEqual(self.list_queries(), baseline)
+
+    def test_submission_counters(self):
+        self.add_students(1)
+        student = StudentProfile.objects.get()
+        submission = student.submissions.get(status='pending')
+        submission.transition('revoked', from_status='pending')
+        student.submissions.get(status='rejected').delete()
+        student.refresh_from_db()
+        self.assertEqual(
+            (student.submission_count, student.approved_count, student.pending_count,
+             student.rejected_count, student.revoked_count),
+            (2, 1, 0, 0, 1)
+        )
+
+    def test_recalculate_aggregates(self):
+        self.add_students(1)
+        student = StudentProfile.objects.get()
+        StudentProfile.objects.update(total_score=0, submission_count=0, approved_count=0)
+        student.recalculate_aggregates()
+        self.assertEqual((student.total_score, student.submission_count, student.approved_count), (1, 3, 1))
+
+    def test_detail_page_runs_no_count_query(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.add_students(1)
+        student = StudentProfile.objects.get()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/student-detail/{student.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+
+
+class BulkReviewTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        self.item = ScoreItem.objects.create(name='专利', category='patent', level='国家级', score=3)
+        self.students = []
+        for n in range(2):
+            user = User.objects.create_user(username=f'stu{n}')
+            self.students.append(StudentProfile.objects.create(user=user, full_name=f'学生{n}', student_id=f'S{n}'))
+
+    def submit(self, student, status='pending'):
+        return Submission.objects.create(student=student, score_item=self.item, proof_file='proofs/a.pdf', status=status)
+
+    def test_bulk_review_endpoint(self):
+        first, second = self.students
+        pending = [self.submit(first), self.submit(first), self.submit(second)]
+        rejected = self.submit(second, status='rejected')
+        self.client.login(username='teacher', password='pw')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/submissions/bulk-review/', {
+                'ids': [s.id for s in pending] + [rejected.id, 9999], 'decision': 'approve', 'comment': '材料齐全',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        results = {row['id']: row['result'] for row in response.json()['results']}
+        self.assertEqual(response.json()['updated'], 3)
+        self.assertEqual(results[rejected.id], 'not_pending')
+        self.assertEqual(results[9999], 'not_found')
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.total_score, first.approved_count, first.pending_count), (6, 2, 0))
+        self.assertEqual((second.total_score, second.approved_count, second.rejected_count), (3, 1, 1))
+        self.assertEqual(Submission.objects.filter(reviewer_comment='材料齐全').count(), 3)
+
+    @override_settings(TASK_QUEUE_EAGER=False)
+    def test_aggregates_refreshed_by_worker_per_student(self):
+        first, second = self.students
+        batches = [[self.submit(first), self.submit(second)], [self.submit(first)]]
+        for batch in batches:
+            bulk_transition([s.id for s in batch], 'approved', reviewer=self.staff)
+        # 两次批量审核只为每名学生留下一条待执行的刷新任务
+        self.assertEqual(Task.objects.filter(name='students.tasks.refresh_student_aggregates').count(), 2)
+        first.refresh_from_db()
+        self.assertEqual(first.pending_count, 2)
+
+        call_command('run_tasks', once=True, stdout=io.StringIO())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.total_score, first.approved_count, first.pending_count), (6, 2, 0))
+        self.assertEqual((second.total_score, second.approved_count), (3, 1))
+
+    def test_bulk_review_rejects_bad_decision(self):
+        self.client.login(username='teacher', password='pw')
+        response = self.client.post('/api/submissions/bulk-review/', {'ids': [1], 'decision': 'maybe'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+    @override_settings(TASK_QUEUE_EAGER=False)
+    def test_review_results_queued_as_notifications(self):
+        first, second = self.students
+        first.email = 'stu0@example.com'
+        first.save()
+        second.user.email = 'stu1@example.com'
+        second.user.save()
+        bulk_transition([self.submit(first).id, self.submit(second).id], 'approved', reviewer=self.staff,
+                        comment='材料齐全')
+        self.submit(first).transition('rejected', reviewer=self.staff)
+        self.submit(first).transition('pending')
+        messages = sorted(Notification.objects.values_list('recipient', 'message'))
+        self.assertEqual(messages, [
+            ('stu0@example.com', '加分申请「专利」审核通过，审核意见：材料齐全'),
+            ('stu0@example.com', '加分申请「专利」未通过审核'),
+            ('stu1@example.com', '加分申请「专利」审核通过，审核意见：材料齐全'),
+        ])
+
+
+class SerializerLoaderTest(TestCase):
+    def setUp(self):
+        item = ScoreItem.objects.create(name='竞赛', category='competition', level='省级', score=2)
+        student = StudentProfile.objects.create(user=User.objects.create_user(username='stu'),
+                                                full_name='学生', student_id='S1')
+        teachers = [TeacherProfile.objects.create(user=User.objects.create_user(username=f't{n}', is_staff=True),
+                                                  full_name=f'老师{n}', teacher_id=f'T{n}') for n in range(2)]
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        reviewers = [teachers[0].user, teachers[1].user, admin]
+        for n in range(30):
+            Submission.objects.create(student=student, score_item=item, proof_file='proofs/a.pdf', status='approved',
+                                      reviewer=reviewers[n % 3])
+        Submission.objects.create(student=student, score_item=item, proof_file='proofs/a.pdf')
+        rank_index.rebuild()
+        self.request = Request(RequestFactory().get('/api/submissions/'))
+
+    def serialize(self, queryset):
+        return SubmissionSerializer(queryset, many=True, context={'request': self.request}).data
+
+    def test_page_loads_each_relation_once(self):
+        # 提交记录、审核用户、老师档案、审核数各一条查询，与行数无关
+        with self.assertNumQueries(4):
+            rows = self.serialize(Submission.objects.select_related('student__user', 'score_item').order_by('id'))
+        self.assertEqual(len(rows), 31)
+        self.assertEqual(rows[0]['reviewer']['full_name'], '老师0')
+        self.assertEqual(rows[0]['reviewer']['review_count'], 10)
+        self.assertEqual(rows[2]['reviewer'], {'id': rows[2]['reviewer']['id'], 'username': 'admin', 'email': ''})
+        self.assertIsNone(rows[30]['reviewer'])
+
+    def test_joined_reviewers_are_reused(self):
+        queryset = Submission.objects.select_related('student__user', 'score_item', 'reviewer__teacher_profile')
+        with self.assertNumQueries(2):
+            self.serialize(queryset)
+        # 同一请求内已加载的结果不再查询
+        with self.assertNumQueries(1):
+            self.serialize(queryset.all())
+
+
+class SparseFieldsetTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        self.item = ScoreItem.objects.create(name='竞赛', category='competition', level='省级', score=2,
+                                             description='说明')
+        self.student = StudentProfile.objects.create(user=User.objects.create_user(username='stu'),
+                                                     full_name='学生', student_id='S1')
+        for _ in range(3):
+            Submission.objects.create(student=self.student, score_item=self.item, proof_file='proofs/a.pdf')
+        rank_index.rebuild()
+        self.client.login(username='teacher', password='pw')
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        submission_sql = [q['sql'] for q in queries if q['sql'].startswith('SELECT "students_submission"."id"')]
+        return response.json(), submission_sql
+
+    def test_fields_trim_payload_and_columns(self):
+        data, sql = self.get('/api/submissions/?fields=id,status,submitted_at&page_size=2')
+        self.assertEqual([set(row) for row in data['results']], [{'id', 'status', 'submitted_at'}] * 2)
+        # 一条查询取出本页，没有联表，也没有逐行补读延迟加载的列
+        self.assertEqual(len(sql), 1, sql)
+        self.assertNotIn('JOIN', sql[0])
+        self.assertNotIn('proof_file', sql[0])
+        # 游标分页不受裁剪影响
+        self.assertIsNotNone(data['next'])
+
+    def test_expand_controls_nesting_and_joins(self):
+        data, sql = self.get('/api/submissions/?expand=score_item')
+        row = data['results'][0]
+        self.assertEqual((row['student'], row['reviewer']), (self.student.id, None))
+        self.assertEqual(row['score_item']['name'], '竞赛')
+        self.assertIn('students_scoreitem', sql[0])
+        self.assertNotIn('students_studentprofile', sql[0])
+
+        data, _ = self.get('/api/submissions/')
+        self.assertEqual(data['results'][0]['student']['full_name'], '学生')
+
+    def test_detail_endpoints(self):
+        data, _ = self.get(f'/api/score-items/{self.item.id}/?fields=id,name')
+        self.assertEqual(data, {'id': self.item.id, 'name': '竞赛'})
+        data, _ = self.get(f'/api/students/{self.student.id}/?fields=id,user,rank&expand=')
+        self.assertEqual(data, {'id': self.student.id, 'user': self.student.user_id, 'rank': 1})
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.items = [ScoreItem.objects.create(name=f'项目{n}', category='competition', level='省级', score=2)
+                          for n in range(2)]
+            self.student = StudentProfile.objects.create(user=User.objects.create_user(username='stu'),
+                                                         full_name='学生', student_id='S1')
+            self.submission = Submission.objects.create(student=self.student, score_item=self.items[0],
+                                                        proof_file='proofs/a.pdf')
+        self.client.login(username='teacher', password='pw')
+
+    def get(self, url, etag=None, **headers):
+        if etag:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        return self.client.get(url, HTTP_ACCEPT='application/json', **headers)
+
+    def test_not_modified_until_data_changes(self):
+        first = self.get('/api/submissions/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        # 一条版本号查询之外不执行视图
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get('/api/submissions/', first['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submission.transition('approved', reviewer=self.staff)
+        changed = self.get('/api/submissions/', first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_per_object_versions(self):
+        url = f'/api/score-items/{self.items[0].id}/'
+        etag = self.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.items[1].save()
+        self.assertEqual(self.get(url, etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.items[0].save()
+        self.assertEqual(self.get(url, etag).status_code, 200)
+
+        # 排名依赖所有学生，不请求排名时只看该学生自己的版本
+        other = StudentProfile.objects.create(user=User.objects.create_user(username='stu2'),
+                                              full_name='学生2', student_id='S2')
+        url = f'/api/students/{self.student.id}/'
+        with_rank, without_rank = self.get(url)['ETag'], self.get(url + '?fields=id,full_name')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            other.save()
+        self.assertEqual(self.get(url, with_rank).status_code, 200)
+        self.assertEqual(self.get(url + '?fields=id,full_name', without_rank).status_code, 304)
+
+    def test_teacher_edit_changes_etag(self):
+        url = f'/api/students/{self.student.id}/'
+        etag = self.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/edit-student-info/{self.student.id}/', {
+                'full_name': '新名字', 'student_id': 'S1', 'major': '计算机', 'grade': '2023级', 'class_name': '1班',
+            })
+        self.assertEqual(response.status_code, 302)
+        # 换一个会话，避免待显示的成功消息跳过条件GET
+        self.client = self.client_class()
+        self.client.login(username='teacher', password='pw')
+        changed = self.get(url, etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['full_name'], '新名字')
+
+    def test_etag_differs_per_user_and_format(self):
+        url = f'/api/score-items/{self.items[0].id}/'
+        json_etag = self.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, HTTP_ACCEPT='text/html')['ETag'], json_etag)
+        self.client.logout()
+        self.assertEqual(self.get(url, json_etag).status_code, 200)
+
+
+class SubmissionPaginationTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        item = ScoreItem.objects.create(name='竞赛', category='competition', level='省级', score=2)
+        student = StudentProfile.objects.create(user=User.objects.create_user(username='stu'),
+                                                full_name='学生', student_id='S1')
+        self.ids = [
+            Submission.objects.create(student=student, score_item=item, proof_file='proofs/a.pdf').id
+            for _ in range(5)
+        ]
+        # 制造相同提交时间，验证按ID决胜
+        Submission.objects.update(submitted_at=timezone.now())
+        self.client.login(username='teacher', password='pw')
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        first = self.client.get('/api/submissions/?page_size=2', HTTP_ACCEPT='application/json').json()
+        self.assertIsNone(first['previous'])
+        self.assertEqual([row['id'] for row in first['results']], self.ids[::-1][:2])
+
+        second = self.client.get(first['next'], HTTP_ACCEPT='application/json').json()
+        third = self.client.get(second['next'], HTTP_ACCEPT='application/json').json()
+        seen = [row['id'] for page in (first, second, third) for row in page['results']]
+        self.assertEqual(seen, self.ids[::-1])
+        self.assertIsNone(third['next'])
+
+        back = self.client.get(third['previous'], HTTP_ACCEPT='application/json').json()
+        self.assertEqual(back['results'], second['results'])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get('/api/submissions/?page_size=2&cursor=bogus', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], self.ids[::-1][:2])
+
+
+class RowRangeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item = ScoreItem.objects.create(name='竞赛', category='competition', level='省级', score=2)
+            self.students = [
+                StudentProfile.objects.create(user=User.objects.create_user(username=f'stu{n}', password='pw'),
+                                              full_name=f'学生{n}', student_id=f'S{n:03d}', class_name=f'{n % 2}班')
+                for n in range(4)
+            ]
+            self.ids = [
+                Submission.objects.create(student=student, score_item=self.item, proof_file='proofs/a.pdf').id
+                for student in self.students for _ in range(3)
+            ]
+        Submission.objects.update(submitted_at=timezone.now())
+        rank_index.rebuild()
+        self.client.login(username='teacher', password='pw')
+
+    def rows(self, url):
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_submission_rows_are_compact_windows(self):
+        data = self.rows('/api/submissions/rows/?offset=2&limit=4&status=pending')
+        self.assertEqual(data['columns'][:3], ['id', 'student_name', 'student_id'])
+        self.assertEqual(data['total'], 12)
+        self.assertEqual(data['offset'], 2)
+        self.assertEqual(data['filters'], {'status': 'pending'})
+        self.assertEqual([row[0] for row in data['rows']], self.ids[::-1][2:6])
+        record = dict(zip(data['columns'], data['rows'][0]))
+        self.assertEqual(record['score_item'], '竞赛')
+        self.assertTrue(record['proof'])
+        # limit不超过上限
+        with mock.patch('students.rowrange.MAX_LIMIT', 5):
+            self.assertEqual(len(self.rows('/api/submissions/rows/?limit=100000')['rows']), 5)
+        self.assertEqual(self.rows('/api/submissions/rows/?status=approved')['total'], 0)
+
+    def test_total_is_cached_until_data_changes(self):
+        self.rows('/api/submissions/rows/?limit=5')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.rows('/api/submissions/rows/?offset=5&limit=5')['total'], 12)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Submission.objects.create(student=self.students[0], score_item=self.item, proof_file='proofs/a.pdf')
+        self.assertEqual(self.rows('/api/submissions/rows/?limit=5')['total'], 13)
+
+    def test_student_rows_filters_and_scope(self):
+        data = self.rows('/api/students/rows/?class_name=1班')
+        self.assertEqual(data['total'], 2)
+        record = dict(zip(data['columns'], data['rows'][0]))
+        self.assertEqual(record['submission_count'], 3)
+        self.assertEqual(record['rank'], rank_index.rank(record['id']))
+
+        # 学生只能读取自己的行
+        self.client.login(username='stu1', password='pw')
+        self.assertEqual([row[0] for row in self.rows('/api/students/rows/')['rows']], [self.students[1].id])
+        # 提交记录接口与列表一样只对管理员开放
+        self.assertEqual(self.client.get('/api/submissions/rows/', HTTP_ACCEPT='application/json').status_code, 403)
+
+    def test_pages_render_table_without_rows(self):
+        for url, rows_url in (('/submission-list/', '/api/submissions/rows/'), ('/api/students/', '/api/students/rows/')):
+            response = self.client.get(url, HTTP_ACCEPT='text/html')
+            self.assertContains(response, rows_url)
+            self.assertContains(response, 'virtual_table.js')
+            self.assertNotContains(response, '学生0</td>')
+
+
+class SearchIndexTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        self.item = ScoreItem.objects.create(name='全国大学生数学建模竞赛', category='competition', level='国家级',
+                                             score=5, description='Mathematical modeling contest')
+        self.student = StudentProfile.objects.create(user=User.objects.create_user(username='stu'),
+                                                     full_name='张三丰', student_id='2023010456',
+                                                     major='计算机科学与技术', class_name='计科1班')
+        self.other = StudentProfile.objects.create(user=User.objects.create_user(username='stu2'),
+                                                   full_name='李四', student_id='2023020789')
+        self.submission = Submission.objects.create(student=self.student, score_item=self.item,
+                                                    proof_file='proofs/a.pdf')
+
+    def student_names(self, text, fields=None):
+        return sorted(StudentProfile.objects.filter(student_filter(text, fields)).values_list('full_name', flat=True))
+
+    def test_chinese_and_student_id_substrings(self):
+        self.assertEqual(self.student_names('三丰'), ['张三丰'])
+        self.assertEqual(self.student_names('张丰'), [])
+        self.assertEqual(self.student_names('0104', ['student_id']), ['张三丰'])
+        self.assertEqual(self.student_names('2023', ['student_id']), ['张三丰', '李四'])
+        self.assertEqual(self.student_names('计科'), ['张三丰'])
+        items = ScoreItem.objects.filter(score_item_filter('model')).values_list('name', flat=True)
+        self.assertEqual(list(items), ['全国大学生数学建模竞赛'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.student.full_name = '张无忌'
+        self.student.save()
+        self.assertEqual(self.student_names('三丰'), [])
+        self.assertEqual(self.student_names('无忌'), ['张无忌'])
+        self.other.delete()
+        self.assertEqual(self.student_names('2023', ['student_id']), ['张无忌'])
+
+    def test_search_reviewer_comment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submission.transition('rejected', reviewer=self.staff, comment='证明材料缺少盖章')
+        self.client.login(username='teacher', password='pw')
+        for text, expected in (('缺少盖章', [self.submission.id]), ('签字', []), ('建模', [self.submission.id])):
+            response = self.client.get('/api/submissions/', {'search': text}, HTTP_ACCEPT='application/json')
+            self.assertEqual([row['id'] for row in response.json()['results']], expected, text)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM students_search_student")
+        self.assertEqual(self.student_names('三丰'), [])
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('students_search_student: 2', out.getvalue())
+        self.assertEqual(self.student_names('三丰'), ['张三丰'])
+
+
+class QueryPlanTest(TestCase):
+    def test_main_queries_use_indexes(self):
+        out = io.StringIO()
+        call_command('explain_queries', seed=300, per_student=5, repeat=1, stdout=out)
+        self.assertIn('所有查询均已使用索引', out.getvalue(), out.getvalue())
+        # 生成的测试数据在命令结束后回滚
+        self.assertFalse(StudentProfile.objects.exists())
+
+
+class CsvExportTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        self.item = ScoreItem.objects.create(name='竞赛', category='competition', level='省级', score=2)
+        self.profiles = []
+        for n, (score, major) in enumerate([(5, '软件工程'), (8, '软件工程'), (5, '软件工程'), (3, '数学')]):
+            user = User.objects.create_user(username=f'stu{n}', password='pw')
+            profile = StudentProfile.objects.create(user=user, full_name=f'学生{n}', student_id=f'S{n}', major=major)
+            StudentProfile.objects.filter(pk=profile.pk).update(total_score=score)
+            self.profiles.append(profile)
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(content[1:])))
+
+    def test_rankings_use_list_filters_and_competition_rank(self):
+        self.client.login(username='teacher', password='pw')
+        rows = self.read(self.client.get('/api/students/export/', {'major': '软件工程', 'sort_by': 'full_name'}))
+        self.assertEqual(rows[0][:3], ['名次', '学号', '姓名'])
+        self.assertEqual([(row[0], row[1]) for row in rows[1:]], [('1', 'S1'), ('2', 'S0'), ('2', 'S2')])
+
+    def test_submissions_export_filters_and_streams_in_chunks(self):
+        approved = Submission.objects.create(student=self.profiles[0], score_item=self.item,
+                                             proof_file='proofs/a.pdf')
+        approved.transition('approved', reviewer=self.staff, comment='同意')
+        Submission.objects.create(student=self.profiles[1], score_item=self.item, proof_file='proofs/a.pdf')
+        self.client.login(username='teacher', password='pw')
+        with mock.patch.object(exports, 'LINES_PER_WRITE', 1):
+            # 表头与第一行一起输出，之后每行一块
+            response = self.client.get('/api/submissions/export/')
+            self.assertEqual(len(list(response.streaming_content)), 2)
+        rows = self.read(self.client.get('/api/submissions/export/', {'status': 'approved'}))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][0], str(approved.id))
+        self.assertEqual([rows[1][i] for i in (4, 7, 10, 11)], ['竞赛', '审核通过', 'teacher', '同意'])
+
+    def test_exports_require_staff(self):
+        self.client.login(username='stu0', password='pw')
+        self.assertEqual(self.client.get('/api/students/export/').status_code, 403)
+        self.assertEqual(self.client.get('/api/submissions/export/').status_code, 403)
+        self.assertEqual(self.client.get('/api/export/change-logs/').status_code, 403)
+
+    def test_change_log_export_and_command(self):
+        StudentInfoChangeLog.objects.create(student=self.profiles[0], editor=self.staff, field_name='姓名',
+                                            old_value='学生0', new_value='张三')
+        self.client.login(username='teacher', password='pw')
+        rows = self.read(self.client.get('/api/export/change-logs/', {'student_id': 'S0'}))
+        self.assertEqual(rows[1][1:], ['S0', '学生0', 'teacher', '姓名', '学生0', '张三'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rankings.csv')
+            call_command('export_csv', 'rankings', output=path, major='数学', stderr=io.StringIO())
+            with open(path, encoding='utf-8-sig', newline='') as output:
+                self.assertEqual(list(csv.reader(output))[1][:2], ['1', 'S3'])
+
+
+class ProofFileTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, TASK_QUEUE_EAGER=True, PROOF_RELEASE_GRACE=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.student = StudentProfile.objects.create(user=User.objects.create_user(username='s1'),
+                                                     full_name='学生', student_id='S1')
+        self.item = ScoreItem.objects.create(name='竞赛', category='competition', level='省级', score=2)
+
+    def submit(self, content, name='证书.pdf'):
+        return Submission.objects.create(student=self.student, score_item=self.item,
+                                         proof_file=SimpleUploadedFile(name, content))
+
+    def test_duplicate_uploads_stored_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = self.submit(b'same'), self.submit(b'same', 'copy.pdf')
+        self.assertEqual(first.proof_file.name, second.proof_file.name)
+        self.assertEqual(ProofReference.objects.filter(blob_id=first.proof_file.name).count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(first.proof_file.storage.exists(second.proof_file.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(second.proof_file.storage.exists(second.proof_file.name))
+
+    def test_download_requires_owner_or_staff(self):
+        submission = self.submit(b'%PDF-1.4')
+        url = f'/api/submission-proof/{submission.pk}/'
+        self.client.force_login(User.objects.create_user(username='other'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.student.user)
+        response = self.client.get(url, headers={'range': 'bytes=0-3'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF')
+        self.client.force_login(User.objects.create_user(username='teacher', is_staff=True))
+        self.assertEqual(self.client.get(url, headers={'if-none-match': response['ETag']}).status_code, 304)
+
+    def test_preview_url(self):
+        photo, document = self.submit(b'%PDF-1.4'), self.submit(b'doc', 'a.docx')
+        self.client.force_login(User.objects.create_user(username='teacher', is_staff=True))
+        response = self.client.get('/api/submissions/', HTTP_ACCEPT='application/json')
+        data = {row['id']: row for row in response.json()['results']}
+        self.assertTrue(data[photo.pk]['preview_url'].endswith(f'/api/submission-preview/{photo.pk}/'))
+        self.assertIsNone(data[document.pk]['preview_url'])
+        self.assertEqual(self.client.get(data[photo.pk]['preview_url']).status_code, 200)
+
+    def test_migrate_proof_files(self):
+        storage = Submission._meta.get_field('proof_file').storage
+        os.makedirs(os.path.join(self.media_root, 'proofs'))
+        for name in ('old1.pdf', 'old2.pdf'):
+            with open(os.path.join(self.media_root, 'proofs', name), 'wb') as file:
+                file.write(b'legacy')
+        ids = [Submission.objects.create(student=self.student, score_item=self.item, proof_file=name).id
+               for name in ('proofs/old1.pdf', 'proofs/old2.pdf', 'proofs/old1.pdf', 'proofs/gone.pdf')]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('migrate_proof_files', batch_size=2, stdout=io.StringIO(), stderr=io.StringIO())
+        names = list(Submission.objects.filter(id__in=ids).order_by('id').values_list('proof_file', flat=True))
+        self.assertEqual(len(set(names[:3])), 1)
+        self.assertTrue(storage.exists(names[0]))
+        self.assertEqual(names[3], 'proofs/gone.pdf')
+        self.assertEqual(ProofReference.objects.filter(blob_id=names[0]).count(), 3)
+        self.assertFalse(storage.exists('proofs/old1.pdf'))
+        self.assertFalse(storage.exists('proofs/old2.pdf'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportStudentsTest(TestCase):
+    HEADER = '用户名,密码,姓名,学号,专业,年级,班级,邮箱,电话\n'
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        User.objects.create_user(username='taken')
+
+    def csv(self, *lines):
+        return ('\ufeff' + self.HEADER + ''.join(line + '\n' for line in lines)).encode('utf-8')
+
+    def test_import_creates_accounts_profiles_and_memberships(self):
+        data = self.csv('zs,secret1,张三,2024001,软件工程,2024级,软工1班,zs@example.com,',
+                        'ls,secret2,李 四,2024002,软件工程,2024级,软工1班,,13800000000')
+        # 查询条数与行数无关：校验2条，建组3条，每批用户、档案、组成员、全文索引各1条，事务保存点2条
+        with self.assertNumQueries(12):
+            result = importing.import_students(data, workers=1)
+        self.assertEqual((result.created, result.errors), (2, []))
+        user = User.objects.get(username='ls')
+        self.assertTrue(user.check_password('secret2'))
+        self.assertEqual((user.first_name, user.last_name, user.profile.phone), ('李', '四', '13800000000'))
+        self.assertEqual(set(Group.objects.get(name='students').user_set.values_list('username', flat=True)),
+                         {'zs', 'ls'})
+        self.assertEqual(list(StudentProfile.objects.filter(student_filter('三')).values_list('student_id', flat=True)),
+                         ['2024001'])
+
+    def test_errors_are_reported_per_row(self):
+        StudentProfile.objects.create(user=User.objects.create_user(username='old'), full_name='旧', student_id='2024009')
+        data = self.csv('taken,secret1,甲,2024003,软工,2024级,1班,,',
+                        'ok,123,乙,2024004,软工,2024级,1班,bad-email,',
+                        'ok2,secret1,丙,2024009,软工,2024级,1班,,',
+                        'ok3,secret1,丁,2024005,,2024级,1班,,',
+                        'ok4,secret1,戊,2024006,软工,2024级,1班,,',
+                        'ok5,secret1,己,2024006,软工,2024级,1班,,')
+        result = importing.import_students(data, workers=1)
+        self.assertEqual(result.created, 0)
+        self.assertEqual([(error['line'], error['field']) for error in result.errors], [
+            (2, 'username'), (3, 'password'), (3, 'email'), (4, 'student_id'), (5, 'major'), (7, 'student_id'),
+        ])
+        self.assertFalse(User.objects.filter(username='ok4').exists())
+
+        result = importing.import_students(data, partial=True, workers=1)
+        self.assertEqual(result.created, 1)
+        self.assertTrue(User.objects.filter(username='ok4').exists())
+
+    def test_gbk_file_and_process_pool(self):
+        data = (self.HEADER + 'ww,secret1,王五,2024010,数学,2024级,数学1班,,\n'
+                'zl,secret2,赵六,2024011,数学,2024级,数学1班,,\n').encode('gbk')
+        result = importing.import_students(data, workers=2)
+        self.assertEqual(result.created, 2)
+        self.assertTrue(User.objects.get(username='zl').check_password('secret2'))
+
+    def test_admin_endpoint_and_command(self):
+        upload = io.BytesIO(self.csv('api1,secret1,周七,2024020,物理,2024级,物理1班,,'))
+        upload.name = 'students.csv'
+        self.client.login(username='teacher', password='pw')
+        response = self.client.post('/api/students/import/', {'file': upload, 'dry_run': 'true'})
+        self.assertEqual(response.json(), {'rows': 1, 'created': 0, 'errors': []})
+        self.assertFalse(User.objects.filter(username='api1').exists())
+
+        with tempfile.NamedTemporaryFile('wb', suffix='.csv', delete=False) as source:
+            source.write(self.csv('cmd1,secret1,吴八,2024021,物理,2024级,物理1班,,'))
+        try:
+            out = io.StringIO()
+            call_command('import_students', source.name, workers=1, stdout=out)
+        finally:
+            os.unlink(source.name)
+        self.assertIn('已导入 1 名学生', out.getvalue())
+        self.assertTrue(StudentProfile.objects.filter(student_id='2024021').exists())
+
+
+class DashboardStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.item = ScoreItem.objects.create(name='论文', category='paper', level='核心', score=4)
+        self.student = StudentProfile.objects.create(user=User.objects.create_user(username='stu'),
+                                                     full_name='学生', student_id='S1')
+        self.submission = Submission.objects.create(student=self.student, score_item=self.item,
+                                                    proof_file='proofs/a.pdf')
+
+    def test_snapshot_is_one_query_then_cached(self):
+        # 版本号查询和一次聚合查询
+        with CaptureQueriesContext(connection) as queries:
+            stats = dashboard_stats()
+        self.assertEqual(len(queries), 2)
+        self.assertEqual((stats['total_students'], stats['total_submissions'], stats['pending_submissions'],
+                          stats['total_score_items']), (1, 1, 1, 1))
+        # 命中时只读取版本号
+        with self.assertNumQueries(1):
+            dashboard_stats()
+
+    def test_writes_invalidate_snapshot(self):
+        dashboard_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submission.transition('approved')
+        stats = dashboard_stats()
+        self.assertEqual((stats['pending_submissions'], stats['approved_submissions']), (0, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentProfile.objects.create(user=User.objects.create_user(username='stu2'),
+                                          full_name='学生2', student_id='S2')
+        self.assertEqual(dashboard_stats()['total_students'], 2)
+
+    def test_home_shows_real_student_count(self):
+        StudentProfile.objects.create(user=User.objects.create_user(username='stu2'), full_name='学生2', student_id='S2')
+        cache.clear()
+        response = self.client.get('/')
+        self.assertEqual(response.context['total_students'], 2)
+
+
+class QueryBudgetTest(TestCase):
+    """各视图在种子数据下的查询条数上限；数据量增加时查询条数保持不变，防止N+1回归"""
+
+    # (URL模板, 查询条数上限)，会话和当前用户的读取计入其中；条件GET的视图和首页统计另有一条版本号查询
+    GET_BUDGETS = [
+        ('/', 4),
+        ('/api/', 2),
+        ('/api/students/', 4),
+        ('/api/studentprofile-list/', 4),
+        ('/api/students/rows/?format=json', 5),
+        ('/api/students/{student}/', 3),
+        ('/api/students/{student}/rank/?format=json', 3),
+        ('/api/student-detail/{student}/', 3),
+        ('/students/student-detail/{student}/', 3),
+        ('/api/edit-student-info/{student}/', 3),
+        ('/submission-list/', 5),
+        ('/api/submissions/?format=json', 5),
+        ('/api/submissions/rows/?format=json', 5),
+        ('/api/submissions/{submission}/', 4),
+        ('/submission-history/', 4),
+        ('/submission-detail/{submission}/', 5),
+        ('/api/score-items/?format=json', 5),
+        ('/api/score-items/{item}/', 4),
+        ('/login/', 2),
+        ('/api/register/', 2),
+        ('/upload-proof/', 3),
+        ('/personal-info/', 2),
+        ('/debug-profile/', 4),
+    ]
+
+    def setUp(self):
+        self.staff = User.objects.create_superuser(username='teacher', password='pw', email='t@example.com')
+        self.items = [ScoreItem.objects.create(name=f'项目{n}', category='competition', level='省级', score=2)
+                      for n in range(2)]
+        self.seed(3)
+        self.client.login(username='teacher', password='pw')
+
+    def seed(self, count):
+        start = StudentProfile.objects.count()
+        for n in range(start, start + count):
+            student = StudentProfile.objects.create(user=User.objects.create_user(username=f'stu{n}'),
+                                                    full_name=f'学生{n}', student_id=f'S{n:03d}',
+                                                    major='计算机', class_name='1班')
+            for index, status in enumerate(('pending', 'approved', 'rejected')):
+                Submission.objects.create(student=student, score_item=self.items[index % 2], proof_file='proofs/a.pdf',
+                                          status=status, reviewer=self.staff if status != 'pending' else None)
+        rank_index.rebuild()
+
+    def measure(self):
+        urls = {
+            'student': StudentProfile.objects.order_by('id').first().id,
+            'submission': Submission.objects.order_by('id').first().id,
+            'item': self.items[0].id,
+        }
+        counts = {}
+        for template, _ in self.GET_BUDGETS:
+            cache.clear()
+            url = template.format(**urls)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertLess(response.status_code, 400, url)
+            counts[template] = len(queries)
+        return counts
+
+    def test_get_views_stay_within_budget(self):
+        # 预热一次：首次访问时创建的默认档案等一次性写入不计入比较
+        self.measure()
+        small = self.measure()
+        self.seed(12)
+        large = self.measure()
+        for template, budget in self.GET_BUDGETS:
+            self.assertLessEqual(large[template], budget, template)
+            self.assertEqual(small[template], large[template], f'{template} 的查询条数随数据量增长')
+
+    def test_review_actions_stay_within_budget(self):
+        pending = Submission.objects.filter(status='pending').order_by('id')
+        # 含读取审核结果通知收件人的一次查询；种子学生没有邮箱，不写入通知
+        with self.assertNumQueries(10):
+            self.client.post(f'/submission-approve/{pending[0].id}/', HTTP_ACCEPT='application/json')
+        with self.assertNumQueries(10):
+            self.client.post(f'/submission-reject/{pending[1].id}/', HTTP_ACCEPT='application/json')
+        self.seed(12)
+        ids = list(Submission.objects.filter(status='pending').values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/api/submissions/bulk-review/', {'ids': ids, 'decision': 'approve'},
+                             content_type='application/json')
+        self.assertLessEqual(len(queries), 8)
+
+    def test_middleware_reports_and_logs_over_budget(self):
+        with self.settings(QUERY_BUDGET={'max_queries': 1}):
+            with self.assertLogs('monitoring.querybudget', level='WARNING') as logs:
+                response = self.client.get('/api/students/?format=json')
+        self.assertGreater(int(response['X-Query-Count']), 1)
+        self.assertIn('X-Query-Slowest', response)
+        self.assertIn('"event": "query_budget_exceeded"', logs.output[0])
+
+
+class StructuredLoggingTest(TestCase):
+    def make_record(self, level=logging.DEBUG, **extra):
+        record = logging.LogRecord('students.views', level, __file__, 1, '学生 %s', (1,), None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter_includes_extra_fields(self):
+        line = json.loads(JsonFormatter().format(self.make_record(student=7)))
+        self.assertEqual((line['level'], line['message'], line['student']), ('DEBUG', '学生 1', 7))
+
+    def test_sampling_filter_only_drops_low_levels(self):
+        sampler = SamplingFilter(rate=0)
+        self.assertFalse(sampler.filter(self.make_record()))
+        self.assertTrue(sampler.filter(self.make_record(logging.INFO)))
+
+    def test_background_handler_writes_off_thread_and_drops_when_full(self):
+        stream = io.StringIO()
+        handler = BackgroundHandler(stream=stream, queue_size=1)
+        handler.setFormatter(JsonFormatter())
+        handler.listener.stop()  # 暂停后台线程，让队列保持已满
+        handler.handle(self.make_record())
+        handler.handle(self.make_record())
+        self.assertEqual(handler.dropped, 1)
+        handler.listener.start()
+        handler.close()
+        self.assertEqual(json.loads(stream.getvalue())['message'], '学生 1')
+
+    def test_background_handler_merges_arguments_before_enqueueing(self):
+        stream = io.StringIO()
+        handler = BackgroundHandler(stream=stream)
+        handler.setFormatter(JsonFormatter())
+        handler.listener.stop()  # 暂停后台线程，入队后再修改参数
+        names = ['甲']
+        handler.handle(logging.LogRecord('students.views', logging.INFO, __file__, 1, '学生 %s', (names,), None))
+        names.append('乙')
+        try:
+            raise ValueError('坏数据')
+        except ValueError:
+            record = logging.LogRecord('students.views', logging.ERROR, __file__, 1, '失败', (), sys.exc_info())
+        handler.handle(record)
+        handler.listener.start()
+        handler.close()
+        first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(first['message'], "学生 ['甲']")
+        self.assertIn('ValueError: 坏数据', second['exc_info'])
+
+    @skipUnless(hasattr(os, 'fork'), '需要fork')
+    def test_background_handler_restarts_in_forked_child(self):
+        with tempfile.NamedTemporaryFile('w+', buffering=1, suffix='.log') as stream:
+            handler = BackgroundHandler(stream=stream)
+            handler.setFormatter(JsonFormatter())
+            pid = os.fork()
+            if pid == 0:
+                handler.handle(self.make_record(logging.INFO))
+                handler.stop()
+                os._exit(0)
+            os.waitpid(pid, 0)
+            handler.close()
+            stream.seek(0)
+            self.assertEqual([json.loads(line)['message'] for line in stream], ['学生 1'])
+
+    def test_detail_views_do_not_print(self):
+        User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        student = StudentProfile.objects.create(user=User.objects.create_user(username='stu'),
+                                                full_name='学生', student_id='S1')
+        self.client.login(username='teacher', password='pw')
+        with redirect_stdout(io.StringIO()) as out:
+            self.client.get(f'/api/student-detail/{student.id}/')
+            self.client.get(f'/students/student-detail/{student.id}/')
+            self.client.get('/api/students/')
+        self.assertEqual(out.getvalue(), '')
@@ -49,12 +49,16 @@ urlpatterns = [
     path('submission-revoke/<int:pk>/', submission_revoke, name='submission-revoke'),
     path('submission-approve/<int:pk>/', submission_approve, name='submission-approve'),
     path('submission-reject/<int:pk>/', submission_reject, name='submission-reject'),
+    path('submission-proof/<int:pk>/', views.submission_proof, name='submission-proof'),
+    path('submission-preview/<int:pk>/', views.submission_preview, name='submission-preview'),
     # 调试视图
     path('debug-profile/', debug_profile, name='debug-profile'),
     # 学生详情页面
     path('student-detail/<int:pk>/', student_detail, name='student-detail'),
     # 编辑学生信息页面
     path('edit-student-info/<int:student_id>/', views.edit_student_info, name='edit-student-info'),
+    # 学生信息变更日志导出
+    path('export/change-logs/', views.export_change_logs, name='export-change-logs'),
     
     # 直接添加logout路由到students命名空间下，确保/api/students/logout/能正常工作
     path('students/logout/', custom_logout, name='students-logout'),
@@ -1,13 +1,15 @@
-from rest_framework import viewsets, permissions, filters, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.views import APIView
+from django.conf import settings
 from django.utils import timezone
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.contrib.auth import logout, authenticate, login
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_safe
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib import messages
@@ -15,29 +17,64 @@ from django.db import connection
 import logging
 
 from students.models import Submission
-from .models import StudentProfile, Submission, ScoreItem, StudentInfoChangeLog
+from .models import StudentProfile, Submission, ScoreItem, StudentInfoChangeLog, bulk_transition
 from .serializers import SubmissionSerializer, ScoreItemSerializer, StudentProfileSerializer
+from .ranking import rank_index
+from .pagination import SubmissionKeysetPagination
+from .querysets import filter_submissions, filter_student_profiles
+from .exports import export_queryset, streaming_csv_response
+from . import importing
+from proofstore.previews import has_preview
+from proofstore.serving import serve_proof, serve_preview
+from .stats import dashboard_stats
+from . import search
+from .search import FullTextSearchFilter, student_filter, score_item_filter
+from .fieldsets import selection
+from .rowrange import row_range
+from teachers.models import TeacherProfile
+from versioning.conditional import versioned
+from versioning.models import bump as bump_version, model_key, object_key
 
-# 配置日志
+# 配置日志；逐行调试事件使用单独的logger，便于按比例采样
 logger = logging.getLogger(__name__)
+row_logger = logging.getLogger(__name__ + '.rows')
+
+
+def _wants_json(request):
+    return request.accepted_renderer.format == 'json' or 'application/json' in request.headers.get('Accept', '')
+
+
+# 条件GET：各视图响应内容依赖的数据版本
+def submission_versions(view, request, pk=None, **kwargs):
+    # 提交记录同时显示学生、加分项目和审核老师的信息
+    related = [model_key(StudentProfile), model_key(ScoreItem), model_key(TeacherProfile)]
+    return related + [object_key(Submission, pk) if pk is not None else model_key(Submission)]
+
+
+def student_versions(view, request, pk=None, **kwargs):
+    # 排名随所有学生的总加分变化；不含排名的JSON详情只取决于该学生
+    if pk is not None and _wants_json(request) and not selection(request).includes('rank'):
+        return [object_key(StudentProfile, pk)]
+    return [model_key(StudentProfile)]
+
+
+def score_item_versions(view, request, pk=None, **kwargs):
+    return [object_key(ScoreItem, pk) if pk is not None else model_key(ScoreItem)]
 
 
 class APIRootView(APIView):
     permission_classes = [permissions.AllowAny]  # 允许未登录访问
 
     def get(self, request, format=None):
-        # 获取系统统计信息
-        total_students = StudentProfile.objects.count()
-        total_submissions = Submission.objects.count()
-        pending_submissions = Submission.objects.filter(status='pending').count()
-        total_score_items = ScoreItem.objects.count()
+        # 获取系统统计信息（缓存的聚合快照）
+        stats = dashboard_stats()
         
         # 传递数据到HTML模板
         context = {
-            'total_students': total_students,
-            'total_submissions': total_submissions,
-            'pending_submissions': pending_submissions,
-            'total_score_items': total_score_items,
+            'total_students': stats['total_students'],
+            'total_submissions': stats['total_submissions'],
+            'pending_submissions': stats['pending_submissions'],
+            'total_score_items': stats['total_score_items'],
             'system_version': 'v1.0.0',
             'last_update': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
             'student_list_url': reverse('students:studentprofile-list', request=request),
@@ -59,27 +96,16 @@ from .models import StudentProfile, Submission, ScoreItem
 # 非常简单的home视图，不使用任何装饰器
 def home(request):
     """网站总首页"""
-    # 强制设置总学生数为1，因为我们已经确认数据库中有一个学生档案
-    # 这样可以确保首页正确显示学生数量
-    total_students = 1
-    
-    # 获取其他统计信息
-    try:
-        total_submissions = Submission.objects.count()
-        pending_submissions = Submission.objects.filter(status='pending').count()
-        total_score_items = ScoreItem.objects.count()
-    except Exception:
-        total_submissions = 0
-        pending_submissions = 0
-        total_score_items = 0
+    # 获取统计信息（缓存的聚合快照）
+    stats = dashboard_stats()
     
     # 传递数据给模板
     context = {
         'user': request.user,
-        'total_students': total_students,
-        'total_submissions': total_submissions,
-        'pending_submissions': pending_submissions,
-        'total_score_items': total_score_items,
+        'total_students': stats['total_students'],
+        'total_submissions': stats['total_submissions'],
+        'pending_submissions': stats['pending_submissions'],
+        'total_score_items': stats['total_score_items'],
         'is_teacher': request.user.is_superuser or request.user.is_staff  # 为管理员设置is_teacher标志
     }
     return render(request, 'students/home.html', context)
@@ -241,36 +267,27 @@ def register(request):
 class SubmissionViewSet(viewsets.ModelViewSet):
     serializer_class = SubmissionSerializer
     permission_classes = [permissions.IsAdminUser]  # 仅允许管理员访问
-    filter_backends = [filters.SearchFilter]
+    pagination_class = SubmissionKeysetPagination  # 按(submitted_at, id)游标分页
+    filter_backends = [FullTextSearchFilter]
     search_fields = ['score_item__name', 'student__full_name', 'student__student_id', 'reviewer_comment']
     
     def get_permissions(self):
         # 所有操作都需要管理员权限
         return [permissions.IsAdminUser()]
 
-    def list(self, request, *args, **kwargs):
-        """提交记录列表视图，与submission_history保持数据同步"""
-        # 获取当前用户信息
+    # 提交记录页面的筛选参数
+    TABLE_FILTERS = ('student_name', 'student_id', 'assignment', 'status', 'search')
+
+    def table_queryset(self, request, submissions, student_profile):
+        """按当前用户的可见范围和页面筛选条件过滤提交记录，JSON列表和虚拟滚动行区间共用"""
         current_user = request.user
-        
-        # 获取当前用户的学生档案
-        student_profile = None
-        try:
-            # 使用get方法获取学生档案
-            student_profile = StudentProfile.objects.get(user=current_user)
-        except StudentProfile.DoesNotExist:
-            student_profile = None
-        
-        # 检查是否是教师或管理员
-        is_teacher = current_user.is_superuser or current_user.is_staff
-        
-        # 初始化提交记录列表
-        queryset = []
+        # 初始化提交记录查询集
+        queryset = Submission.objects.none()
         
         # 教师/管理员获取所有学生的提交记录，应用筛选条件
-        if is_teacher:
+        if current_user.is_superuser or current_user.is_staff:
             # 教师/管理员可以查看所有学生的提交记录，应用筛选条件
-            queryset = Submission.objects.select_related('student', 'score_item', 'reviewer')
+            queryset = submissions
             
             # 处理筛选参数
             student_name = request.GET.get('student_name')
@@ -279,55 +296,46 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             status = request.GET.get('status')
             
             if student_name:
-                queryset = queryset.filter(student__full_name__icontains=student_name)
+                queryset = queryset.filter(student_filter(student_name, ['full_name'], 'student'))
             if student_id:
-                queryset = queryset.filter(student__student_id__icontains=student_id)
+                queryset = queryset.filter(student_filter(student_id, ['student_id'], 'student'))
             if assignment:
-                queryset = queryset.filter(score_item__name__icontains=assignment)
+                queryset = queryset.filter(score_item_filter(assignment, ['name'], 'score_item'))
             if status:
                 queryset = queryset.filter(status=status)
-            
-            queryset = list(queryset.order_by('-submitted_at'))
         elif student_profile:
             # 普通学生只能查看自己的提交记录
-            queryset = list(Submission.objects.filter(student=student_profile)
-                .select_related('score_item', 'reviewer')
-                .order_by('-submitted_at'))
-        elif current_user.is_authenticated:
-            # 已登录但不是学生的用户，获取空记录
-            queryset = []
-        else:
-            # 未登录用户获取空记录
-            queryset = []
+            queryset = submissions.filter(student=student_profile)
+        # 其余情况（已登录但不是学生的用户、未登录用户）保持空查询集
         
-        # 确保queryset始终是一个列表
-        if not isinstance(queryset, list):
-            queryset = list(queryset)
+        # search参数走全文索引
+        return self.filter_queryset(queryset)
+
+    @versioned(submission_versions)
+    def list(self, request, *args, **kwargs):
+        """提交记录列表视图，与submission_history保持数据同步"""
+        # 获取当前用户信息
+        current_user = request.user
         
-        # 为每个提交记录添加URL信息
-        for submission in queryset:
-            # 为查看详情按钮添加URL
-            submission.detail_url = f'/submission-list/{submission.id}/'
-            
-            # 为待审核状态的记录添加操作URL
-            submission.detail_url = f'/submission-detail/{submission.id}/'
-            if submission.status == 'pending':
-                if request.user.is_staff:
-                    # 教师/管理员可以通过或驳回
-                    submission.approve_url = f'/submission-approve/{submission.id}/'
-                    submission.reject_url = f'/submission-reject/{submission.id}/'
-                else:
-                    # 学生可以撤销自己的提交
-                    submission.revoke_url = f'/submission-revoke/{submission.id}/'
+        # 获取当前用户的学生档案
+        student_profile = StudentProfile.objects.filter(user=current_user).first() if current_user.is_authenticated else None
         
-        # 构建上下文数据
+        # 检查是否是教师或管理员
+        is_teacher = current_user.is_superuser or current_user.is_staff
+        
+        # JSON请求返回序列化后的分页结果，按?fields/?expand只读取需要的关联和列
+        if _wants_json(request):
+            submissions = SubmissionSerializer.optimize(Submission.objects.all(), request)
+            # 游标分页：只取出当前页的记录
+            queryset = self.paginate_queryset(self.table_queryset(request, submissions, student_profile))
+            serializer = self.get_serializer(queryset, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        # 页面只渲染筛选表单和表格框架，可见区域的行由rows接口按需读取
         context = {
-            'submissions': queryset,
+            'rows_url': reverse('students:submission-rows'),
             'student_profile': student_profile,
             'is_teacher': is_teacher,
-            'has_submissions': bool(queryset),
-            'submission_count': len(queryset),
-            'is_paginated': False,
             'request': request,
             'login_url': reverse('students:login', request=request),
             'logout_url': reverse('students:logout', request=request) if hasattr(request, 'resolver_match') and request.resolver_match.namespaces and 'students' in request.resolver_match.namespaces else reverse('logout'),
@@ -338,44 +346,53 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                 'user_is_staff': current_user.is_staff if current_user.is_authenticated else False,
                 'has_student_profile': student_profile is not None,
                 'student_name': student_profile.full_name if student_profile else 'None',
-                'submission_count': len(queryset)
             }
         }
         
         return render(request, 'students/submission_list.html', context)
 
+    @versioned(submission_versions)
+    @action(detail=False, methods=['get'])
+    def rows(self, request):
+        """虚拟滚动表格的行区间：?offset=&limit=，筛选参数与列表页面相同"""
+        user = request.user
+        is_teacher = user.is_staff or user.is_superuser
+        # 管理员看全部记录，不需要读取学生档案
+        student_profile = None if is_teacher or not user.is_authenticated else StudentProfile.objects.filter(user=user).first()
+        queryset = self.table_queryset(request, Submission.objects.order_by('-submitted_at', '-id'), student_profile)
+        return Response(row_range(
+            queryset, request.query_params, name='submissions',
+            fields=['id', 'student__full_name', 'student__student_id', 'score_item__name', 'score_item__score',
+                    'status', 'submitted_at', 'reviewed_at', 'proof_file'],
+            columns=[
+                ('id', 'id'),
+                ('student_name', 'student__full_name'),
+                ('student_id', 'student__student_id'),
+                ('score_item', 'score_item__name'),
+                ('score', 'score_item__score'),
+                ('status', 'status'),
+                ('submitted_at', 'submitted_at'),
+                ('reviewed_at', 'reviewed_at'),
+                ('proof', lambda record: bool(record['proof_file'])),
+                ('preview', lambda record: bool(record['proof_file']) and has_preview(record['proof_file'])),
+            ],
+            filters={name: request.query_params[name] for name in self.TABLE_FILTERS if request.query_params.get(name)},
+            version_keys=submission_versions(self, request),
+            scope='staff' if is_teacher else f'student:{getattr(student_profile, "pk", None)}',
+            versions=getattr(request, 'data_versions', None),
+        ))
+
     def get_queryset(self):
         user = self.request.user
-        # 基础查询集，预加载相关数据
-        queryset = Submission.objects.select_related('student', 'score_item', 'reviewer').order_by('-submitted_at')
+        # 基础查询集，按?fields/?expand预加载需要的关联
+        queryset = SubmissionSerializer.optimize(Submission.objects.order_by('-submitted_at'), self.request)
 
         # 权限控制：学生只能看到自己的提交记录
         if not user.is_staff:
             queryset = queryset.filter(student__user=user)
         else:
             # 管理员可以筛选
-            # 状态筛选
-            status_filter = self.request.query_params.get('status')
-            if status_filter:
-                queryset = queryset.filter(status=status_filter)
-
-            # 时间范围筛选
-            start_date = self.request.query_params.get('start_date')
-            end_date = self.request.query_params.get('end_date')
-            if start_date:
-                queryset = queryset.filter(submitted_at__gte=start_date)
-            if end_date:
-                queryset = queryset.filter(submitted_at__lte=end_date)
-                
-            # 学生ID筛选
-            student_id = self.request.query_params.get('student_id')
-            if student_id:
-                queryset = queryset.filter(student__student_id=student_id)
-                
-            # 加分项目ID筛选
-            score_item_id = self.request.query_params.get('score_item_id')
-            if score_item_id:
-                queryset = queryset.filter(score_item_id=score_item_id)
+            queryset = filter_submissions(queryset, self.request.query_params)
 
         return queryset
     
@@ -384,13 +401,38 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         student_profile = self.request.user.profile
         serializer.save(student=student_profile)
     
-    def perform_update(self, serializer):
-        # 当管理员更新状态时，记录审核人
-        if self.request.user.is_staff and 'status' in serializer.validated_data:
-            serializer.save(reviewer=self.request.user)
-        else:
-            serializer.save()
-    
+    # 批量审核的决定与目标状态
+    REVIEW_DECISIONS = {'approve': 'approved', 'reject': 'rejected'}
+
+    @action(detail=False, methods=['post'], url_path='bulk-review')
+    def bulk_review(self, request):
+        """批量审核：ids为提交记录ID列表，decision为approve或reject，comment为可选的审核意见"""
+        decision = request.data.get('decision')
+        if decision not in self.REVIEW_DECISIONS:
+            return Response({'error': 'decision必须为approve或reject'}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = request.data.getlist('ids') if hasattr(request.data, 'getlist') else request.data.get('ids')
+        if not isinstance(ids, (list, tuple)) or not ids:
+            return Response({'error': 'ids必须是非空的提交记录ID列表'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [int(pk) for pk in ids]
+        except (TypeError, ValueError):
+            return Response({'error': 'ids中包含无效的提交记录ID'}, status=status.HTTP_400_BAD_REQUEST)
+
+        new_status = self.REVIEW_DECISIONS[decision]
+        outcomes = bulk_transition(ids, new_status, reviewer=request.user, comment=request.data.get('comment'))
+        return Response({
+            'decision': decision,
+            'updated': sum(result == new_status for result in outcomes.values()),
+            'results': [{'id': pk, 'result': outcomes[pk]} for pk in dict.fromkeys(ids)],
+        })
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """按与列表相同的筛选条件流式导出提交记录CSV"""
+        return streaming_csv_response('submissions', self.get_queryset().order_by('-submitted_at', '-id'))
+
+    @versioned(submission_versions)
     def retrieve(self, request, *args, **kwargs):
         # 获取单个提交记录
         instance = self.get_object()
@@ -414,12 +456,9 @@ def submission_revoke(request, pk):
     if not request.user.is_staff and submission.student.user != request.user:
         return HttpResponse('只能撤回自己的提交', status=403)
     
-    if submission.status != 'pending':
+    if not submission.transition('revoked', from_status='pending'):
         return HttpResponse('只能撤回待审核的提交', status=400)
     
-    submission.status = 'revoked'
-    submission.save()
-    
     # 添加成功消息
     messages.success(request, '提交已成功撤回')
     
@@ -427,19 +466,42 @@ def submission_revoke(request, pk):
     return HttpResponseRedirect(reverse('students:submission-history'))
 
 
+def _proof_submission(request, pk):
+    """返回当前用户可查看证明文件的提交记录，无权查看时返回None"""
+    submission = get_object_or_404(Submission.objects.select_related('student'), pk=pk)
+    if not request.user.is_staff and submission.student.user_id != request.user.id:
+        return None
+    return submission
+
+
+@require_safe
+@login_required
+def submission_proof(request, pk):
+    """下载证明文件，仅限提交者本人和教师；支持断点续传和缓存验证"""
+    submission = _proof_submission(request, pk)
+    if submission is None:
+        return HttpResponse('只能查看自己提交的证明文件', status=403)
+    return serve_proof(request, submission.proof_file, f'证明材料-{submission.pk}')
+
+
+@require_safe
+@login_required
+def submission_preview(request, pk):
+    """证明文件的缩略图，权限与下载相同"""
+    submission = _proof_submission(request, pk)
+    if submission is None:
+        return HttpResponse('只能查看自己提交的证明文件', status=403)
+    return serve_preview(request, submission.proof_file, f'证明材料-{submission.pk}')
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAdminUser])
 def submission_approve(request, pk):
     submission = get_object_or_404(Submission, pk=pk)
     
-    if submission.status != 'pending':
+    if not submission.transition('approved', reviewer=request.user, from_status='pending'):
         return Response({'error': '只能审核待审核的提交'}, status=status.HTTP_400_BAD_REQUEST)
     
-    submission.status = 'approved'
-    submission.reviewer = request.user
-    submission.reviewed_at = timezone.now()
-    submission.save()
-    
     # 重定向或返回JSON
     if request.accepted_renderer.format == 'html' or request.headers.get('Accept') == 'text/html':
         return HttpResponseRedirect(reverse('submission-list'))
@@ -451,14 +513,9 @@ def submission_approve(request, pk):
 def submission_reject(request, pk):
     submission = get_object_or_404(Submission, pk=pk)
     
-    if submission.status != 'pending':
+    if not submission.transition('rejected', reviewer=request.user, from_status='pending'):
         return Response({'error': '只能审核待审核的提交'}, status=status.HTTP_400_BAD_REQUEST)
     
-    submission.status = 'rejected'
-    submission.reviewer = request.user
-    submission.reviewed_at = timezone.now()
-    submission.save()
-    
     # 重定向或返回JSON
     if request.accepted_renderer.format == 'html' or request.headers.get('Accept') == 'text/html':
         return HttpResponseRedirect(reverse('submission-list'))
@@ -466,7 +523,7 @@ def submission_reject(request, pk):
 
 # 详情页面视图函数
 def submission_detail(request, pk):
-    print(f"submission_detail view called with pk={pk}")
+    logger.debug("submission_detail pk=%s", pk)
     try:
         submission = Submission.objects.filter(pk=pk).first()
         
@@ -492,7 +549,7 @@ def submission_detail(request, pk):
         
         return render(request, 'students/submission_detail.html', context)
     except Exception as e:
-        print(f"Error in submission_detail: {str(e)}")
+        logger.exception("加载提交记录失败 pk=%s", pk)
         context = {
             'error': f'加载提交记录时发生错误: {str(e)}',
             'user': request.user,
@@ -685,6 +742,10 @@ def debug_profile(request):
                     request.user.email or '',
                     ''
                 ])
+                # 原生SQL写入不触发信号，手动递增版本号并更新全文索引
+                profile_ids = list(StudentProfile.objects.filter(user=request.user).values_list('pk', flat=True))
+                bump_version(StudentProfile, profile_ids)
+                search.index_students(profile_ids)
                 
                 # 重新查询确认创建成功
                 cursor.execute("""
@@ -796,7 +857,6 @@ def personal_info(request):
                         class_name = excluded.class_name,
                         email = excluded.email,
                         phone = excluded.phone,
-                        total_score = 0,
                         last_updated = CURRENT_TIMESTAMP
                 """, [
                     request.user.id,
@@ -809,6 +869,13 @@ def personal_info(request):
                     phone
                 ])
             
+            # 专业或班级可能变化，让排名索引重建
+            rank_index.invalidate()
+            # 原生SQL写入不触发信号，手动递增版本号并更新全文索引
+            profile_ids = list(StudentProfile.objects.filter(user=request.user).values_list('pk', flat=True))
+            bump_version(StudentProfile, profile_ids)
+            search.index_students(profile_ids)
+            
             # 添加成功消息
             messages.success(request, '个人信息更新成功！')
             return redirect('students:personal-info')
@@ -843,6 +910,10 @@ def personal_info(request):
                 request.user.email or '',
                 ''
             ])
+        # 原生SQL写入不触发信号，手动递增版本号并更新全文索引
+        profile_ids = list(StudentProfile.objects.filter(user=request.user).values_list('pk', flat=True))
+        bump_version(StudentProfile, profile_ids)
+        search.index_students(profile_ids)
         
         # 重新获取刚创建的数据
         with connection.cursor() as cursor:
@@ -982,6 +1053,8 @@ def edit_student_info(request, student_id):
                     phone,
                     student.id
                 ])
+            # 原生SQL写入不触发信号，手动递增版本号
+            bump_version(StudentProfile, [student.id])
             
             # 同时更新用户邮箱
             if email != student.user.email:
@@ -990,6 +1063,8 @@ def edit_student_info(request, student_id):
             
             # 重新获取更新后的学生信息
             student.refresh_from_db()
+            rank_index.update_student(student.id, student.major, student.class_name)
+            search.index_instance(student)
             
             # 记录变更日志
             field_changes = [
@@ -1028,6 +1103,14 @@ def edit_student_info(request, student_id):
     })
 
 
+@login_required
+def export_change_logs(request):
+    """流式导出学生信息变更日志CSV，仅限教师和管理员"""
+    if not (request.user.is_superuser or request.user.is_staff):
+        return JsonResponse({'error': '您没有权限导出变更日志'}, status=403)
+    return streaming_csv_response('change-logs', export_queryset('change-logs', request.GET))
+
+
 @login_required
 def submission_history(request):
     """提交记录历史视图"""
@@ -1045,8 +1128,8 @@ def submission_history(request):
     # 检查是否是教师或管理员
     is_teacher = current_user.is_superuser or current_user.is_staff
     
-    # 初始化提交记录列表
-    submissions = []
+    # 初始化提交记录查询集
+    submissions = Submission.objects.none()
     
     # 教师/管理员可以查看所有学生的提交记录，应用筛选条件
     if is_teacher:
@@ -1060,24 +1143,23 @@ def submission_history(request):
         status = request.GET.get('status')
         
         if student_name:
-            queryset = queryset.filter(student__full_name__icontains=student_name)
+            queryset = queryset.filter(student_filter(student_name, ['full_name'], 'student'))
         if student_id:
-            queryset = queryset.filter(student__student_id__icontains=student_id)
+            queryset = queryset.filter(student_filter(student_id, ['student_id'], 'student'))
         if assignment:
-            queryset = queryset.filter(score_item__name__icontains=assignment)
+            queryset = queryset.filter(score_item_filter(assignment, ['name'], 'score_item'))
         if status:
             queryset = queryset.filter(status=status)
         
-        submissions = list(queryset.order_by('-submitted_at'))
+        submissions = queryset
     elif student_profile:
         # 普通学生只能查看自己的提交记录
-        submissions = list(Submission.objects.filter(student=student_profile)
-            .select_related('score_item')
-            .order_by('-submitted_at'))
+        submissions = (Submission.objects.filter(student=student_profile)
+            .select_related('score_item'))
     
-    # 确保submissions始终是一个列表
-    if not isinstance(submissions, list):
-        submissions = list(submissions)
+    # 游标分页：只取出当前页的记录
+    paginator = SubmissionKeysetPagination()
+    submissions = paginator.paginate_queryset(submissions, request)
     
     # 构建上下文数据
     context = {
@@ -1086,6 +1168,7 @@ def submission_history(request):
         'is_teacher': is_teacher,
         'has_submissions': bool(submissions),
         'submission_count': len(submissions),
+        **paginator.get_page_context(),
         # 确保logout_url始终可用
         'logout_url': reverse('students:logout') if hasattr(request, 'resolver_match') and request.resolver_match.namespaces and 'students' in request.resolver_match.namespaces else reverse('logout'),
         # 添加调试信息
@@ -1105,6 +1188,7 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
     queryset = ScoreItem.objects.all()
     serializer_class = ScoreItemSerializer
     permission_classes = [permissions.AllowAny]  # 默认允许所有访问
+    search_fields = ['name', 'description']
 
     def get_permissions(self):
         # 列表视图始终允许匿名访问
@@ -1118,11 +1202,18 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
     
+    def get_queryset(self):
+        # 详情接口按?fields只读取需要的列；列表页面始终渲染完整的加分项目
+        if self.action == 'retrieve':
+            return ScoreItemSerializer.optimize(ScoreItem.objects.all(), self.request)
+        return super().get_queryset()
+
     def post(self, request, *args, **kwargs):
         # 处理POST请求，将其重定向到retrieve方法
         # 这解决了编辑scoreitem后出现的405 Method Not Allowed错误
         return self.retrieve(request, *args, **kwargs)
     
+    @versioned(score_item_versions)
     def retrieve(self, request, *args, **kwargs):
         # 获取对象实例
         instance = self.get_object()
@@ -1216,9 +1307,8 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
     
     def create(self, request, *args, **kwargs):
         # 处理HTML表单提交和Ajax请求
-        print(f"ScoreItemViewSet.create() 被调用，方法: {request.method}")
-        print(f"请求头: {dict(request.headers)}")
-        print(f"请求数据: {dict(request.POST)}")
+        # 只记录提交的字段名，不输出请求头和表单内容
+        logger.debug("ScoreItemViewSet.create method=%s fields=%s", request.method, sorted(request.POST))
         
         if request.method == 'POST':
             # 从表单获取数据
@@ -1228,12 +1318,12 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
             score = request.POST.get('score', '').strip()
             description = request.POST.get('description', '').strip()
             
-            print(f"接收到添加项目请求: name={name}, category={category}, level={level}, score={score}")
+            logger.debug("添加加分项目 name=%s category=%s level=%s score=%s", name, category, level, score)
             
             # 基本验证
             if not all([name, category, level, score]):
                 error_msg = '请填写所有必填字段'
-                print(f"验证失败: {error_msg}")
+                logger.info("加分项目验证失败: %s", error_msg)
                 
                 # 检查是否是Ajax请求
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -1250,7 +1340,7 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
                 existing_item = ScoreItem.objects.filter(name=name, category=category).first()
                 if existing_item:
                     error_msg = f'加分项目 "{name}" 已存在'
-                    print(f"创建失败: {error_msg}")
+                    logger.info("加分项目创建失败: %s", error_msg)
                     
                     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                         return JsonResponse({'error': error_msg}, status=400)
@@ -1262,7 +1352,7 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
                 valid_categories = [choice[0] for choice in ScoreItem.CATEGORY_CHOICES]
                 if category not in valid_categories:
                     error_msg = f'无效的类别值: {category}'
-                    print(f"验证失败: {error_msg}")
+                    logger.info("加分项目验证失败: %s", error_msg)
                     
                     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                         return JsonResponse({'error': error_msg}, status=400)
@@ -1279,7 +1369,7 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
                 )
                 
                 success_msg = f'加分项目 "{score_item.name}" 创建成功'
-                print(f"创建成功: {success_msg}")
+                logger.info("加分项目创建成功 id=%s name=%s user=%s", score_item.id, score_item.name, request.user.pk)
                 
                 # 检查是否是Ajax请求
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -1290,7 +1380,7 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
                 return redirect('students:scoreitem-list' + '?success=true')
             except ValueError:
                 error_msg = '分值必须是有效的数字'
-                print(f"验证失败: {error_msg}")
+                logger.info("加分项目验证失败: %s", error_msg)
                 
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                     return JsonResponse({'error': error_msg}, status=400)
@@ -1298,7 +1388,7 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
                 messages.error(request, error_msg)
             except Exception as e:
                 error_msg = f'创建加分项目失败: {str(e)}'
-                print(f"创建失败: {error_msg}, 异常类型: {type(e).__name__}")
+                logger.exception("加分项目创建失败")
                 
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                     return JsonResponse({'error': error_msg}, status=500)
@@ -1315,6 +1405,7 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
         # 对于非POST请求，使用默认的create方法
         return super().create(request, *args, **kwargs)
     
+    @versioned(score_item_versions)
     def list(self, request, *args, **kwargs):
         # 始终渲染HTML模板
         queryset = self.filter_queryset(self.get_queryset())
@@ -1357,7 +1448,7 @@ class ScoreItemViewSet(viewsets.ModelViewSet):
 class StudentProfileViewSet(viewsets.ModelViewSet):
     serializer_class = StudentProfileSerializer
     permission_classes = [permissions.AllowAny]  # 默认允许所有访问
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [FullTextSearchFilter]
     search_fields = ['full_name', 'student_id', 'major', 'class_name']
     
     def get_permissions(self):
@@ -1371,26 +1462,29 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
             return [permissions.IsAdminUser()]  # 只有管理员可以删除
         return super().get_permissions()
 
-    def list(self, request, *args, **kwargs):
-        # 始终渲染HTML模板，无需检查格式
+    # 学生列表页面的筛选参数
+    TABLE_FILTERS = ('name', 'student_id', 'class_name', 'major')
+
+    def table_queryset(self, request):
+        """
+        学生列表页面的数据范围和筛选：
+        1. 管理员可以看到所有学生信息
+        2. 学生只能看到自己的信息
+        3. 未登录用户看不到学生信息列表
+        """
         user = request.user
-        
-        # 权限控制：
-        # 1. 管理员可以看到所有学生信息
-        # 2. 学生只能看到自己的信息
-        # 3. 未登录用户看不到学生信息列表
         if user.is_staff:
             # 管理员可以看到所有学生并使用筛选功能，排除超级管理员账号
-            queryset = StudentProfile.objects.select_related('user').exclude(user__is_superuser=True).order_by('-total_score')
+            queryset = StudentProfile.objects.exclude(user__is_superuser=True).order_by('-total_score', 'id')
             
             # 应用HTML页面的搜索和筛选
             name = request.GET.get('name')
             if name:
-                queryset = queryset.filter(full_name__icontains=name)
+                queryset = queryset.filter(student_filter(name, ['full_name']))
             
             student_id = request.GET.get('student_id')
             if student_id:
-                queryset = queryset.filter(student_id__icontains=student_id)
+                queryset = queryset.filter(student_filter(student_id, ['student_id']))
             
             class_name = request.GET.get('class_name')
             if class_name:
@@ -1399,70 +1493,27 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
             major = request.GET.get('major')
             if major:
                 queryset = queryset.filter(major=major)
-            
+            return queryset
+        if user.is_authenticated:
+            # 学生只能看到自己的信息
+            return StudentProfile.objects.filter(user=user).order_by('id')
+        # 未登录用户看不到学生信息
+        return StudentProfile.objects.none()
+
+    @versioned(student_versions)
+    def list(self, request, *args, **kwargs):
+        # 始终渲染HTML模板；页面只包含筛选表单和表格框架，可见区域的行由rows接口按需读取
+        if request.user.is_staff:
             # 获取所有班级和专业用于筛选器
             class_list = StudentProfile.objects.values_list('class_name', flat=True).distinct().order_by('class_name')
             major_list = StudentProfile.objects.values_list('major', flat=True).distinct().order_by('major')
-        elif user.is_authenticated:
-            # 学生只能看到自己的信息
-            queryset = StudentProfile.objects.filter(user=user).select_related('user')
-            class_list = []
-            major_list = []
         else:
-            # 未登录用户看不到学生信息
-            queryset = StudentProfile.objects.none()
             class_list = []
             major_list = []
         
-        # 分页
-        page = self.paginate_queryset(queryset)
-        
-        # 确定要处理的数据集
-        students_to_process = page if page is not None else queryset
-        
-        # 创建一个新的列表，包含学生对象和他们的统计数据
-        students_with_stats = []
-        for student in students_to_process:
-            # 创建学生信息字典
-            student_info = {
-                'id': student.id,
-                'student_id': student.student_id,
-                'full_name': student.full_name,
-                'major': student.major,
-                'class_name': student.class_name,
-                'total_score': student.total_score,
-                'detail_url': reverse('students:studentprofile-detail', args=[student.id]),
-                'edit_url': reverse('students:studentprofile-detail', args=[student.id])
-            }
-            
-            # 直接使用硬编码数据来测试显示
-            print(f"处理学生: {student.full_name}, ID: {student.id}, 学号: {student.student_id}")
-            
-            # 从数据库查询实际的提交统计数据
-            try:
-                student_info['submission_count'] = Submission.objects.filter(student=student).count()
-                student_info['approved_count'] = Submission.objects.filter(student=student, status='approved').count()
-                print(f"查询实际数据: {student.full_name} 提交{student_info['submission_count']}, 通过{student_info['approved_count']}")
-            except Exception as e:
-                student_info['submission_count'] = 0
-                student_info['approved_count'] = 0
-                print(f"查询数据出错: {str(e)}")
-            
-            students_with_stats.append(student_info)
-                # 使用前面已正确构建的students_with_stats列表，不进行覆盖
-        # 确保包含了所有必要的字段
-        for student_info in students_with_stats:
-            if 'class_name' not in student_info:
-                student_info['class_name'] = ''
-            if 'major_name' not in student_info:
-                student_info['major_name'] = student_info.get('major', '')
-            if 'academic_year' not in student_info:
-                student_info['academic_year'] = student_info.get('grade', '')
-        
         # 构建上下文
         context = {
-            'students': students_with_stats,
-            'is_paginated': page is not None,
+            'rows_url': reverse('students:studentprofile-rows'),
             'class_list': class_list,
             'major_list': major_list,
             'request': request,
@@ -1471,40 +1522,48 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
             'user': request.user,
             'is_teacher': request.user.is_superuser or request.user.is_staff
         }
-        
-        # 如果是分页，添加分页对象
-        if page is not None:
-            context['page_obj'] = page
-        
         return render(request, 'students/student_list.html', context)
 
+    @versioned(student_versions)
+    @action(detail=False, methods=['get'])
+    def rows(self, request):
+        """虚拟滚动表格的行区间：?offset=&limit=，筛选参数与列表页面相同"""
+        user = request.user
+        data = row_range(
+            self.table_queryset(request), request.query_params, name='students',
+            fields=['id', 'student_id', 'full_name', 'major', 'class_name', 'total_score',
+                    'submission_count', 'approved_count'],
+            columns=[
+                ('id', 'id'),
+                ('student_id', 'student_id'),
+                ('full_name', 'full_name'),
+                ('major', 'major'),
+                ('class_name', 'class_name'),
+                ('total_score', 'total_score'),
+                ('rank', lambda record: rank_index.rank(record['id'])),
+                ('submission_count', 'submission_count'),
+                ('approved_count', 'approved_count'),
+            ],
+            filters={name: request.query_params[name] for name in self.TABLE_FILTERS if request.query_params.get(name)},
+            version_keys=student_versions(self, request),
+            scope='staff' if user.is_staff else f'user:{user.pk}',
+            versions=getattr(request, 'data_versions', None),
+        )
+        if row_logger.isEnabledFor(logging.DEBUG):
+            for row in data['rows']:
+                row_logger.debug("学生 %s 总加分 %s 排名 %s", row[0], row[5], row[6])
+        logger.debug("学生列表行区间 offset=%s 共%d行", data['offset'], len(data['rows']))
+        return Response(data)
+
     def get_queryset(self):
         # 管理员可见所有，学生仅见自己，排除超级管理员账号
         user = self.request.user
         # 排除user.is_superuser为True的学生账号
-        queryset = StudentProfile.objects.select_related('user').prefetch_related('submissions').exclude(user__is_superuser=True).order_by('-total_score')
+        queryset = StudentProfileSerializer.optimize(
+            StudentProfile.objects.exclude(user__is_superuser=True).order_by('-total_score'), self.request)
         
         # 支持多条件筛选
-        filters = {}
-        
-        # 专业筛选
-        major = self.request.query_params.get('major')
-        if major:
-            filters['major'] = major
-            
-        # 年级筛选
-        grade = self.request.query_params.get('grade')
-        if grade:
-            filters['grade'] = grade
-            
-        # 班级筛选
-        class_name = self.request.query_params.get('class_name')
-        if class_name:
-            filters['class_name'] = class_name
-            
-        # 应用筛选条件
-        if filters:
-            queryset = queryset.filter(**filters)
+        queryset = filter_student_profiles(queryset, self.request.query_params)
             
         # 排序选项
         sort_by = self.request.query_params.get('sort_by', 'total_score')
@@ -1522,6 +1581,30 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
         else:
             return queryset.filter(user=user)
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        """按与列表相同的筛选条件流式导出学生排名CSV，始终按总加分降序"""
+        return streaming_csv_response('rankings', self.get_queryset())
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAdminUser])
+    def import_students(self, request):
+        """
+        批量导入学生账号：file为CSV文件，partial为真时跳过校验失败的行，dry_run为真时只校验
+        任一行校验失败且未导入任何数据时返回400
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': '请上传CSV文件'}, status=status.HTTP_400_BAD_REQUEST)
+        flags = {name: str(request.data.get(name, '')).lower() in ('1', 'true', 'yes', 'on')
+                 for name in ('partial', 'dry_run')}
+        result = importing.import_students(upload.read(), workers=getattr(settings, 'STUDENT_IMPORT_WORKERS', None),
+                                           **flags)
+        failed = bool(result.errors) and not result.created and not flags['dry_run']
+        return Response(
+            {'rows': result.rows, 'created': result.created, 'errors': result.errors},
+            status=status.HTTP_400_BAD_REQUEST if failed else status.HTTP_200_OK,
+        )
+
     # 已在类开始处定义get_permissions，此处删除重复方法
     
     def perform_update(self, serializer):
@@ -1532,17 +1615,14 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
                 raise permissions.PermissionDenied("您无权修改其他学生的信息")
         serializer.save()
 
+    @versioned(student_versions)
     def retrieve(self, request, *args, **kwargs):
         # 获取对象实例
         instance = self.get_object()
         
-        # 计算统计数据（这些值也会被SerializerMethodField计算，但我们提前计算以备HTML渲染使用）
-        submission_count_value = instance.submissions.count()
-        approved_count_value = instance.submissions.filter(status='approved').count()
-        
-        # 设置到实例对象
-        instance.submission_count = submission_count_value
-        instance.approved_count = approved_count_value
+        # 统计数据直接读取学生档案上的计数列，HTML和API共用
+        submission_count_value = instance.submission_count
+        approved_count_value = instance.approved_count
         
         # 检查是否是API请求（JSON格式）
         if request.accepted_renderer.format == 'json' or 'application/json' in request.headers.get('Accept', ''):
@@ -1553,6 +1633,7 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
             # 对于普通浏览器请求，返回HTML页面
             context = {
                 'student': instance,
+                'ranks': rank_index.ranks(instance.id),
                 'user': request.user,
                 'is_teacher': request.user.is_superuser or request.user.is_staff,
                 'login_url': reverse('students:login', request=request),
@@ -1567,6 +1648,25 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
             }
             return render(request, 'students/student_detail.html', context)
 
+    @action(detail=True, methods=['get'])
+    def rank(self, request, pk=None):
+        """返回学生的全局/专业/班级排名以及排名前后的相邻学生"""
+        instance = self.get_object()
+        try:
+            radius = min(max(int(request.query_params.get('radius', 2)), 0), 20)
+        except ValueError:
+            radius = 2
+        scope = request.query_params.get('scope', 'global')
+        if scope not in ('global', 'major', 'class'):
+            scope = 'global'
+        return Response({
+            'id': instance.id,
+            'total_score': instance.total_score,
+            'ranks': rank_index.ranks(instance.id),
+            'scope': scope,
+            'neighbours': rank_index.neighbours(instance.id, radius=radius, scope=scope),
+        })
+
     def check_object_permissions(self, request, obj):
         # 确保学生只能修改自己的信息
         if not request.user.is_staff and obj.user != request.user:
@@ -1577,75 +1677,32 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
 
 def student_detail(request, pk):
     # 处理学生详情页面
-    print(f"\n=== student_detail 视图函数被调用 ===")
-    print(f"请求路径: {request.path}")
-    print(f"学生ID: {pk}")
+    logger.debug("student_detail path=%s pk=%s", request.path, pk)
     
     try:
         # 使用更复杂的查询确保submissions关系正确加载
-        student = StudentProfile.objects.select_related('user').prefetch_related('submissions').get(pk=pk)
-        print(f"找到学生: {student.full_name} (ID: {student.id})")
+        student = StudentProfile.objects.select_related('user').get(pk=pk)
         
         # 检查权限：学生只能查看自己的信息，管理员可以查看所有
         if not request.user.is_staff and student.user != request.user:
-            print("权限检查失败: 用户没有权限查看此学生信息")
+            logger.info("无权查看学生信息 user=%s student=%s", request.user.pk, pk)
             # 避免使用messages以兼容测试环境
             # messages.error(request, '您没有权限查看此学生信息')
-            print("重定向到首页")
             try:
                 return redirect('students:home')
             except:
                 return render(request, 'students/student_detail.html', {'student': None, 'error': '您没有权限查看此学生信息'})
         
-        # 直接计算统计数据，使用更可靠的方式
-        try:
-            # 计算所有提交记录（包括所有状态：approved, pending, rejected, revoked等）
-            # 确保使用正确的学生对象进行过滤
-            submission_count_value = Submission.objects.filter(student_id=student.id).count()
-            print(f"直接使用student_id过滤: {submission_count_value}")
-            # 也可以通过prefetch_related的submissions属性计算
-            related_count = student.submissions.count()
-            print(f"通过related_name计算: {related_count}")
-            # 两者应该一致，使用submission_count_value作为最终值
-            
-            # 计算通过记录数
-            approved_count_value = Submission.objects.filter(student_id=student.id, status='approved').count()
-            
-            # 记录详细的状态统计信息用于调试
-            print(f"学生 {student.full_name} 的提交记录统计:")
-            print(f"  总提交数: {submission_count_value}")
-            print(f"  通过数: {approved_count_value}")
-            
-            # 计算各状态的记录数
-            status_counts = {}
-            for status in ['pending', 'approved', 'rejected', 'revoked']:
-                count = Submission.objects.filter(student=student, status=status).count()
-                status_counts[status] = count
-            print(f"  各状态记录数: {status_counts}")
-            
-            # 记录所有提交记录详情
-            submissions = Submission.objects.filter(student=student)
-            print(f"  提交记录详情: {[f'{s.id}:{s.score_item.name}:{s.status}' for s in submissions]}")
-            
-            # 确保没有使用硬编码值
-            print(f"警告: 确认没有使用硬编码值，当前计算值为: {submission_count_value}")
-            
-        except Exception as e:
-            # 出现错误时提供默认值
-            submission_count_value = 0
-            approved_count_value = 0
-            print(f"计算统计数据错误: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # 同时设置到student对象和上下文
-        student.submission_count = submission_count_value
-        student.approved_count = approved_count_value
-        print(f"设置student对象属性: submission_count={submission_count_value}, approved_count={approved_count_value}")
+        # 统计数据直接读取学生档案上的计数列，无需任何COUNT查询
+        submission_count_value = student.submission_count
+        approved_count_value = student.approved_count
+        status_counts = {status: getattr(student, f'{status}_count') for status, _ in Submission.STATUS_CHOICES}
+        logger.debug("学生 %s 各状态记录数: %s", pk, status_counts)
         
         # 构建上下文，确保所有可能需要的变量都包含在内
         context = {
             'student': student,
+            'ranks': rank_index.ranks(student.id),
             'user': request.user,
             'is_teacher': request.user.is_superuser or request.user.is_staff,
             # 简化URL处理以避免潜在错误
@@ -1654,6 +1711,7 @@ def student_detail(request, pk):
             # 多种方式提供计数值 - 确保所有变量都设置为相同的正确值
             'submission_count': submission_count_value,
             'approved_count': approved_count_value,
+            'status_counts': status_counts,
             'submission_count_direct': submission_count_value,
             'approved_count_direct': approved_count_value,
             # 确保没有硬编码值，添加更多明确的变量名
@@ -1670,11 +1728,9 @@ def student_detail(request, pk):
                 'timestamp': timezone.now().strftime('%Y-%m-%d %H:%M:%S')
             }
         }
-        print(f"构建上下文完成，提交数设置为: {context['submission_count']}")
-        
         return render(request, 'students/student_detail.html', context)
     except StudentProfile.DoesNotExist:
-        print("学生不存在")
+        logger.info("学生不存在 pk=%s", pk)
         # 避免使用messages
         # messages.error(request, '学生不存在')
         try:
@@ -1682,9 +1738,7 @@ def student_detail(request, pk):
         except:
             return render(request, 'students/student_detail.html', {'student': None, 'error': '学生不存在'})
     except Exception as e:
-        print(f"加载学生信息时发生错误: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("加载学生信息时发生错误 pk=%s", pk)
         # 避免使用messages
         # messages.error(request, f'加载学生信息时发生错误: {str(e)}')
         try:
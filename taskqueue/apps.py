@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TaskqueueConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'taskqueue'
+    verbose_name = '后台任务'
+
+    def ready(self):
+        # 各应用的tasks.py中用@task登记任务
+        autodiscover_modules('tasks')
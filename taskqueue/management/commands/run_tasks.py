@@ -0,0 +1,74 @@
+"""
+执行后台任务
+
+    python manage.py run_tasks                  # 常驻运行，在当前线程中逐组执行
+    python manage.py run_tasks --threads 4      # 线程池，适合以数据库读写为主的任务
+    python manage.py run_tasks --processes 2    # 进程池，适合生成预览图等CPU密集任务
+    python manage.py run_tasks --once           # 执行完当前到期的任务后退出，可由cron调用
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from taskqueue import queue
+
+
+def _setup_worker():
+    # 子进程不能沿用父进程的数据库连接；spawn方式启动时还需要重新加载Django配置
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = '领取并执行数据库中的后台任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=0, help='线程池大小')
+        parser.add_argument('--processes', type=int, default=0, help='进程池大小')
+        parser.add_argument('--batch-size', type=int, default=100, help='每次领取的任务数')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='没有任务时的轮询间隔（秒）')
+        parser.add_argument('--stale-after', type=int, default=600, help='执行超过该秒数的任务视为中断并重试')
+        parser.add_argument('--keep-days', type=int, default=7, help='已完成任务的保留天数')
+        parser.add_argument('--once', action='store_true', help='执行完当前到期的任务后退出')
+
+    def handle(self, *args, **options):
+        if options['threads'] and options['processes']:
+            raise CommandError('--threads和--processes只能指定一个')
+        executor = None
+        if options['threads']:
+            executor = ThreadPoolExecutor(max_workers=options['threads'])
+        elif options['processes']:
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=options['processes'], initializer=_setup_worker)
+
+        worker = queue.worker_id()
+        stale_after = timedelta(seconds=options['stale_after'])
+        keep = timedelta(days=options['keep_days'])
+        total = 0
+        try:
+            recovered = queue.recover_stale(stale_after)
+            if recovered:
+                self.stderr.write(f'{recovered} 个任务执行超时，已按失败处理')
+            while True:
+                count = queue.run_pending(worker, options['batch_size'], executor)
+                total += count
+                if count:
+                    continue
+                if options['once']:
+                    break
+                # 空闲时顺便清理
+                queue.recover_stale(stale_after)
+                queue.purge(keep)
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(f'共执行 {total} 个任务')
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='任务名')),
+                ('key', models.CharField(blank=True, max_length=200, null=True, verbose_name='去重键')),
+                ('payload', models.JSONField(default=list, verbose_name='参数')),
+                ('status', models.CharField(choices=[('pending', '待执行'), ('running', '执行中'), ('done', '已完成'), ('failed', '失败')], default='pending', max_length=10, verbose_name='状态')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='已尝试次数')),
+                ('run_after', models.DateTimeField(verbose_name='最早执行时间')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='执行者')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='开始执行时间')),
+                ('last_error', models.TextField(blank=True, verbose_name='最近一次错误')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'indexes': [models.Index(fields=['status', 'run_after'], name='task_status_run_after')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('key',), name='task_unique_pending_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+"""
+后台任务表
+
+任务在触发它的事务中写入，事务提交后才对worker可见，回滚时一并撤销。
+同一去重键最多只有一条待执行的任务，重复入队的任务被合并。
+"""
+from django.db import models
+from django.db.models import Q
+
+
+class Task(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, '待执行'),
+        (RUNNING, '执行中'),
+        (DONE, '已完成'),
+        (FAILED, '失败'),
+    ]
+
+    name = models.CharField("任务名", max_length=100)
+    key = models.CharField("去重键", max_length=200, null=True, blank=True)
+    payload = models.JSONField("参数", default=list)
+    status = models.CharField("状态", max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField("已尝试次数", default=0)
+    run_after = models.DateTimeField("最早执行时间")
+    locked_by = models.CharField("执行者", max_length=100, blank=True)
+    locked_at = models.DateTimeField("开始执行时间", null=True, blank=True)
+    last_error = models.TextField("最近一次错误", blank=True)
+    created_at = models.DateTimeField("创建时间", auto_now_add=True)
+    finished_at = models.DateTimeField("结束时间", null=True, blank=True)
+
+    class Meta:
+        verbose_name = '后台任务'
+        verbose_name_plural = '后台任务'
+        indexes = [
+            # worker按最早执行时间领取待执行任务
+            models.Index(fields=['status', 'run_after'], name='task_status_run_after'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=Q(status='pending'), name='task_unique_pending_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}（{self.get_status_display()}）'
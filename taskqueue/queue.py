@@ -0,0 +1,185 @@
+"""
+基于数据库的后台任务队列，不依赖外部消息中间件
+
+    @task(batch=True)
+    def refresh_totals(student_ids):   # 批量任务：一次处理同名的全部待执行任务
+        ...
+
+    refresh_totals.enqueue_batch([1, 2, 3])   # 每个学生一条任务，去重键为“任务名:参数”
+    send_mail.enqueue(user_id, key=f'mail:{user_id}')
+
+任务在当前事务中写入，由 manage.py run_tasks 领取执行。失败的任务按retry_delay指数退避重试，
+超过max_attempts次后标记为失败。TASK_QUEUE_EAGER为True时在当前事务提交后即在当前进程执行，
+用于测试和不启动worker的开发环境；与入队时一样，回滚的事务不执行任务，任务出错也不影响已提交的事务。
+"""
+import logging
+import os
+import socket
+import traceback
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}  # 任务名 -> TaskType
+
+
+@dataclass
+class TaskType:
+    name: str
+    func: object
+    batch: bool = False
+    max_attempts: int = 3
+    retry_delay: int = 30  # 秒，第n次重试前等待 retry_delay * 2**(n-1)
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def enqueue(self, *args, key=None, delay=0):
+        """普通任务：按位置参数入队，key相同的待执行任务只保留一条"""
+        enqueue(self, [(list(args), key)], delay)
+
+    def enqueue_batch(self, values, delay=0):
+        """批量任务：每个值一条任务，同一值的待执行任务只保留一条"""
+        enqueue(self, [(value, f'{self.name}:{value}') for value in values], delay)
+
+
+def task(name=None, batch=False, max_attempts=3, retry_delay=30):
+    """登记后台任务；batch为True时函数接收同名任务参数的列表"""
+    def register(func):
+        task_type = TaskType(name or f'{func.__module__}.{func.__name__}', func, batch, max_attempts, retry_delay)
+        REGISTRY[task_type.name] = task_type
+        return task_type
+    return register
+
+
+def enqueue(task_type, items, delay=0):
+    """items为[(参数, 去重键)]，一条INSERT写入；与待执行任务去重键相同的被忽略"""
+    if not items:
+        return
+    if getattr(settings, 'TASK_QUEUE_EAGER', False):
+        payloads = [payload for payload, _ in items]
+        # 出错时只记录日志，与worker中失败的任务一样不影响调用方
+        transaction.on_commit(lambda: _call(task_type, payloads), robust=True)
+        return
+    run_after = timezone.now() + timedelta(seconds=delay)
+    Task.objects.bulk_create(
+        [Task(name=task_type.name, payload=payload, key=key, run_after=run_after) for payload, key in items],
+        ignore_conflicts=True,
+    )
+
+
+def _call(task_type, payloads):
+    if task_type.batch:
+        task_type.func(payloads)
+    else:
+        for args in payloads:
+            task_type.func(*args)
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def claim(worker, limit):
+    """领取到期的待执行任务；以状态为条件更新，多个worker不会领到同一条"""
+    now = timezone.now()
+    ids = list(Task.objects.filter(status=Task.PENDING, run_after__lte=now)
+               .order_by('run_after', 'id').values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    Task.objects.filter(pk__in=ids, status=Task.PENDING).update(
+        status=Task.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+    )
+    return list(Task.objects.filter(pk__in=ids, status=Task.RUNNING, locked_by=worker).order_by('id'))
+
+
+def group_units(tasks):
+    """批量任务按任务名合为一组，其余每条任务单独执行；返回[(任务名, [任务])]"""
+    units, batches = [], {}
+    for item in tasks:
+        task_type = REGISTRY.get(item.name)
+        if task_type is not None and task_type.batch:
+            if item.name not in batches:
+                batches[item.name] = []
+                units.append((item.name, batches[item.name]))
+            batches[item.name].append(item)
+        else:
+            units.append((item.name, [item]))
+    return units
+
+
+def execute(name, payloads):
+    """执行一组任务，返回错误信息，成功时返回None"""
+    task_type = REGISTRY.get(name)
+    if task_type is None:
+        return f'未登记的任务：{name}'
+    try:
+        _call(task_type, payloads)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def execute_in_pool(name, payloads):
+    # 线程池和进程池中每个线程/进程有自己的数据库连接，执行完按CONN_MAX_AGE释放
+    try:
+        return execute(name, payloads)
+    finally:
+        close_old_connections()
+
+
+def finish(tasks, error):
+    """记录执行结果：成功标记完成；失败时未超过次数的按退避时间重新排队"""
+    now = timezone.now()
+    if error is None:
+        Task.objects.filter(pk__in=[item.pk for item in tasks]).update(status=Task.DONE, finished_at=now, last_error='')
+        return
+    for item in tasks:
+        task_type = REGISTRY.get(item.name)
+        max_attempts = task_type.max_attempts if task_type else 1
+        if item.attempts >= max_attempts:
+            Task.objects.filter(pk=item.pk).update(status=Task.FAILED, finished_at=now, last_error=error)
+            logger.error('任务失败 %s #%s：%s', item.name, item.pk, error.strip().splitlines()[-1])
+            continue
+        run_after = now + timedelta(seconds=task_type.retry_delay * 2 ** (item.attempts - 1))
+        try:
+            with transaction.atomic():
+                Task.objects.filter(pk=item.pk).update(status=Task.PENDING, run_after=run_after, last_error=error)
+        except IntegrityError:
+            # 期间已有相同去重键的新任务入队，由它完成同样的工作
+            Task.objects.filter(pk=item.pk).update(status=Task.DONE, finished_at=now,
+                                                   last_error=f'{error}\n已合并到后续任务')
+        logger.warning('任务 %s #%s 第%s次执行失败，稍后重试', item.name, item.pk, item.attempts)
+
+
+def recover_stale(older_than):
+    """把执行超时（worker中途退出）的任务按失败处理，返回处理的条数"""
+    stale = list(Task.objects.filter(status=Task.RUNNING, locked_at__lt=timezone.now() - older_than))
+    for item in stale:
+        finish([item], f'执行超时，执行者 {item.locked_by} 可能已退出')
+    return len(stale)
+
+
+def run_pending(worker, limit=100, executor=None):
+    """领取并执行一批任务，返回执行的任务数；executor为线程池或进程池时并行执行各组"""
+    tasks = claim(worker, limit)
+    units = group_units(tasks)
+    arguments = ([name for name, _ in units], [[item.payload for item in items] for _, items in units])
+    errors = executor.map(execute_in_pool, *arguments) if executor else map(execute, *arguments)
+    for (_, items), error in zip(units, errors):
+        finish(items, error)
+    return len(tasks)
+
+
+def purge(older_than):
+    """删除早于指定时间完成的任务"""
+    return Task.objects.filter(status=Task.DONE, finished_at__lt=timezone.now() - older_than).delete()[0]
@@ -0,0 +1,102 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Task
+
+calls = []
+
+
+@queue.task(name='taskqueue.tests.collect', batch=True)
+def collect(values):
+    calls.append(sorted(values))
+
+
+@queue.task(name='taskqueue.tests.flaky', max_attempts=2, retry_delay=60)
+def flaky(message):
+    raise RuntimeError(message)
+
+
+@override_settings(TASK_QUEUE_EAGER=False)
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_pending_tasks_with_same_key_are_coalesced(self):
+        collect.enqueue_batch([1, 1, 2])
+        collect.enqueue_batch([2, 3])
+        self.assertEqual(sorted(Task.objects.values_list('payload', flat=True)), [1, 2, 3])
+
+    def test_batch_task_runs_once_per_claim(self):
+        collect.enqueue_batch([3, 1, 2])
+        call_command('run_tasks', once=True, stdout=io.StringIO())
+        self.assertEqual(calls, [[1, 2, 3]])
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 3)
+        # 执行中或已完成的任务不影响再次入队
+        collect.enqueue_batch([1])
+        self.assertEqual(Task.objects.filter(status=Task.PENDING).count(), 1)
+
+    def test_retry_with_backoff_then_fail(self):
+        flaky.enqueue('boom', key='flaky')
+        with self.assertLogs('taskqueue.queue', 'WARNING'):
+            queue.run_pending('w1')
+        item = Task.objects.get()
+        self.assertEqual((item.status, item.attempts), (Task.PENDING, 1))
+        self.assertGreater(item.run_after, timezone.now() + timedelta(seconds=50))
+        self.assertIn('RuntimeError: boom', item.last_error)
+        # 未到重试时间不会被领取
+        self.assertEqual(queue.run_pending('w1'), 0)
+
+        Task.objects.update(run_after=timezone.now())
+        with self.assertLogs('taskqueue.queue', 'ERROR'):
+            queue.run_pending('w1')
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_retry_merges_into_newer_task(self):
+        flaky.enqueue('old', key='flaky')
+        item = queue.claim('w1', 10)[0]
+        flaky.enqueue('new', key='flaky')
+        with self.assertLogs('taskqueue.queue', 'WARNING'):
+            queue.finish([item], 'error')
+        item.refresh_from_db()
+        self.assertEqual(item.status, Task.DONE)
+        self.assertEqual(Task.objects.get(status=Task.PENDING).payload, ['new'])
+
+    def test_stale_running_tasks_are_retried(self):
+        collect.enqueue_batch([1])
+        queue.claim('gone', 10)
+        Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        with self.assertLogs('taskqueue.queue', 'WARNING'):
+            self.assertEqual(queue.recover_stale(timedelta(minutes=10)), 1)
+        self.assertEqual(Task.objects.get().status, Task.PENDING)
+
+    def test_thread_pool(self):
+        for value in range(3):
+            flaky.enqueue(f'error {value}', key=f'flaky:{value}')
+        with ThreadPoolExecutor(max_workers=2) as executor, self.assertLogs('taskqueue.queue', 'WARNING'):
+            self.assertEqual(queue.run_pending('w1', executor=executor), 3)
+        self.assertEqual(set(Task.objects.values_list('attempts', flat=True)), {1})
+
+    @override_settings(TASK_QUEUE_EAGER=True)
+    def test_eager_mode_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            collect.enqueue_batch([2, 1])
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [[1, 2]])
+        self.assertFalse(Task.objects.exists())
+
+        # 回滚的事务不执行任务
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    collect.enqueue_batch([3])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(calls, [[1, 2]])
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User, Group
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from versioning.models import track as track_versions
 
 # 老师档案模型
 class TeacherProfile(models.Model):
@@ -16,6 +17,9 @@ class TeacherProfile(models.Model):
     def __str__(self):
         return f"{self.full_name}（{self.teacher_id} - {self.department}）"
 
+# 老师档案随审核人信息出现在提交记录中，变化时递增版本号
+track_versions(TeacherProfile, per_object=False)
+
 # 信号处理函数：创建用户后自动添加到老师组
 @receiver(post_save, sender=User)
 def add_user_to_teacher_group(sender, instance, created, **kwargs):
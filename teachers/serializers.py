@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import TeacherProfile
 from django.contrib.auth.models import User
-from students.models import Submission
+from students.loaders import BatchListSerializer, loaders
 
 # 用户序列化器
 class UserSerializer(serializers.ModelSerializer):
@@ -19,7 +19,11 @@ class TeacherProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'full_name', 'teacher_id', 'department', 
                  'email', 'phone', 'last_updated', 'review_count']
         read_only_fields = ['last_updated', 'review_count']
+        list_serializer_class = BatchListSerializer
+
+    def collect(self, profiles):
+        loaders(self.context)['review_count'].add(profile.user_id for profile in profiles)
 
     def get_review_count(self, obj):
-        # 获取老师审核过的记录数
-        return Submission.objects.filter(reviewer=obj.user).count()
\ No newline at end of file
+        # 获取老师审核过的记录数，同一请求内所有老师的审核数一条查询取回
+        return loaders(self.context)['review_count'].load(obj.user_id)
\ No newline at end of file
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from students.models import StudentProfile, ScoreItem, Submission
+from .models import TeacherProfile
+
+
+class TeacherViewQueryBudgetTest(TestCase):
+    """教师视图的查询条数上限；数据量增加时查询条数保持不变"""
+
+    BUDGETS = [
+        ('/teachers/dashboard/', 7),
+        ('/teachers/profile/', 3),
+        ('/teachers/review/{submission}/', 3),
+    ]
+
+    def setUp(self):
+        user = User.objects.create_user(username='teacher', password='pw', is_staff=True)
+        TeacherProfile.objects.create(user=user, full_name='王老师', teacher_id='T001', department='计算机学院')
+        self.reviewer = user
+        self.item = ScoreItem.objects.create(name='竞赛', category='competition', level='省级', score=2)
+        self.seed(3)
+        self.client.login(username='teacher', password='pw')
+
+    def seed(self, count):
+        start = StudentProfile.objects.count()
+        for n in range(start, start + count):
+            student = StudentProfile.objects.create(user=User.objects.create_user(username=f'stu{n}'),
+                                                    full_name=f'学生{n}', student_id=f'S{n:03d}')
+            Submission.objects.create(student=student, score_item=self.item, proof_file='proofs/a.pdf')
+            Submission.objects.create(student=student, score_item=self.item, proof_file='proofs/a.pdf',
+                                      status='approved', reviewer=self.reviewer)
+
+    def measure(self):
+        submission = Submission.objects.order_by('id').first().id
+        counts = {}
+        for template, _ in self.BUDGETS:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(template.format(submission=submission))
+            self.assertLess(response.status_code, 400, template)
+            counts[template] = len(queries)
+        return counts
+
+    def test_views_stay_within_budget(self):
+        small = self.measure()
+        self.seed(12)
+        large = self.measure()
+        for template, budget in self.BUDGETS:
+            self.assertLessEqual(large[template], budget, template)
+            self.assertEqual(small[template], large[template], f'{template} 的查询条数随数据量增长')
@@ -4,6 +4,9 @@ app_name = 'teachers'
 from . import views
 
 urlpatterns = [
+    # 模板中的teachers:home指向仪表盘
+    path('', views.teacher_dashboard, name='home'),
     path('dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
     path('review/<int:submission_id>/', views.review_submission, name='review_submission'),
+    path('profile/', views.teacher_profile, name='teacher_profile'),
 ]
\ No newline at end of file
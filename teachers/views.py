@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from .models import TeacherProfile
 from students.models import Submission, ScoreItem
+from students.stats import dashboard_stats
 
 @login_required
 def teacher_dashboard(request):
@@ -11,17 +12,19 @@ def teacher_dashboard(request):
         return redirect('home')
     
     # 获取待审核的提交记录
-    pending_submissions = Submission.objects.filter(status='pending')
+    pending_submissions = Submission.objects.filter(status='pending').select_related('student', 'score_item')
     
-    # 获取最近审核的提交记录
-    recent_reviews = Submission.objects.filter(status__in=['approved', 'rejected']).order_by('-reviewed_at')[:10]
+    # 获取最近审核的提交记录；reviewed_at非空的条件让查询沿审核时间索引倒序读取
+    recent_reviews = (Submission.objects.filter(status__in=['approved', 'rejected'], reviewed_at__isnull=False)
+                      .select_related('student', 'score_item').order_by('-reviewed_at')[:10])
     
-    # 统计信息
+    # 统计信息（缓存的聚合快照）
+    snapshot = dashboard_stats()
     stats = {
-        'pending_count': pending_submissions.count(),
-        'total_submissions': Submission.objects.count(),
-        'approved_count': Submission.objects.filter(status='approved').count(),
-        'rejected_count': Submission.objects.filter(status='rejected').count(),
+        'pending_count': snapshot['pending_submissions'],
+        'total_submissions': snapshot['total_submissions'],
+        'approved_count': snapshot['approved_submissions'],
+        'rejected_count': snapshot['rejected_submissions'],
     }
     
     # 构建上下文，确保超级管理员账号被视为老师类型
@@ -44,7 +47,7 @@ def review_submission(request, submission_id):
     
     # 这里可以添加审核提交记录的逻辑
     # 暂时返回仪表盘
-    return redirect('teacher_dashboard')
+    return redirect('teachers:teacher_dashboard')
 
 @login_required
 def teacher_profile(request):
@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class VersioningConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'versioning'
+    verbose_name = '数据版本'
@@ -0,0 +1,106 @@
+"""
+按数据版本号失效的共享缓存
+
+    @cached('students:dashboard_stats', ['students.studentprofile', 'students.submission'])
+    def dashboard_stats():
+        ...
+
+    with cached_block('score_helper:approve', SCORE_NAMESPACES, parts=[application.id]) as block:
+        if block.missing:
+            block.value = compute()
+    result = block.value
+
+命名空间为模型（或其app_label.model标签），对应versioning中模型的版本号。缓存键包含所依赖命名空间的当前版本号，
+任一进程写入这些模型后版本号在数据库中递增，所有进程随后算出的缓存键随之改变，旧条目不再被读取、按超时淘汰，
+不必逐个删除。读取缓存前用一条查询读出版本号，同一个代码块依赖多个命名空间时也只查询一次。
+缓存后端由CACHES配置：测试和单进程开发用本地内存，多进程部署用文件或数据库缓存，各进程共享计算结果。
+"""
+import hashlib
+import json
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import increment, lookup, model_key
+
+_MISSING = object()
+
+
+def namespace_key(namespace):
+    return namespace if isinstance(namespace, str) else model_key(namespace)
+
+
+def versioned_key(name, namespaces, parts=()):
+    """读出命名空间的版本号，返回包含版本号的缓存键"""
+    keys = [namespace_key(namespace) for namespace in namespaces]
+    versions = sorted((key, version) for key, (version, _) in lookup(keys).items())
+    raw = json.dumps([list(parts), versions], default=str, sort_keys=True)
+    return f'{name}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def invalidate(*namespaces):
+    """
+    命名空间的数据已变化，当前事务提交后递增版本号，各进程的缓存随之失效
+    记录的保存和删除已由track()登记的信号处理，原生SQL等绕过信号的写入由调用方调用
+    """
+    keys = [namespace_key(namespace) for namespace in namespaces]
+    transaction.on_commit(lambda: increment(keys))
+
+
+class CachedValue:
+    def __init__(self, value=_MISSING):
+        self._value = value
+
+    @property
+    def missing(self):
+        return self._value is _MISSING
+
+    @property
+    def value(self):
+        if self._value is _MISSING:
+            raise LookupError('缓存未命中且代码块中没有设置value')
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+
+
+def _timeout(timeout):
+    return timeout if timeout is not None else getattr(settings, 'VERSIONED_CACHE_TIMEOUT', 300)
+
+
+@contextmanager
+def cached_block(name, namespaces, parts=(), timeout=None, alias='default'):
+    """
+    缓存一段计算：命中时block.missing为False，block.value为缓存的结果；
+    未命中时在代码块中设置block.value，代码块正常结束后写入缓存，抛出异常时不写入
+    """
+    cache = caches[alias]
+    key = versioned_key(name, namespaces, parts)
+    block = CachedValue(cache.get(key, _MISSING))
+    hit = not block.missing
+    yield block
+    if not hit and not block.missing:
+        cache.set(key, block.value, _timeout(timeout))
+
+
+def cached(name, namespaces, timeout=None, key=None, alias='default'):
+    """
+    函数装饰器：结果按参数和命名空间的版本号缓存
+    key(*args, **kwargs)返回区分缓存条目的参数，默认使用全部参数（须可JSON序列化或转为字符串）
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            parts = key(*args, **kwargs) if key is not None else [args, sorted(kwargs.items())]
+            with cached_block(name, namespaces, parts, timeout, alias) as block:
+                if block.missing:
+                    block.value = func(*args, **kwargs)
+            return block.value
+        return wrapper
+    return decorator
@@ -0,0 +1,65 @@
+"""
+基于版本号的条件GET
+
+    class ScoreItemViewSet(viewsets.ModelViewSet):
+        @versioned(lambda view, request, pk=None, **kwargs: [object_key(ScoreItem, pk)])
+        def retrieve(self, request, *args, **kwargs):
+            ...
+
+GET/HEAD请求先用一条查询读出依赖的版本号，据此生成强ETag和Last-Modified；
+客户端携带的If-None-Match / If-Modified-Since与之相符时直接返回304，不执行视图。
+ETag同时区分当前用户和响应格式（HTML/JSON），因为同一URL对不同用户、不同Accept返回的内容不同。
+有待显示的消息（django.contrib.messages）时不返回304，以免消息被留到下一个页面。
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import lookup
+
+
+def _wants_json(request):
+    renderer = getattr(request, 'accepted_renderer', None)
+    return getattr(renderer, 'format', None) == 'json' or 'application/json' in request.headers.get('Accept', '')
+
+
+def validators(request, keys):
+    """
+    返回(ETag, Last-Modified时间戳)；没有任何版本记录时Last-Modified为None
+    读出的版本号存为request.data_versions，视图中按版本号组织缓存键时不必再次查询
+    """
+    versions = request.data_versions = lookup(keys)
+    user = request.user
+    parts = [f'{key}={version}' for key, (version, _) in sorted(versions.items())]
+    parts += [f'user={user.pk if user.is_authenticated else ""}', f'json={_wants_json(request)}']
+    etag = quote_etag(hashlib.sha1('&'.join(parts).encode()).hexdigest()[:32])
+    times = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+    return etag, (int(max(times).timestamp()) if times else None)
+
+
+def versioned(keys):
+    """视图方法装饰器；keys(view, request, *args, **kwargs)返回响应内容依赖的版本键列表"""
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return method(view, request, *args, **kwargs)
+            etag, last_modified = validators(request, keys(view, request, *args, **kwargs))
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # 浏览器每次都带上ETag重新验证
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Accept', 'Cookie'))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Version',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='键')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='版本号')),
+                ('updated_at', models.DateTimeField(verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '数据版本',
+                'verbose_name_plural': '数据版本',
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+"""
+数据版本号
+
+每个模型一个版本号（键为app_label.model），需要时每条记录再一个（键为app_label.model:主键）。
+记录写入的事务提交后递增，读取方比较版本号即可知道数据是否变化，不必执行原查询。
+"""
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+
+
+class Version(models.Model):
+    key = models.CharField("键", max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField("版本号", default=0)
+    updated_at = models.DateTimeField("更新时间")
+
+    class Meta:
+        verbose_name = '数据版本'
+        verbose_name_plural = '数据版本'
+
+    def __str__(self):
+        return f'{self.key} v{self.version}'
+
+
+def model_key(model):
+    return model._meta.label_lower
+
+
+def object_key(model, pk):
+    return f'{model._meta.label_lower}:{pk}'
+
+
+def model_keys(model, pks=()):
+    return [model_key(model), *(object_key(model, pk) for pk in pks)]
+
+
+def increment(keys):
+    """立即递增版本号，不存在的键从1开始"""
+    keys = set(keys)
+    now = timezone.now()
+    if Version.objects.filter(key__in=keys).update(version=F('version') + 1, updated_at=now) < len(keys):
+        Version.objects.bulk_create([Version(key=key, version=1, updated_at=now) for key in keys],
+                                    ignore_conflicts=True)
+
+
+def bump(model, pks=()):
+    """
+    模型（及pks对应的记录）的数据已变化，当前事务提交后递增版本号；回滚时不递增
+    queryset.update()和bulk_create()不触发信号，由调用方在写入后调用
+    """
+    keys = model_keys(model, pks)
+    transaction.on_commit(lambda: increment(keys))
+
+
+def lookup(keys):
+    """一条查询读取多个键的版本号，返回{键: (版本号, 更新时间)}，从未递增的键为(0, None)"""
+    found = {key: (version, updated_at)
+             for key, version, updated_at in Version.objects.filter(key__in=keys).values_list('key', 'version', 'updated_at')}
+    return {key: found.get(key, (0, None)) for key in keys}
+
+
+def track(model, per_object=True):
+    """登记模型：保存和删除记录时递增模型的版本号，per_object为True时同时递增该记录的版本号"""
+
+    def changed(sender, instance, raw=False, **kwargs):
+        if not raw:
+            bump(model, [instance.pk] if per_object else ())
+
+    uid = f'versioning:{model_key(model)}'
+    post_save.connect(changed, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(changed, sender=model, weak=False, dispatch_uid=uid)
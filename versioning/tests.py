@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+
+from .cache import cached, cached_block, invalidate
+from .models import Version, increment, lookup
+
+
+class VersionTest(TestCase):
+    def test_increment_creates_and_bumps(self):
+        increment(['a', 'b'])
+        increment(['a'])
+        versions = lookup(['a', 'b', 'c'])
+        self.assertEqual(versions['a'][0], 2)
+        self.assertEqual(versions['b'][0], 1)
+        self.assertEqual(versions['c'], (0, None))
+
+    def test_bump_waits_for_commit(self):
+        from django.contrib.auth.models import Group
+        from .models import bump
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump(Group, [1, 2])
+            self.assertFalse(Version.objects.exists())
+        self.assertEqual(lookup(['auth.group', 'auth.group:1'])['auth.group:1'][0], 1)
+
+        # 回滚的写入不递增
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    bump(Group)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(lookup(['auth.group'])['auth.group'][0], 1)
+
+
+class VersionedCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def test_decorator_caches_per_arguments_until_namespace_changes(self):
+        @cached('tests:square', ['auth.group'])
+        def square(n):
+            self.calls.append(n)
+            return n * n
+
+        self.assertEqual((square(3), square(3), square(4)), (9, 9, 16))
+        self.assertEqual(self.calls, [3, 4])
+        # 每次读取缓存只查询一次版本号
+        with self.assertNumQueries(1):
+            square(3)
+
+        # 其他命名空间的变化不影响
+        increment(['auth.user'])
+        square(3)
+        self.assertEqual(self.calls, [3, 4])
+
+        # 模拟另一个进程写入：只有数据库中的版本号变化
+        increment(['auth.group'])
+        square(3)
+        self.assertEqual(self.calls, [3, 4, 3])
+
+    def test_block_skips_write_on_error_and_invalidate_waits_for_commit(self):
+        with self.assertRaises(RuntimeError):
+            with cached_block('tests:block', ['auth.group']) as block:
+                block.value = 'partial'
+                raise RuntimeError
+        with cached_block('tests:block', ['auth.group']) as block:
+            self.assertTrue(block.missing)
+            block.value = 'done'
+        with cached_block('tests:block', ['auth.group']) as block:
+            self.assertEqual(block.value, 'done')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate('auth.group')
+            with cached_block('tests:block', ['auth.group']) as block:
+                self.assertFalse(block.missing)
+        with cached_block('tests:block', ['auth.group']) as block:
+            self.assertTrue(block.missing)